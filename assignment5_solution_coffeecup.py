@@ -2,12 +2,72 @@
 Assignment #5: 3D Object Processing with Open3D
 Student: Working with Coffee Cup Model
 All 7 tasks completed step by step
+
+The tasks run as a callable pipeline (run_pipeline). By default every step is
+shown in an Open3D window; --headless skips the viewer and --png DIR renders
+each view to a PNG with a software rasterizer instead (no GPU or display).
+Per-stage timings and geometry statistics are written to a JSON report. OBJ
+geometry is parsed by obj_loader and cached as binary arrays for repeat runs.
+Normal radius, Poisson depth, voxel and marker sizes are derived from the
+sampled cloud (--fixed-params restores the coffee cup values). --lod DIR
+first reconstructs a chain of coarser meshes and voxel grids for quick
+previews; --preview-only stops there, before the full-resolution Poisson.
+
+Usage:
+    python assignment5_solution_coffeecup.py [model.obj] [--headless] [--png DIR]
+                                             [--save-point-cloud PLY] [--no-cache] [--report PATH]
+                                             [--fixed-params] [--depth N] [--voxel-size S]
+                                             [--density-quantile Q] [--lod DIR [--preview-only]]
 """
 
+import argparse
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
 import open3d as o3d
 import numpy as np
-import copy
-import os
+
+import mesh_clipping
+import obj_loader
+import spatial_index
+import voxelizer
+
+DEFAULT_MODEL_PATH = os.path.join("assignment_5", "Assignment5", "object", "coffeecup", "coffee_cup_obj.obj")
+# Alternative models available:
+# os.path.join("assignment_5", "Assignment5", "object", "sting", "Sting-Sword-lowpoly.obj")
+# os.path.join("assignment_5", "Assignment5", "object", "sofa", "couch.obj")
+OUTPUT_DIR = os.path.join("assignment_5", "output")
+
+NUM_SAMPLE_POINTS = 10000
+NORMAL_RADIUS = 0.5
+NORMAL_MAX_NN = 30
+POISSON_DEPTH = 9
+DENSITY_QUANTILE = 0.02  # Poisson vertices below this density quantile are trimmed as artifacts
+COLOR_NEIGHBORS = 4  # Cloud points blended (inverse-distance weighted) per reconstructed vertex
+ARTIFACT_NEIGHBORS = 8
+ARTIFACT_DISTANCE_FACTOR = 4.0  # Vertices this many cloud spacings from the samples are removed
+VOXEL_SIZE = 0.04  # Adjusted for smaller coffee cup model (slightly larger voxels)
+MARKER_SIZE = 0.02  # Extreme point spheres (small for coffee cup model)
+
+# Adaptive parameters (derive_parameters) replace the fixed values above by
+# default, scaled by the cloud's bounding-box diagonal and point spacing
+NORMAL_RADIUS_SPACINGS = 8  # Normal estimation radius in mean nearest-neighbor distances
+POISSON_SCALE = 1.1  # Poisson's octree spans the bounding box enlarged by this factor
+POISSON_DEPTH_RANGE = (6, 11)
+VOXELS_PER_DIAGONAL = 25
+MARKER_DIAGONAL_FRACTION = 0.02
+
+# Level-of-detail chain: each level runs Poisson one octree level shallower
+# than the next finer one (about a quarter of the triangles) and doubles the voxel size
+LOD_LEVELS = 3
+
+WINDOW_WIDTH = 1024
+WINDOW_HEIGHT = 768
+# Triangles / points drawn per geometry in PNG renders; larger inputs are subsampled
+MAX_RENDER_ELEMENTS = 60000
 
 def print_separator():
     print("\n" + "="*80 + "\n")
@@ -15,392 +75,807 @@ def print_separator():
 def print_info(title, mesh=None, pcd=None, voxel=None):
     """Print information about the geometry"""
     print(f"--- {title} ---")
-    
+
     if mesh is not None:
         vertices = np.asarray(mesh.vertices)
         triangles = np.asarray(mesh.triangles)
         has_colors = mesh.has_vertex_colors()
         has_normals = mesh.has_vertex_normals()
-        
+
         print(f"Number of vertices: {len(vertices)}")
         print(f"Number of triangles: {len(triangles)}")
         print(f"Has colors: {has_colors}")
         print(f"Has normals: {has_normals}")
-    
+
     if pcd is not None:
         points = np.asarray(pcd.points)
         has_colors = pcd.has_colors()
         has_normals = pcd.has_normals()
-        
+
         print(f"Number of points (vertices): {len(points)}")
         print(f"Has colors: {has_colors}")
         print(f"Has normals: {has_normals}")
-    
+
     if voxel is not None:
         voxels = voxel.get_voxels()
         print(f"Number of voxels: {len(voxels)}")
         has_colors = len(voxel.get_voxels()) > 0
         print(f"Has colors: {has_colors}")
 
-print("Starting Assignment #5: 3D Object Processing")
-print_separator()
+def geometry_stats(geometry):
+    """Counts and attribute flags of a mesh, point cloud or voxel grid, for the JSON report"""
+    if isinstance(geometry, o3d.geometry.TriangleMesh):
+        return {
+            'vertices': len(geometry.vertices),
+            'triangles': len(geometry.triangles),
+            'has_colors': geometry.has_vertex_colors(),
+            'has_normals': geometry.has_vertex_normals(),
+        }
+    if isinstance(geometry, o3d.geometry.PointCloud):
+        return {
+            'points': len(geometry.points),
+            'has_colors': geometry.has_colors(),
+            'has_normals': geometry.has_normals(),
+        }
+    if isinstance(geometry, o3d.geometry.VoxelGrid):
+        return {'voxels': len(geometry.get_voxels()), 'voxel_size': geometry.voxel_size}
+    return {}
+
+# =============================================================================
+# Viewers: interactive window, PNG file or nothing
+# =============================================================================
+
+def _render_arrays(geometry, max_elements):
+    """Geometry as ('points'|'triangles'|'lines', coordinates, colors) for the PNG renderer"""
+    def subsample(count):
+        if count <= max_elements:
+            return slice(None)
+        return np.linspace(0, count - 1, max_elements).astype(int)
+
+    if isinstance(geometry, o3d.geometry.PointCloud):
+        points = np.asarray(geometry.points)
+        colors = np.asarray(geometry.colors) if geometry.has_colors() else np.full((len(points), 3), 0.5)
+        keep = subsample(len(points))
+        return 'points', points[keep], colors[keep]
+
+    if isinstance(geometry, o3d.geometry.VoxelGrid):
+        voxels = geometry.get_voxels()
+        centers = np.array([geometry.get_voxel_center_coordinate(v.grid_index) for v in voxels]).reshape(-1, 3)
+        colors = np.array([v.color for v in voxels]).reshape(-1, 3)
+        keep = subsample(len(centers))
+        return 'points', centers[keep], colors[keep]
+
+    if isinstance(geometry, o3d.geometry.TriangleMesh):
+        vertices = np.asarray(geometry.vertices)
+        triangles = np.asarray(geometry.triangles)[subsample(len(geometry.triangles))]
+        if geometry.has_vertex_colors():
+            colors = np.asarray(geometry.vertex_colors)[triangles].mean(axis=1)
+        else:
+            colors = np.full((len(triangles), 3), 0.7)
+        return 'triangles', vertices[triangles], colors
+
+    if isinstance(geometry, o3d.geometry.LineSet):
+        points = np.asarray(geometry.points)
+        lines = np.asarray(geometry.lines)
+        colors = np.asarray(geometry.colors) if geometry.has_colors() else np.zeros((len(lines), 3))
+        return 'lines', points[lines], colors
+
+    raise TypeError(f"Cannot render {type(geometry).__name__}")
+
+def render_png(geometries, file_path, title, max_elements=MAX_RENDER_ELEMENTS):
+    """Rasterize geometries to a PNG with matplotlib's Agg backend (CPU only, no display)"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from mpl_toolkits.mplot3d.art3d import Line3DCollection, Poly3DCollection
+
+    fig = plt.figure(figsize=(WINDOW_WIDTH / 100, WINDOW_HEIGHT / 100), dpi=100)
+    ax = fig.add_subplot(projection='3d')
+    # Open3D is Y-up; matplotlib draws Z up, so plot (x, z, y)
+    axes_order = [0, 2, 1]
+    extents = []
+
+    for geometry in geometries:
+        kind, coords, colors = _render_arrays(geometry, max_elements)
+        if len(coords) == 0:
+            continue
+        coords = coords[..., axes_order]
+        extents.append(coords.reshape(-1, 3))
+        colors = np.clip(colors, 0, 1)
+        if kind == 'points':
+            ax.scatter(coords[:, 0], coords[:, 1], coords[:, 2], c=colors, s=2, depthshade=False)
+        elif kind == 'triangles':
+            ax.add_collection3d(Poly3DCollection(coords, facecolors=colors, edgecolors='none'))
+        else:
+            ax.add_collection3d(Line3DCollection(coords, colors=colors, linewidths=1.5))
+
+    if extents:
+        all_coords = np.concatenate(extents)
+        lower, upper = all_coords.min(axis=0), all_coords.max(axis=0)
+        ax.set_xlim(lower[0], upper[0])
+        ax.set_ylim(lower[1], upper[1])
+        ax.set_zlim(lower[2], upper[2])
+        ax.set_box_aspect(np.maximum(upper - lower, 1e-6))
+    ax.set_title(title)
+    ax.set_axis_off()
+    ax.view_init(elev=20, azim=-60)
+
+    fig.savefig(file_path, bbox_inches='tight')
+    plt.close(fig)
+
+class Viewer:
+    """Shows each step in an Open3D window, renders it to PNG, or skips it"""
+
+    def __init__(self, mode='interactive', output_dir=None):
+        self.mode = mode
+        self.output_dir = output_dir
+        self.outputs = []
+        self.render_ms = 0.0
+        if mode == 'png':
+            os.makedirs(output_dir, exist_ok=True)
+
+    def show(self, geometries, window_name, file_name):
+        if self.mode == 'interactive':
+            o3d.visualization.draw_geometries(geometries,
+                                               window_name=window_name,
+                                               width=WINDOW_WIDTH, height=WINDOW_HEIGHT)
+        elif self.mode == 'png':
+            started = time.perf_counter()
+            file_path = os.path.join(self.output_dir, file_name)
+            render_png(geometries, file_path, window_name)
+            self.render_ms += (time.perf_counter() - started) * 1000
+            self.outputs.append(file_path)
+            print(f"Rendered {file_path}")
+
+class StageTimer:
+    """Collects wall time and geometry stats per pipeline stage"""
+
+    def __init__(self):
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        record = {}
+        yield record
+        record['ms'] = round((time.perf_counter() - started) * 1000, 3)
+        self.stages[name] = record
+
+def fixed_parameters():
+    """The hand-tuned coffee cup parameters"""
+    return {
+        'normal_radius': NORMAL_RADIUS,
+        'normal_max_nn': NORMAL_MAX_NN,
+        'depth': POISSON_DEPTH,
+        'voxel_size': VOXEL_SIZE,
+        'marker_size': MARKER_SIZE,
+    }
+
+def derive_parameters(pcd):
+    """Reconstruction parameters scaled to the cloud's size and sampling density.
+
+    The mean nearest-neighbor distance sets the normal radius and the Poisson
+    depth (octree cells about half the point spacing); the bounding-box
+    diagonal sets the voxel and marker sizes.
+    """
+    points = np.asarray(pcd.points)
+    extent = points.max(axis=0) - points.min(axis=0)
+    diagonal = float(np.linalg.norm(extent))
+    # k=2: the nearest point of every point is itself
+    distances, _ = spatial_index.get_index(points).query(points, k=2)
+    spacing = float(distances[:, 1].mean())
+
+    cells = POISSON_SCALE * extent.max() / max(spacing, 1e-12)
+    depth = int(np.clip(np.ceil(np.log2(max(cells, 1.0))) + 1, *POISSON_DEPTH_RANGE))
+    return {
+        'diagonal': diagonal,
+        'spacing': spacing,
+        'normal_radius': NORMAL_RADIUS_SPACINGS * spacing,
+        'normal_max_nn': NORMAL_MAX_NN,
+        'depth': depth,
+        'voxel_size': diagonal / VOXELS_PER_DIAGONAL,
+        'marker_size': diagonal * MARKER_DIAGONAL_FRACTION,
+    }
 
 # =============================================================================
 # TASK 1: Loading and Visualization
 # =============================================================================
-print("TASK 1: LOADING AND VISUALIZATION")
-print("Loading the 3D coffee cup model from OBJ file...")
 
-# Define the model path
-model_path = os.path.join("assignment_5", "Assignment5", "object", "coffeecup", "coffee_cup_obj.obj")
-# Alternative models available:
-# model_path = os.path.join("assignment_5", "Assignment5", "object", "sting", "Sting-Sword-lowpoly.obj")
-# model_path = os.path.join("assignment_5", "Assignment5", "object", "sofa", "couch.obj")
-
-print(f"Model path: {model_path}")
-print(f"File exists: {os.path.exists(model_path)}")
-
-# Load mesh - the OBJ file contains quads which need to be triangulated
-mesh_original = o3d.io.read_triangle_mesh(model_path, enable_post_processing=True)
-
-# If mesh is empty (quads not loaded), try alternative approach
-if len(mesh_original.vertices) == 0:
-    import trimesh
-    # Load with trimesh which handles quads better
-    abs_path = os.path.abspath(model_path)
-    tmesh = trimesh.load(abs_path, force='mesh')
-    # Convert to Open3D
-    mesh_original = o3d.geometry.TriangleMesh()
-    mesh_original.vertices = o3d.utility.Vector3dVector(tmesh.vertices)
-    mesh_original.triangles = o3d.utility.Vector3iVector(tmesh.faces)
-    
-    # Try to extract colors if available (handle different visual types)
-    try:
-        if hasattr(tmesh.visual, 'vertex_colors') and tmesh.visual.vertex_colors is not None:
-            mesh_original.vertex_colors = o3d.utility.Vector3dVector(
-                tmesh.visual.vertex_colors[:, :3] / 255.0)
-    except:
-        pass  # Colors will be added later if needed
-
-print(f"Successfully loaded mesh with {len(mesh_original.vertices)} vertices and {len(mesh_original.triangles)} triangles")
-
-# Compute normals if not present
-if not mesh_original.has_vertex_normals():
-    mesh_original.compute_vertex_normals()
-
-# Add colors to mesh if not present (textures aren't loaded by basic Open3D loader)
-if not mesh_original.has_vertex_colors():
-    print("Original mesh has no vertex colors. Adding gradient coloring based on geometry...")
-    # Create a gradient color based on Y-axis (height) for better visualization
-    vertices = np.asarray(mesh_original.vertices)
-    y_coords = vertices[:, 1]
-    y_min, y_max = y_coords.min(), y_coords.max()
-    y_normalized = (y_coords - y_min) / (y_max - y_min + 1e-6)
-    
-    # Create nice gradient: blue (bottom) -> cyan -> yellow -> red (top)
-    colors = np.zeros((len(vertices), 3))
-    colors[:, 0] = np.clip(y_normalized * 2, 0, 1)  # Red channel
-    colors[:, 1] = np.clip(1 - abs(y_normalized - 0.5) * 2, 0.3, 1)  # Green channel
-    colors[:, 2] = np.clip(1 - y_normalized * 2, 0, 1)  # Blue channel
-    
-    mesh_original.vertex_colors = o3d.utility.Vector3dVector(colors)
-    print("Applied gradient coloring (blue=bottom, yellow/red=top)")
-
-print_info("Original Mesh", mesh=mesh_original)
-print("\nDisplaying original model...")
-o3d.visualization.draw_geometries([mesh_original], 
-                                   window_name="Task 1: Original Model",
-                                   width=1024, height=768)
-
-print_separator()
+def load_mesh(model_path, cache_dir=obj_loader.CACHE_DIR):
+    """Load the model and color it by height; returns (mesh, cache status).
+
+    OBJ files go through obj_loader, which triangulates the quads and caches
+    the parsed arrays (cache status 'hit'/'miss', or 'off' without cache_dir).
+    Other formats are read by Open3D, falling back to trimesh.
+    """
+    print(f"Model path: {model_path}")
+    print(f"File exists: {os.path.exists(model_path)}")
+
+    cache_status = None
+    if model_path.lower().endswith('.obj'):
+        # Open3D's OBJ reader leaves the quad faces of this model empty
+        vertices, triangles, colors, cache_status = obj_loader.load_obj(model_path, cache_dir)
+        mesh_original = o3d.geometry.TriangleMesh()
+        mesh_original.vertices = o3d.utility.Vector3dVector(vertices)
+        mesh_original.triangles = o3d.utility.Vector3iVector(triangles)
+        if colors is not None:
+            mesh_original.vertex_colors = o3d.utility.Vector3dVector(colors)
+        print(f"Parsed OBJ geometry cache: {cache_status}")
+    else:
+        mesh_original = o3d.io.read_triangle_mesh(model_path, enable_post_processing=True)
+
+    # If mesh is empty, try alternative approach
+    if len(mesh_original.vertices) == 0 and cache_status is None:
+        import trimesh
+        # Load with trimesh which handles quads better
+        abs_path = os.path.abspath(model_path)
+        tmesh = trimesh.load(abs_path, force='mesh')
+        # Convert to Open3D
+        mesh_original = o3d.geometry.TriangleMesh()
+        mesh_original.vertices = o3d.utility.Vector3dVector(tmesh.vertices)
+        mesh_original.triangles = o3d.utility.Vector3iVector(tmesh.faces)
+
+        # Try to extract colors if available (handle different visual types)
+        try:
+            if hasattr(tmesh.visual, 'vertex_colors') and tmesh.visual.vertex_colors is not None:
+                mesh_original.vertex_colors = o3d.utility.Vector3dVector(
+                    tmesh.visual.vertex_colors[:, :3] / 255.0)
+        except:
+            pass  # Colors will be added later if needed
+
+    print(f"Successfully loaded mesh with {len(mesh_original.vertices)} vertices and {len(mesh_original.triangles)} triangles")
+
+    # Compute normals if not present
+    if not mesh_original.has_vertex_normals():
+        mesh_original.compute_vertex_normals()
+
+    # Add colors to mesh if not present (textures aren't loaded by basic Open3D loader)
+    if not mesh_original.has_vertex_colors():
+        print("Original mesh has no vertex colors. Adding gradient coloring based on geometry...")
+        # Create a gradient color based on Y-axis (height) for better visualization
+        vertices = np.asarray(mesh_original.vertices)
+        y_coords = vertices[:, 1]
+        y_min, y_max = y_coords.min(), y_coords.max()
+        y_normalized = (y_coords - y_min) / (y_max - y_min + 1e-6)
+
+        # Create nice gradient: blue (bottom) -> cyan -> yellow -> red (top)
+        colors = np.zeros((len(vertices), 3))
+        colors[:, 0] = np.clip(y_normalized * 2, 0, 1)  # Red channel
+        colors[:, 1] = np.clip(1 - abs(y_normalized - 0.5) * 2, 0.3, 1)  # Green channel
+        colors[:, 2] = np.clip(1 - y_normalized * 2, 0, 1)  # Blue channel
+
+        mesh_original.vertex_colors = o3d.utility.Vector3dVector(colors)
+        print("Applied gradient coloring (blue=bottom, yellow/red=top)")
+
+    return mesh_original, cache_status
 
 # =============================================================================
 # TASK 2: Conversion to Point Cloud
 # =============================================================================
-print("TASK 2: CONVERSION TO POINT CLOUD")
-print("Converting mesh to point cloud by sampling vertices...")
-
-# First, sample point cloud from mesh vertices
-pcd_temp = mesh_original.sample_points_uniformly(number_of_points=10000)
 
-# Save the point cloud to a file
-pcd_file = "temp_coffee_cup.ply"
-o3d.io.write_point_cloud(pcd_file, pcd_temp)
-print(f"Point cloud saved to {pcd_file}")
+def sample_point_cloud(mesh, number_of_points=NUM_SAMPLE_POINTS, pcd_file=None):
+    """Sample the mesh surface into a point cloud.
 
-# Now read it back using o3d.io.read_point_cloud() as required
-print(f"Reading point cloud using o3d.io.read_point_cloud()...")
-pcd = o3d.io.read_point_cloud(pcd_file)
-print(f"Successfully loaded point cloud from file")
+    The cloud is handed to the next stages in memory. Only when pcd_file is
+    given is it saved as PLY and read back with o3d.io.read_point_cloud().
+    """
+    # First, sample point cloud from mesh vertices
+    pcd = mesh.sample_points_uniformly(number_of_points=number_of_points)
+    if pcd_file is None:
+        print("Point cloud kept in memory (no file requested)")
+        return pcd
 
-print_info("Point Cloud", pcd=pcd)
-print("\nDisplaying point cloud...")
-o3d.visualization.draw_geometries([pcd], 
-                                   window_name="Task 2: Point Cloud",
-                                   width=1024, height=768)
+    # Save the point cloud to a file
+    o3d.io.write_point_cloud(pcd_file, pcd)
+    print(f"Point cloud saved to {pcd_file}")
 
-print_separator()
+    # Now read it back using o3d.io.read_point_cloud() as required
+    print(f"Reading point cloud using o3d.io.read_point_cloud()...")
+    pcd = o3d.io.read_point_cloud(pcd_file)
+    print(f"Successfully loaded point cloud from file")
+    return pcd
 
 # =============================================================================
 # TASK 3: Surface Reconstruction from Point Cloud
 # =============================================================================
-print("TASK 3: SURFACE RECONSTRUCTION FROM POINT CLOUD")
-print("Reconstructing mesh using Poisson surface reconstruction...")
-
-# Estimate normals for point cloud
-pcd.estimate_normals(search_param=o3d.geometry.KDTreeSearchParamHybrid(
-    radius=0.5, max_nn=30))
-
-# Poisson reconstruction
-mesh_reconstructed, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(
-    pcd, depth=9)
-
-print("Removing low-density artifacts using bounding box crop...")
-
-# Remove artifacts by cropping based on original bounding box
-bbox = pcd.get_axis_aligned_bounding_box()
-mesh_reconstructed = mesh_reconstructed.crop(bbox)
-
-# Compute normals
-mesh_reconstructed.compute_vertex_normals()
-
-# Transfer colors from point cloud to reconstructed mesh
-# Poisson creates NEW vertices, so we need to find nearest point cloud point for each vertex
-print("Transferring colors from point cloud to reconstructed mesh...")
-if pcd.has_colors():
-    from scipy.spatial import KDTree
-    
-    # Get point cloud points and colors
-    pcd_points = np.asarray(pcd.points)
-    pcd_colors = np.asarray(pcd.colors)
-    
-    # Build KD-tree for fast nearest neighbor search
-    tree = KDTree(pcd_points)
-    
-    # Get reconstructed mesh vertices
-    mesh_vertices = np.asarray(mesh_reconstructed.vertices)
-    
-    # Find nearest point cloud point for each mesh vertex
-    distances, indices = tree.query(mesh_vertices)
-    
-    # Assign colors from nearest neighbors
-    mesh_colors = pcd_colors[indices]
-    mesh_reconstructed.vertex_colors = o3d.utility.Vector3dVector(mesh_colors)
-    
-    print(f"Colors transferred using nearest neighbor search (avg distance: {distances.mean():.4f})")
-else:
-    print("Point cloud has no colors, painting mesh with light gray...")
-    mesh_reconstructed.paint_uniform_color([0.7, 0.7, 0.7])
-
-print_info("Reconstructed Mesh (after cropping)", mesh=mesh_reconstructed)
-print("\nDisplaying reconstructed mesh...")
-o3d.visualization.draw_geometries([mesh_reconstructed], 
-                                   window_name="Task 3: Reconstructed Mesh",
-                                   width=1024, height=768)
-
-print_separator()
+
+def trim_low_density(mesh, densities, quantile=DENSITY_QUANTILE):
+    """Remove (in place) the vertices whose Poisson density is below the quantile; returns the count"""
+    densities = np.asarray(densities)
+    low = densities < np.quantile(densities, quantile)
+    if low.any():
+        mesh.remove_vertices_by_mask(low)
+    return int(low.sum())
+
+def reconstruct_surface(pcd, depth=POISSON_DEPTH, density_quantile=DENSITY_QUANTILE,
+                        normal_radius=NORMAL_RADIUS, normal_max_nn=NORMAL_MAX_NN):
+    """Poisson reconstruction trimmed to the supported surface, colored from the nearest points.
+
+    Returns (mesh, stats) where stats has the triangle counts before and after trimming.
+    """
+    # Estimate normals for point cloud
+    pcd.estimate_normals(search_param=o3d.geometry.KDTreeSearchParamHybrid(
+        radius=normal_radius, max_nn=normal_max_nn))
+
+    # Poisson reconstruction
+    mesh_reconstructed, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(
+        pcd, depth=depth)
+
+    poisson_triangles = len(mesh_reconstructed.triangles)
+
+    # Poisson extrapolates surface where there are few samples; those vertices
+    # get a low density, so they are cut by density instead of by bounding box
+    print(f"Removing low-density artifacts (below the {density_quantile:g} density quantile)...")
+    trimmed = trim_low_density(mesh_reconstructed, densities, density_quantile)
+    print(f"Triangles: {poisson_triangles} after Poisson (depth {depth}), "
+          f"{len(mesh_reconstructed.triangles)} after trimming {trimmed} vertices")
+
+    # One k-d tree over the cloud serves the artifact check and the color transfer
+    index = spatial_index.get_index(np.asarray(pcd.points))
+    far = index.far_from_cloud(np.asarray(mesh_reconstructed.vertices),
+                               k=ARTIFACT_NEIGHBORS, factor=ARTIFACT_DISTANCE_FACTOR)
+    if far.any():
+        mesh_reconstructed.remove_vertices_by_mask(far)
+    print(f"Removed {int(far.sum())} vertices far from the point cloud "
+          f"(> {ARTIFACT_DISTANCE_FACTOR:g} x spacing {index.spacing(ARTIFACT_NEIGHBORS):.4f})")
+
+    # Compute normals
+    mesh_reconstructed.compute_vertex_normals()
+
+    # Transfer colors from point cloud to reconstructed mesh
+    # Poisson creates NEW vertices, so colors are blended from the nearest cloud points
+    print("Transferring colors from point cloud to reconstructed mesh...")
+    if pcd.has_colors():
+        mesh_colors, avg_distance = index.transfer(np.asarray(pcd.colors),
+                                                   np.asarray(mesh_reconstructed.vertices),
+                                                   k=COLOR_NEIGHBORS)
+        mesh_reconstructed.vertex_colors = o3d.utility.Vector3dVector(mesh_colors)
+
+        print(f"Colors transferred from {COLOR_NEIGHBORS} nearest points "
+              f"(avg nearest distance: {avg_distance:.4f})")
+    else:
+        print("Point cloud has no colors, painting mesh with light gray...")
+        mesh_reconstructed.paint_uniform_color([0.7, 0.7, 0.7])
+
+    stats = {
+        'depth': depth,
+        'density_quantile': density_quantile,
+        'poisson_triangles': poisson_triangles,
+        'density_trimmed_vertices': trimmed,
+        'far_removed_vertices': int(far.sum()),
+    }
+    return mesh_reconstructed, stats
 
 # =============================================================================
 # TASK 4: Voxelization
 # =============================================================================
-print("TASK 4: VOXELIZATION")
-print("Converting point cloud to voxel grid...")
-
-voxel_size = 0.04  # Adjusted for smaller coffee cup model (slightly larger voxels)
-voxel_grid = o3d.geometry.VoxelGrid.create_from_point_cloud(pcd, voxel_size=voxel_size)
-
-print(f"Voxel size used: {voxel_size}")
-print_info("Voxel Grid", voxel=voxel_grid)
-if pcd.has_colors():
-    print("Voxels inherit colors from the colored point cloud")
-else:
-    print("Warning: Point cloud has no colors, voxels will be displayed without colors")
-print("\nDisplaying voxel grid...")
-o3d.visualization.draw_geometries([voxel_grid], 
-                                   window_name="Task 4: Voxel Grid",
-                                   width=1024, height=768)
 
-print_separator()
+def voxelize(pcd, voxel_size=VOXEL_SIZE):
+    """Convert the point cloud to a voxel grid (same grid as VoxelGrid.create_from_point_cloud)"""
+    origin, indices, voxel_colors = voxelizer.voxelize_arrays(
+        np.asarray(pcd.points), voxel_size,
+        colors=np.asarray(pcd.colors) if pcd.has_colors() else None)
+    return voxelizer.to_voxel_grid(origin, voxel_size, indices, voxel_colors)
 
 # =============================================================================
 # TASK 5: Adding a Plane
 # =============================================================================
-print("TASK 5: ADDING A PLANE")
-print("Creating a vertical plane that cuts through the object...")
-
-# Get bounding box to position plane
-bbox = pcd.get_axis_aligned_bounding_box()
-bbox_min = bbox.get_min_bound()
-bbox_max = bbox.get_max_bound()
-bbox_center = (bbox_min + bbox_max) / 2.0
-
-# Create a vertical plane mesh that intersects the object
-# Position plane at the exact center of the model
-plane_width = (bbox_max[2] - bbox_min[2]) * 1.5
-plane_height = (bbox_max[1] - bbox_min[1]) * 1.5
-plane_x = bbox_center[0]  # Cut through the exact center
-
-# Create plane as a thin mesh (very thin for coffee cup model)
-plane = o3d.geometry.TriangleMesh.create_box(width=0.001,  # Very thin plane
-                                              height=plane_height, 
-                                              depth=plane_width)
-plane.translate([plane_x, bbox_min[1] - plane_height*0.25, bbox_min[2] - plane_width*0.25])
-plane.paint_uniform_color([1.0, 0.3, 0.3])  # Red color to show cutting plane
-plane.compute_vertex_normals()
-
-print(f"Plane positioned at x={plane_x:.2f} (exact center of object)")
-print(f"Object X range: [{bbox_min[0]:.2f}, {bbox_max[0]:.2f}]")
-print(f"Object center X: {bbox_center[0]:.2f}")
-print(f"Plane dimensions: height={plane_height:.2f}, width={plane_width:.2f}")
-print("\nDisplaying object with cutting plane through the middle...")
-o3d.visualization.draw_geometries([pcd, plane], 
-                                   window_name="Task 5: Object with Cutting Plane",
-                                   width=1024, height=768)
-
-print_separator()
+
+def create_cutting_plane(pcd):
+    """Thin vertical box through the center of the cloud; returns (plane, plane_x)"""
+    # Get bounding box to position plane
+    bbox = pcd.get_axis_aligned_bounding_box()
+    bbox_min = bbox.get_min_bound()
+    bbox_max = bbox.get_max_bound()
+    bbox_center = (bbox_min + bbox_max) / 2.0
+
+    # Create a vertical plane mesh that intersects the object
+    # Position plane at the exact center of the model
+    plane_width = (bbox_max[2] - bbox_min[2]) * 1.5
+    plane_height = (bbox_max[1] - bbox_min[1]) * 1.5
+    plane_x = bbox_center[0]  # Cut through the exact center
+
+    # Create plane as a thin mesh (very thin for coffee cup model)
+    plane = o3d.geometry.TriangleMesh.create_box(width=0.001,  # Very thin plane
+                                                  height=plane_height,
+                                                  depth=plane_width)
+    plane.translate([plane_x, bbox_min[1] - plane_height*0.25, bbox_min[2] - plane_width*0.25])
+    plane.paint_uniform_color([1.0, 0.3, 0.3])  # Red color to show cutting plane
+    plane.compute_vertex_normals()
+
+    print(f"Plane positioned at x={plane_x:.2f} (exact center of object)")
+    print(f"Object X range: [{bbox_min[0]:.2f}, {bbox_max[0]:.2f}]")
+    print(f"Object center X: {bbox_center[0]:.2f}")
+    print(f"Plane dimensions: height={plane_height:.2f}, width={plane_width:.2f}")
+    return plane, plane_x
 
 # =============================================================================
 # TASK 6: Surface Clipping
 # =============================================================================
-print("TASK 6: SURFACE CLIPPING")
-print("Clipping the model: removing all points on the LEFT side of the plane...")
-print("Keeping only the RIGHT HALF of the model...")
-
-# Define clipping plane position (use the plane position from Task 5)
-clip_x = plane_x + 0.0005  # Add half the plane width for center position
-points = np.asarray(pcd.points)
-colors = np.asarray(pcd.colors) if pcd.has_colors() else None
-normals = np.asarray(pcd.normals) if pcd.has_normals() else None
-
-# Keep only points where x > clip_x (to the right of the plane)
-# This removes points on the left/negative side
-mask = points[:, 0] > clip_x
-clipped_points = points[mask]
-
-# Create clipped point cloud
-pcd_clipped = o3d.geometry.PointCloud()
-pcd_clipped.points = o3d.utility.Vector3dVector(clipped_points)
-
-if colors is not None:
-    pcd_clipped.colors = o3d.utility.Vector3dVector(colors[mask])
-
-if normals is not None:
-    pcd_clipped.normals = o3d.utility.Vector3dVector(normals[mask])
-
-print(f"\nClipping plane position: x={clip_x:.2f}")
-print(f"Points before clipping: {len(points)}")
-print(f"Points after clipping: {len(clipped_points)}")
-print(f"Points removed (left side): {len(points) - len(clipped_points)}")
-print_info("Clipped Point Cloud", pcd=pcd_clipped)
-
-# Convert to mesh for triangle count
-mesh_clipped = copy.deepcopy(mesh_reconstructed)
-mesh_vertices = np.asarray(mesh_clipped.vertices)
-vertex_mask = mesh_vertices[:, 0] > clip_x
-vertices_to_keep = np.where(vertex_mask)[0]
-
-mesh_clipped_simple = mesh_clipped.select_by_index(vertices_to_keep)
-mesh_clipped_simple.compute_vertex_normals()
-
-print(f"\nClipped mesh statistics:")
-print(f"  Triangles: {len(mesh_clipped_simple.triangles)}")
-print(f"  Has colors: {mesh_clipped_simple.has_vertex_colors()}")
-print(f"  Has normals: {mesh_clipped_simple.has_vertex_normals()}")
-
-print("\nDisplaying clipped model (RIGHT HALF only)...")
-print("Plane removed to show clean clipped result.")
-o3d.visualization.draw_geometries([pcd_clipped], 
-                                   window_name="Task 6: Clipped Model (Right Half)",
-                                   width=1024, height=768)
-
-print_separator()
+
+def clip_geometry(pcd, mesh_reconstructed, plane_x):
+    """Keep the points and the mesh surface right of the plane; returns (pcd_clipped, mesh_clipped)"""
+    # Define clipping plane position (use the plane position from Task 5)
+    clip_x = plane_x + 0.0005  # Add half the plane width for center position
+    # Keep the positive X side (to the right of the plane); removes the left side
+    plane_point = [clip_x, 0.0, 0.0]
+    plane_normal = [1.0, 0.0, 0.0]
+
+    pcd_clipped = mesh_clipping.clip_point_cloud(pcd, plane_point, plane_normal)
+    num_points = len(pcd.points)
+
+    print(f"\nClipping plane position: x={clip_x:.2f}")
+    print(f"Points before clipping: {num_points}")
+    print(f"Points after clipping: {len(pcd_clipped.points)}")
+    print(f"Points removed (left side): {num_points - len(pcd_clipped.points)}")
+    print_info("Clipped Point Cloud", pcd=pcd_clipped)
+
+    # Triangles crossing the plane are cut along it (colors and normals interpolated)
+    mesh_clipped = mesh_clipping.clip_mesh(mesh_reconstructed, plane_point, plane_normal)
+    if not mesh_clipped.has_vertex_normals():
+        mesh_clipped.compute_vertex_normals()
+
+    print(f"\nClipped mesh statistics:")
+    print(f"  Triangles: {len(mesh_clipped.triangles)}")
+    print(f"  Has colors: {mesh_clipped.has_vertex_colors()}")
+    print(f"  Has normals: {mesh_clipped.has_vertex_normals()}")
+    return pcd_clipped, mesh_clipped
 
 # =============================================================================
 # TASK 7: Working with Color and Extremes
 # =============================================================================
-print("TASK 7: WORKING WITH COLOR AND EXTREMES")
-print("Applying gradient coloring and finding extreme points...")
-
-# Use original point cloud for this task
-points = np.asarray(pcd.points)
-
-# Apply gradient along Z axis
-z_coords = points[:, 2]
-z_min = z_coords.min()
-z_max = z_coords.max()
-
-# Normalize Z coordinates to [0, 1] for gradient
-z_normalized = (z_coords - z_min) / (z_max - z_min)
-
-# Create gradient colors (blue to red)
-colors = np.zeros((len(points), 3))
-colors[:, 0] = z_normalized  # Red channel
-colors[:, 2] = 1 - z_normalized  # Blue channel
-
-# Create colored point cloud
-pcd_colored = o3d.geometry.PointCloud()
-pcd_colored.points = o3d.utility.Vector3dVector(points)
-pcd_colored.colors = o3d.utility.Vector3dVector(colors)
-
-# Find extreme points along Z axis
-# np.argmin() returns the index of the minimum value in the array
-min_idx = np.argmin(z_coords)  # Index of point with smallest Z coordinate
-# np.argmax() returns the index of the maximum value in the array
-max_idx = np.argmax(z_coords)  # Index of point with largest Z coordinate
-
-# Get the full 3D coordinates of the extreme points
-min_point = points[min_idx]  # The actual (x, y, z) point with minimum Z
-max_point = points[max_idx]  # The actual (x, y, z) point with maximum Z
-
-print(f"Gradient applied along Z axis")
-print(f"Z range: [{z_min:.4f}, {z_max:.4f}]")
-print(f"\nExtreme point coordinates:")
-print(f"  Minimum Z point: ({min_point[0]:.4f}, {min_point[1]:.4f}, {min_point[2]:.4f})")
-print(f"  Maximum Z point: ({max_point[0]:.4f}, {max_point[1]:.4f}, {max_point[2]:.4f})")
-
-# Create spheres to highlight extreme points (smaller for coffee cup model)
-sphere_min = o3d.geometry.TriangleMesh.create_sphere(radius=0.02)  # Smaller sphere
-sphere_min.translate(min_point)
-sphere_min.paint_uniform_color([0, 1, 0])  # Green for minimum
-sphere_min.compute_vertex_normals()
-
-sphere_max = o3d.geometry.TriangleMesh.create_sphere(radius=0.02)  # Smaller sphere
-sphere_max.translate(max_point)
-sphere_max.paint_uniform_color([1, 1, 0])  # Yellow for maximum
-sphere_max.compute_vertex_normals()
-
-print("\nDisplaying colored model with extreme points highlighted...")
-print("Green sphere = Minimum Z, Yellow sphere = Maximum Z")
-o3d.visualization.draw_geometries([pcd_colored, sphere_min, sphere_max], 
-                                   window_name="Task 7: Gradient and Extremes (View 1)",
-                                   width=1024, height=768)
-
-# Alternative view with wireframe cubes (smaller for coffee cup model)
-cube_size = 0.04  # Smaller cubes for coffee cup
-cube_min = o3d.geometry.TriangleMesh.create_box(width=cube_size, height=cube_size, depth=cube_size)
-cube_min.translate(min_point - np.array([cube_size/2, cube_size/2, cube_size/2]))
-cube_min.paint_uniform_color([0, 1, 0])
-cube_min_wireframe = o3d.geometry.LineSet.create_from_triangle_mesh(cube_min)
-
-cube_max = o3d.geometry.TriangleMesh.create_box(width=cube_size, height=cube_size, depth=cube_size)
-cube_max.translate(max_point - np.array([cube_size/2, cube_size/2, cube_size/2]))
-cube_max.paint_uniform_color([1, 1, 0])
-cube_max_wireframe = o3d.geometry.LineSet.create_from_triangle_mesh(cube_max)
-
-print("\nDisplaying alternative view with wireframe cubes...")
-o3d.visualization.draw_geometries([pcd_colored, cube_min_wireframe, cube_max_wireframe], 
-                                   window_name="Task 7: Gradient and Extremes (View 2 - Wireframe)",
-                                   width=1024, height=768)
-
-print_separator()
-print("ASSIGNMENT COMPLETED SUCCESSFULLY!")
-print("All 7 tasks have been executed and visualized.")
-
-# Clean up temporary files
-print("\nCleaning up temporary files...")
-if os.path.exists(pcd_file):
-    os.remove(pcd_file)
-    print(f"Removed temporary file: {pcd_file}")
-
-print_separator()
 
+def color_by_height_and_find_extremes(pcd):
+    """Blue-to-red gradient along Z plus the min/max Z points; returns (pcd_colored, min_point, max_point)"""
+    # Use original point cloud for this task
+    points = np.asarray(pcd.points)
+
+    # Apply gradient along Z axis
+    z_coords = points[:, 2]
+    z_min = z_coords.min()
+    z_max = z_coords.max()
+
+    # Normalize Z coordinates to [0, 1] for gradient
+    z_normalized = (z_coords - z_min) / (z_max - z_min)
+
+    # Create gradient colors (blue to red)
+    colors = np.zeros((len(points), 3))
+    colors[:, 0] = z_normalized  # Red channel
+    colors[:, 2] = 1 - z_normalized  # Blue channel
+
+    # Create colored point cloud
+    pcd_colored = o3d.geometry.PointCloud()
+    pcd_colored.points = o3d.utility.Vector3dVector(points)
+    pcd_colored.colors = o3d.utility.Vector3dVector(colors)
+
+    # Find extreme points along Z axis
+    # np.argmin() returns the index of the minimum value in the array
+    min_idx = np.argmin(z_coords)  # Index of point with smallest Z coordinate
+    # np.argmax() returns the index of the maximum value in the array
+    max_idx = np.argmax(z_coords)  # Index of point with largest Z coordinate
+
+    # Get the full 3D coordinates of the extreme points
+    min_point = points[min_idx]  # The actual (x, y, z) point with minimum Z
+    max_point = points[max_idx]  # The actual (x, y, z) point with maximum Z
+
+    print(f"Gradient applied along Z axis")
+    print(f"Z range: [{z_min:.4f}, {z_max:.4f}]")
+    print(f"\nExtreme point coordinates:")
+    print(f"  Minimum Z point: ({min_point[0]:.4f}, {min_point[1]:.4f}, {min_point[2]:.4f})")
+    print(f"  Maximum Z point: ({max_point[0]:.4f}, {max_point[1]:.4f}, {max_point[2]:.4f})")
+    return pcd_colored, min_point, max_point
+
+def build_lod_chain(pcd, params, levels=LOD_LEVELS, density_quantile=DENSITY_QUANTILE):
+    """Coarse reconstructions and voxel grids, one dict per level, coarsest first.
+
+    Level n is reconstructed directly from the cloud at Poisson depth
+    params['depth'] - n, so it never needs the full-resolution mesh: the
+    coarsest level is ready after a fraction of the full reconstruction time.
+    """
+    chain = []
+    for level in range(levels, 0, -1):
+        started = time.perf_counter()
+        depth = max(params['depth'] - level, 1)
+        mesh, _ = reconstruct_surface(pcd, depth, density_quantile,
+                                      normal_radius=params['normal_radius'],
+                                      normal_max_nn=params['normal_max_nn'])
+        grid = voxelize(pcd, params['voxel_size'] * 2 ** level)
+        chain.append({
+            'level': level,
+            'depth': depth,
+            'mesh': mesh,
+            'voxel_grid': grid,
+            'ms': round((time.perf_counter() - started) * 1000, 3),
+        })
+    return chain
+
+def write_lod_chain(chain, lod_dir, model_name):
+    """Write every LOD mesh and voxel grid as PLY; returns the file paths"""
+    os.makedirs(lod_dir, exist_ok=True)
+    paths = []
+    for entry in chain:
+        mesh_file = os.path.join(lod_dir, f"{model_name}_lod{entry['level']}_mesh.ply")
+        voxel_file = os.path.join(lod_dir, f"{model_name}_lod{entry['level']}_voxels.ply")
+        o3d.io.write_triangle_mesh(mesh_file, entry['mesh'])
+        o3d.io.write_voxel_grid(voxel_file, entry['voxel_grid'])
+        paths += [mesh_file, voxel_file]
+    return paths
+
+def extreme_markers(min_point, max_point, radius=MARKER_SIZE):
+    """Spheres and wireframe cubes marking the extreme points (green = min, yellow = max)"""
+    # Create spheres to highlight extreme points (smaller for coffee cup model)
+    sphere_min = o3d.geometry.TriangleMesh.create_sphere(radius=radius)
+    sphere_min.translate(min_point)
+    sphere_min.paint_uniform_color([0, 1, 0])  # Green for minimum
+    sphere_min.compute_vertex_normals()
+
+    sphere_max = o3d.geometry.TriangleMesh.create_sphere(radius=radius)
+    sphere_max.translate(max_point)
+    sphere_max.paint_uniform_color([1, 1, 0])  # Yellow for maximum
+    sphere_max.compute_vertex_normals()
+
+    # Alternative view with wireframe cubes (smaller for coffee cup model)
+    cube_size = radius * 2  # Smaller cubes for coffee cup
+    cube_min = o3d.geometry.TriangleMesh.create_box(width=cube_size, height=cube_size, depth=cube_size)
+    cube_min.translate(min_point - np.array([cube_size/2, cube_size/2, cube_size/2]))
+    cube_min.paint_uniform_color([0, 1, 0])
+    cube_min_wireframe = o3d.geometry.LineSet.create_from_triangle_mesh(cube_min)
+
+    cube_max = o3d.geometry.TriangleMesh.create_box(width=cube_size, height=cube_size, depth=cube_size)
+    cube_max.translate(max_point - np.array([cube_size/2, cube_size/2, cube_size/2]))
+    cube_max.paint_uniform_color([1, 1, 0])
+    cube_max_wireframe = o3d.geometry.LineSet.create_from_triangle_mesh(cube_max)
+
+    return (sphere_min, sphere_max), (cube_min_wireframe, cube_max_wireframe)
+
+# =============================================================================
+# Pipeline
+# =============================================================================
+
+def run_pipeline(model_path=DEFAULT_MODEL_PATH, viewer=None, report_file=None, pcd_file=None,
+                 cache_dir=obj_loader.CACHE_DIR, adaptive=True, depth=None, voxel_size=None,
+                 density_quantile=DENSITY_QUANTILE, lod_dir=None, lod_levels=LOD_LEVELS,
+                 preview_only=False):
+    """Run all 7 tasks on one model and return the report dict.
+
+    viewer decides how each step is shown (default: interactive windows).
+    Stage timings exclude the time spent in the viewer; PNG render time is
+    reported separately. The report is also written to report_file if given.
+    The sampled point cloud is only written to disk when pcd_file is given.
+    Parsed OBJ geometry is cached in cache_dir (None disables the cache).
+    Reconstruction parameters are derived from the sampled cloud (adaptive)
+    or taken from the fixed constants; depth and voxel_size override either.
+    density_quantile controls the Poisson trim. With lod_dir, a chain of
+    lod_levels coarser meshes and voxel grids is reconstructed before the
+    full-resolution mesh and written there; preview_only stops after it.
+    """
+    viewer = viewer or Viewer('interactive')
+    timer = StageTimer()
+    started = time.perf_counter()
+
+    print("Starting Assignment #5: 3D Object Processing")
+    print_separator()
+
+    print("TASK 1: LOADING AND VISUALIZATION")
+    print("Loading the 3D coffee cup model from OBJ file...")
+    with timer.stage('load') as record:
+        mesh_original, cache_status = load_mesh(model_path, cache_dir)
+        record.update(geometry_stats(mesh_original))
+        record['cache'] = cache_status
+    print_info("Original Mesh", mesh=mesh_original)
+    print("\nDisplaying original model...")
+    viewer.show([mesh_original], "Task 1: Original Model", "task1_original.png")
+    print_separator()
+
+    print("TASK 2: CONVERSION TO POINT CLOUD")
+    print("Converting mesh to point cloud by sampling vertices...")
+    with timer.stage('sample') as record:
+        pcd = sample_point_cloud(mesh_original, pcd_file=pcd_file)
+        record.update(geometry_stats(pcd))
+        record['point_cloud_file'] = pcd_file
+    print_info("Point Cloud", pcd=pcd)
+    print("\nDisplaying point cloud...")
+    viewer.show([pcd], "Task 2: Point Cloud", "task2_point_cloud.png")
+    print_separator()
+
+    print("Choosing reconstruction parameters...")
+    with timer.stage('parameters') as record:
+        params = derive_parameters(pcd) if adaptive else fixed_parameters()
+        if depth is not None:
+            params['depth'] = depth
+        if voxel_size is not None:
+            params['voxel_size'] = voxel_size
+        record.update(params)
+    print(f"{'Adaptive' if adaptive else 'Fixed'} parameters: normal radius {params['normal_radius']:.4f}, "
+          f"depth {params['depth']}, voxel size {params['voxel_size']:.4f}, "
+          f"marker size {params['marker_size']:.4f}")
+    print_separator()
+
+    lod_files = []
+    if lod_dir:
+        print("LEVEL-OF-DETAIL PREVIEWS")
+        print("Reconstructing coarse levels before the full-resolution mesh...")
+        with timer.stage('lod') as record:
+            chain = build_lod_chain(pcd, params, lod_levels, density_quantile)
+            model_name = os.path.splitext(os.path.basename(model_path))[0]
+            lod_files = write_lod_chain(chain, lod_dir, model_name)
+            record['levels'] = [{'level': entry['level'],
+                                 'depth': entry['depth'],
+                                 'triangles': len(entry['mesh'].triangles),
+                                 'voxels': len(entry['voxel_grid'].get_voxels()),
+                                 'ms': entry['ms']} for entry in chain]
+        for level in record['levels']:
+            print(f"LOD {level['level']}: depth {level['depth']}, {level['triangles']} triangles, "
+                  f"{level['voxels']} voxels ({level['ms']:.1f} ms)")
+        print(f"LOD meshes and voxel grids written to {lod_dir}")
+        print("\nDisplaying coarsest preview...")
+        viewer.show([chain[0]['mesh']], f"Preview: LOD {chain[0]['level']}",
+                    f"lod{chain[0]['level']}_preview.png")
+        print_separator()
+        if preview_only:
+            print("Preview only: skipping the full-resolution reconstruction and Tasks 3-7")
+            return finish_report(model_path, viewer, timer, started, report_file,
+                                 ([pcd_file] if pcd_file else []) + lod_files)
+
+    print("TASK 3: SURFACE RECONSTRUCTION FROM POINT CLOUD")
+    print("Reconstructing mesh using Poisson surface reconstruction...")
+    with timer.stage('reconstruct') as record:
+        mesh_reconstructed, trim_stats = reconstruct_surface(
+            pcd, params['depth'], density_quantile,
+            normal_radius=params['normal_radius'], normal_max_nn=params['normal_max_nn'])
+        record.update(geometry_stats(mesh_reconstructed))
+        record.update(trim_stats)
+    print_info("Reconstructed Mesh (after trimming)", mesh=mesh_reconstructed)
+    print("\nDisplaying reconstructed mesh...")
+    viewer.show([mesh_reconstructed], "Task 3: Reconstructed Mesh", "task3_reconstructed.png")
+    print_separator()
+
+    print("TASK 4: VOXELIZATION")
+    print("Converting point cloud to voxel grid...")
+    with timer.stage('voxelize') as record:
+        voxel_grid = voxelize(pcd, params['voxel_size'])
+        record.update(geometry_stats(voxel_grid))
+    print(f"Voxel size used: {voxel_grid.voxel_size}")
+    print_info("Voxel Grid", voxel=voxel_grid)
+    if pcd.has_colors():
+        print("Voxels inherit colors from the colored point cloud")
+    else:
+        print("Warning: Point cloud has no colors, voxels will be displayed without colors")
+    print("\nDisplaying voxel grid...")
+    viewer.show([voxel_grid], "Task 4: Voxel Grid", "task4_voxel_grid.png")
+    print_separator()
+
+    print("TASK 5: ADDING A PLANE")
+    print("Creating a vertical plane that cuts through the object...")
+    with timer.stage('plane') as record:
+        plane, plane_x = create_cutting_plane(pcd)
+        record['plane_x'] = float(plane_x)
+    print("\nDisplaying object with cutting plane through the middle...")
+    viewer.show([pcd, plane], "Task 5: Object with Cutting Plane", "task5_cutting_plane.png")
+    print_separator()
+
+    print("TASK 6: SURFACE CLIPPING")
+    print("Clipping the model: removing all points on the LEFT side of the plane...")
+    print("Keeping only the RIGHT HALF of the model...")
+    with timer.stage('clip') as record:
+        pcd_clipped, mesh_clipped = clip_geometry(pcd, mesh_reconstructed, plane_x)
+        record['points'] = len(pcd_clipped.points)
+        record['triangles'] = len(mesh_clipped.triangles)
+    print("\nDisplaying clipped model (RIGHT HALF only)...")
+    print("Plane removed to show clean clipped result.")
+    viewer.show([pcd_clipped], "Task 6: Clipped Model (Right Half)", "task6_clipped.png")
+    print_separator()
+
+    print("TASK 7: WORKING WITH COLOR AND EXTREMES")
+    print("Applying gradient coloring and finding extreme points...")
+    with timer.stage('extremes') as record:
+        pcd_colored, min_point, max_point = color_by_height_and_find_extremes(pcd)
+        spheres, cubes = extreme_markers(min_point, max_point, params['marker_size'])
+        record['min_z_point'] = min_point.tolist()
+        record['max_z_point'] = max_point.tolist()
+
+    print("\nDisplaying colored model with extreme points highlighted...")
+    print("Green sphere = Minimum Z, Yellow sphere = Maximum Z")
+    viewer.show([pcd_colored, *spheres], "Task 7: Gradient and Extremes (View 1)",
+                "task7_extremes_spheres.png")
+
+    print("\nDisplaying alternative view with wireframe cubes...")
+    viewer.show([pcd_colored, *cubes], "Task 7: Gradient and Extremes (View 2 - Wireframe)",
+                "task7_extremes_wireframe.png")
+
+    print_separator()
+    print("ASSIGNMENT COMPLETED SUCCESSFULLY!")
+    print("All 7 tasks have been executed and visualized.")
+
+    print_separator()
+
+    return finish_report(model_path, viewer, timer, started, report_file,
+                         ([pcd_file] if pcd_file else []) + lod_files)
+
+def finish_report(model_path, viewer, timer, started, report_file, outputs):
+    """Build the pipeline report (written to report_file if given) and return it"""
+    total_ms = (time.perf_counter() - started) * 1000
+    report = {
+        'model': model_path,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'viewer': viewer.mode,
+        'stages': timer.stages,
+        'compute_ms': round(sum(record['ms'] for record in timer.stages.values()), 3),
+        'render_ms': round(viewer.render_ms, 3),
+        'total_ms': round(total_ms, 3),
+        'outputs': viewer.outputs + outputs,
+    }
+    if report_file:
+        write_report(report, report_file)
+    return report
+
+def write_report(report, report_file):
+    """Write the pipeline report as JSON"""
+    report_dir = os.path.dirname(report_file)
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written: {report_file}")
+
+def print_stage_timings(report):
+    """Print the per-stage timing table"""
+    print(f"{'Stage':<14} {'ms':>10}")
+    print("-" * 25)
+    for name, record in report['stages'].items():
+        print(f"{name:<14} {record['ms']:>10.1f}")
+    print("-" * 25)
+    print(f"{'compute':<14} {report['compute_ms']:>10.1f}")
+    if report['render_ms']:
+        print(f"{'png render':<14} {report['render_ms']:>10.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Assignment 5: 3D object processing pipeline")
+    parser.add_argument('model', nargs='?', default=DEFAULT_MODEL_PATH,
+                        help=f"OBJ model to process (default: {DEFAULT_MODEL_PATH})")
+    view = parser.add_mutually_exclusive_group()
+    view.add_argument('--headless', action='store_true',
+                      help="do not open any viewer windows")
+    view.add_argument('--png', metavar='DIR',
+                      help="render every view to a PNG in DIR instead of opening windows")
+    parser.add_argument('--save-point-cloud', metavar='PLY',
+                        help="also write the sampled point cloud to PLY and read it back from there")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="parse the OBJ file without reading or writing the geometry cache")
+    parser.add_argument('--fixed-params', action='store_true',
+                        help="use the hand-tuned coffee cup parameters instead of deriving them from the cloud")
+    parser.add_argument('--depth', type=int,
+                        help="Poisson octree depth (default: derived from the point spacing)")
+    parser.add_argument('--voxel-size', type=float,
+                        help="voxel size (default: derived from the bounding-box diagonal)")
+    parser.add_argument('--density-quantile', type=float, default=DENSITY_QUANTILE,
+                        help=f"trim Poisson vertices below this density quantile, 0 keeps all "
+                             f"(default: {DENSITY_QUANTILE})")
+    parser.add_argument('--lod', metavar='DIR',
+                        help=f"first reconstruct {LOD_LEVELS} coarser levels of detail and write them to DIR")
+    parser.add_argument('--preview-only', action='store_true',
+                        help="stop after the --lod previews, without the full-resolution reconstruction")
+    parser.add_argument('--report', help="JSON report path (default: <output dir>/<model>_report.json)")
+    args = parser.parse_args()
+    if args.preview_only and not args.lod:
+        parser.error("--preview-only requires --lod DIR")
+
+    if args.png:
+        viewer = Viewer('png', args.png)
+    elif args.headless:
+        viewer = Viewer('none')
+    else:
+        viewer = Viewer('interactive')
+
+    model_name = os.path.splitext(os.path.basename(args.model))[0]
+    report_file = args.report or os.path.join(args.png or OUTPUT_DIR, f"{model_name}_report.json")
+    report = run_pipeline(args.model, viewer=viewer, report_file=report_file,
+                          pcd_file=args.save_point_cloud,
+                          cache_dir=None if args.no_cache else obj_loader.CACHE_DIR,
+                          adaptive=not args.fixed_params, depth=args.depth,
+                          voxel_size=args.voxel_size, density_quantile=args.density_quantile,
+                          lod_dir=args.lod, preview_only=args.preview_only)
+    print_stage_timings(report)
+
+if __name__ == "__main__":
+    main()
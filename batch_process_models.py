@@ -0,0 +1,191 @@
+"""
+Batch processing of OBJ models through the Assignment 5 pipeline
+
+This script:
+- Collects models from directories (searched recursively for *.obj), glob
+  patterns or file paths
+- Runs load -> sample -> Poisson -> voxelize -> clip -> extremes for every model
+  in a process pool without viewer windows, optionally rendering the PNG views
+- Splits the CPU cores between the workers (OMP_NUM_THREADS) so Open3D's own
+  threads and the k-NN queries of spatial_index.py do not oversubscribe the
+  machine
+- Writes each model's console output, report and images to its own folder and
+  one record per model (counts, timings, output paths, errors) to a summary JSON
+
+Usage:
+    python batch_process_models.py assignment_5/Assignment5/object [--workers N] [--png]
+"""
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from datetime import datetime
+
+BATCH_OUTPUT_DIR = os.path.join("assignment_5", "output", "batch")
+SUMMARY_FILE = "batch_summary.json"
+
+
+def find_models(inputs):
+    """Model paths from directories, glob patterns and files, sorted and without duplicates"""
+    models = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            models.update(glob.glob(os.path.join(item, '**', '*.obj'), recursive=True))
+        elif glob.has_magic(item):
+            models.update(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        elif os.path.isfile(item):
+            models.add(item)
+        else:
+            print(f"Warning: no model found at {item}")
+    return sorted(models)
+
+
+def model_output_dirs(models, output_dir):
+    """One output folder per model, named after the file (suffixed when names repeat)"""
+    dirs = {}
+    used = set()
+    for model_path in models:
+        name = os.path.splitext(os.path.basename(model_path))[0]
+        candidate, n = name, 2
+        while candidate in used:
+            candidate, n = f"{name}_{n}", n + 1
+        used.add(candidate)
+        dirs[model_path] = os.path.join(output_dir, candidate)
+    return dirs
+
+
+def _init_worker(threads):
+    # Must happen before Open3D (and its OpenMP runtime) is imported in this process
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+
+
+def process_model(model_path, output_dir, render_png=False):
+    """Run the pipeline on one model in a worker process and return its summary record"""
+    os.makedirs(output_dir, exist_ok=True)
+    log_file = os.path.join(output_dir, 'pipeline.log')
+    report_file = os.path.join(output_dir, 'report.json')
+    record = {'model': model_path, 'status': 'ok', 'output_dir': output_dir, 'log': log_file}
+    started = time.perf_counter()
+
+    try:
+        import open3d as o3d
+        import assignment5_solution_coffeecup as pipeline
+
+        o3d.utility.set_verbosity_level(o3d.utility.VerbosityLevel.Error)
+        with open(log_file, 'w', encoding='utf-8') as log, redirect_stdout(log):
+            viewer = pipeline.Viewer('png', output_dir) if render_png else pipeline.Viewer('none')
+            report = pipeline.run_pipeline(model_path, viewer=viewer, report_file=report_file)
+
+        stages = report['stages']
+        record['counts'] = {
+            'mesh_vertices': stages['load']['vertices'],
+            'mesh_triangles': stages['load']['triangles'],
+            'points': stages['sample']['points'],
+            'poisson_triangles': stages['reconstruct']['poisson_triangles'],
+            'reconstructed_triangles': stages['reconstruct']['triangles'],
+            'voxels': stages['voxelize']['voxels'],
+            'clipped_points': stages['clip']['points'],
+            'clipped_triangles': stages['clip']['triangles'],
+        }
+        record['timings_ms'] = {name: stage['ms'] for name, stage in stages.items()}
+        record['render_ms'] = report['render_ms']
+        record['outputs'] = report['outputs'] + [report_file]
+    except Exception as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+
+    record['wall_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    return record
+
+
+def run_batch(models, output_dir=BATCH_OUTPUT_DIR, workers=None, render_png=False):
+    """Process models in a spawn process pool; returns the summary dict (records in input order)"""
+    cpu_count = os.cpu_count() or 1
+    workers = max(1, min(workers or cpu_count, len(models)))
+    threads = max(1, cpu_count // workers)
+    dirs = model_output_dirs(models, output_dir)
+
+    started = time.perf_counter()
+    records = {}
+    # spawn: each worker starts clean and reads OMP_NUM_THREADS before loading Open3D
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(threads,)) as executor:
+        futures = {executor.submit(process_model, model_path, dirs[model_path], render_png): model_path
+                   for model_path in models}
+        for future in as_completed(futures):
+            model_path = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. a crash inside Open3D)
+                record = {'model': model_path, 'status': 'error',
+                          'output_dir': dirs[model_path], 'error': f"{type(e).__name__}: {e}"}
+            records[model_path] = record
+            print_record(record)
+
+    wall_ms = (time.perf_counter() - started) * 1000
+    ordered = [records[model_path] for model_path in models]
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'workers': workers,
+        'threads_per_worker': threads,
+        'render_png': render_png,
+        'models': len(models),
+        'failed': sum(1 for record in ordered if record['status'] != 'ok'),
+        'wall_ms': round(wall_ms, 3),
+        'models_per_minute': round(len(models) / (wall_ms / 60000), 2) if wall_ms else None,
+        'results': ordered,
+    }
+
+
+def print_record(record):
+    """One console line per finished model"""
+    name = os.path.basename(record['model'])
+    if record['status'] == 'ok':
+        counts = record['counts']
+        print(f"  {name:<32} {record['wall_ms']:>10.1f} ms  "
+              f"{counts['points']} points, {counts['reconstructed_triangles']} triangles, "
+              f"{counts['voxels']} voxels")
+    else:
+        print(f"  {name:<32} FAILED: {record['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Assignment 5 pipeline on many OBJ models")
+    parser.add_argument('inputs', nargs='+', help="directories, glob patterns or OBJ files")
+    parser.add_argument('--workers', type=int, help="worker processes (default: CPU count)")
+    parser.add_argument('--png', action='store_true', help="also render the 8 views per model to PNG")
+    parser.add_argument('--output-dir', default=BATCH_OUTPUT_DIR,
+                        help=f"base folder for per-model outputs (default: {BATCH_OUTPUT_DIR})")
+    parser.add_argument('--summary', help=f"summary JSON path (default: <output dir>/{SUMMARY_FILE})")
+    args = parser.parse_args()
+
+    models = find_models(args.inputs)
+    if not models:
+        print("No OBJ models found.")
+        return
+
+    print(f"Processing {len(models)} model(s)...")
+    summary = run_batch(models, args.output_dir, args.workers, args.png)
+
+    summary_file = args.summary or os.path.join(args.output_dir, SUMMARY_FILE)
+    summary_dir = os.path.dirname(summary_file)
+    if summary_dir:
+        os.makedirs(summary_dir, exist_ok=True)
+    with open(summary_file, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\n{summary['models']} model(s), {summary['failed']} failed, "
+          f"{summary['wall_ms'] / 1000:.1f} s with {summary['workers']} worker(s) "
+          f"x {summary['threads_per_worker']} thread(s)")
+    print(f"Summary written: {summary_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Benchmark for the stages of the Assignment 5 pipeline
+
+This script:
+- Runs each stage of assignment5_solution_coffeecup.py (OBJ load, sampling,
+  parameters, normal estimation, Poisson + trim, k-NN color transfer,
+  voxelization, clipping, extremes) on procedurally generated tori of growing
+  size and on the bundled coffee cup, so no extra assets are needed
+- Records the median wall time and the peak memory of every stage; the peak is
+  the process's resident-set high-water mark above its size before the stage
+  (reset through /proc/self/clear_refs, so it includes Open3D's C++
+  allocations; not available outside Linux)
+- Writes the results to JSON and compares them with a stored baseline,
+  flagging stages that got slower or use more memory than the tolerance allows
+  (the exit status is 1 when something regressed)
+
+Usage:
+    python benchmark_stages.py [--sizes small medium large] [--no-cup] [--repeat N]
+    python benchmark_stages.py --save-baseline
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import re
+import statistics
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+import numpy as np
+import open3d as o3d
+
+import assignment5_solution_coffeecup as pipeline
+import mesh_clipping
+import spatial_index
+
+RESULTS_FILE = os.path.join("assignment_5", "output", "benchmark_results.json")
+BASELINE_FILE = os.path.join("assignment_5", "benchmark_baseline.json")
+
+# Synthetic cases: name -> (sampled points, mesh triangles)
+SYNTHETIC_SIZES = {
+    'small': (5_000, 20_000),
+    'medium': (20_000, 80_000),
+    'large': (80_000, 320_000),
+}
+DEFAULT_SIZES = ('small', 'medium')
+
+# A stage regresses when it is this much slower / bigger than the baseline and
+# also above the absolute noise floor
+TIME_TOLERANCE = 0.25
+MIN_TIME_DELTA_MS = 5.0
+MEMORY_TOLERANCE = 0.25
+MIN_MEMORY_DELTA_MB = 8.0
+
+CLEAR_REFS = '/proc/self/clear_refs'
+STATUS = '/proc/self/status'
+
+
+def _status_kb(field):
+    with open(STATUS, 'r') as f:
+        match = re.search(rf'^{field}:\s+(\d+)', f.read(), re.MULTILINE)
+    return int(match.group(1)) if match else None
+
+
+def _reset_peak():
+    """Reset the resident-set high-water mark; False where that is not supported"""
+    try:
+        with open(CLEAR_REFS, 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def measure(task, repeat):
+    """Run task() repeat times; returns (last result, median ms, peak MB above the starting RSS)"""
+    times = []
+    peak_mb = None
+    result = None
+    for _ in range(repeat):
+        tracked = _reset_peak()
+        rss_before = _status_kb('VmRSS') if tracked else None
+        started = time.perf_counter()
+        with redirect_stdout(io.StringIO()):
+            result = task()
+        times.append((time.perf_counter() - started) * 1000)
+        if tracked:
+            run_mb = max(_status_kb('VmHWM') - rss_before, 0) / 1024
+            peak_mb = run_mb if peak_mb is None else max(peak_mb, run_mb)
+    return result, round(statistics.median(times), 3), None if peak_mb is None else round(peak_mb, 1)
+
+
+def synthetic_mesh(triangles):
+    """Colored torus with about the given number of triangles"""
+    radial = max(int(np.sqrt(triangles)), 8)
+    tubular = max(triangles // (2 * radial), 4)
+    mesh = o3d.geometry.TriangleMesh.create_torus(torus_radius=1.0, tube_radius=0.35,
+                                                  radial_resolution=radial,
+                                                  tubular_resolution=tubular)
+    vertices = np.asarray(mesh.vertices)
+    span = np.ptp(vertices, axis=0)
+    mesh.vertex_colors = o3d.utility.Vector3dVector((vertices - vertices.min(axis=0)) / span)
+    mesh.compute_vertex_normals()
+    return mesh
+
+
+def benchmark_case(mesh, num_points, repeat, model_path=None):
+    """Time every stage on one mesh; returns {stage: {'ms', 'peak_mb'}}"""
+    stages = {}
+
+    def run(name, task):
+        result, ms, peak_mb = measure(task, repeat)
+        stages[name] = {'ms': ms, 'peak_mb': peak_mb}
+        return result
+
+    if model_path is not None:
+        # Parse from scratch: the cache would turn this into a file read
+        mesh, _ = run('load', lambda: pipeline.load_mesh(model_path, cache_dir=None))
+
+    pcd = run('sample', lambda: pipeline.sample_point_cloud(mesh, num_points))
+
+    def derive_parameters():
+        # Start cold every run: repeats would otherwise reuse the cached k-d tree
+        spatial_index.clear_cache()
+        return pipeline.derive_parameters(pcd)
+    params = run('parameters', derive_parameters)
+
+    def estimate_normals():
+        pcd.estimate_normals(search_param=o3d.geometry.KDTreeSearchParamHybrid(
+            radius=params['normal_radius'], max_nn=params['normal_max_nn']))
+    run('normals', estimate_normals)
+
+    def poisson():
+        reconstructed, densities = o3d.geometry.TriangleMesh.create_from_point_cloud_poisson(
+            pcd, depth=params['depth'])
+        pipeline.trim_low_density(reconstructed, densities)
+        return reconstructed
+    reconstructed = run('poisson', poisson)
+
+    points = np.asarray(pcd.points)
+    colors = np.asarray(pcd.colors)
+    vertices = np.asarray(reconstructed.vertices)
+    # A new index every run, so the tree build is part of the measurement
+    run('color_transfer', lambda: spatial_index.SpatialIndex(points).transfer(
+        colors, vertices, k=pipeline.COLOR_NEIGHBORS))
+    run('voxelize', lambda: pipeline.voxelize(pcd, params['voxel_size']))
+
+    center = pcd.get_axis_aligned_bounding_box().get_center()
+    run('clip', lambda: (mesh_clipping.clip_point_cloud(pcd, center, [1.0, 0.0, 0.0]),
+                         mesh_clipping.clip_mesh(reconstructed, center, [1.0, 0.0, 0.0])))
+    run('extremes', lambda: pipeline.color_by_height_and_find_extremes(pcd))
+    return {
+        'points': num_points,
+        'triangles': len(mesh.triangles),
+        'reconstructed_triangles': len(reconstructed.triangles),
+        'depth': params['depth'],
+        'stages': stages,
+    }
+
+
+def run_benchmarks(sizes, include_cup=True, repeat=3):
+    """Benchmark every requested case; returns the results dict"""
+    if hasattr(o3d.utility, 'random'):
+        o3d.utility.random.seed(0)
+    cases = {}
+    for size in sizes:
+        num_points, triangles = SYNTHETIC_SIZES[size]
+        name = f"torus_{size}"
+        print(f"Benchmarking {name} ({num_points} points, ~{triangles} triangles)...")
+        cases[name] = benchmark_case(synthetic_mesh(triangles), num_points, repeat)
+    if include_cup:
+        print("Benchmarking coffee_cup...")
+        cases['coffee_cup'] = benchmark_case(None, pipeline.NUM_SAMPLE_POINTS, repeat,
+                                             model_path=pipeline.DEFAULT_MODEL_PATH)
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'machine': {
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'open3d': o3d.__version__,
+        },
+        'repeat': repeat,
+        'cases': cases,
+    }
+
+
+def compare_to_baseline(results, baseline, time_tolerance=TIME_TOLERANCE):
+    """Flag stages above the tolerance; returns a list of regression dicts"""
+    regressions = []
+    for case, case_result in results['cases'].items():
+        base_case = baseline.get('cases', {}).get(case)
+        if not base_case:
+            continue
+        for stage, current in case_result['stages'].items():
+            base = base_case['stages'].get(stage)
+            if not base:
+                continue
+            checks = (('ms', time_tolerance, MIN_TIME_DELTA_MS),
+                      ('peak_mb', MEMORY_TOLERANCE, MIN_MEMORY_DELTA_MB))
+            for metric, tolerance, min_delta in checks:
+                now, before = current.get(metric), base.get(metric)
+                if now is None or before is None:
+                    continue
+                if now > before * (1 + tolerance) and now - before > min_delta:
+                    regressions.append({'case': case, 'stage': stage, 'metric': metric,
+                                        'baseline': before, 'current': now})
+    return regressions
+
+
+def print_results(results, regressions):
+    flagged = {(r['case'], r['stage'], r['metric']) for r in regressions}
+    for case, case_result in results['cases'].items():
+        print(f"\n{case}: {case_result['points']} points, {case_result['triangles']} triangles "
+              f"-> {case_result['reconstructed_triangles']} reconstructed (depth {case_result['depth']})")
+        print(f"  {'Stage':<16} {'ms':>10} {'peak MB':>10}")
+        print("  " + "-" * 38)
+        for stage, record in case_result['stages'].items():
+            peak = '-' if record['peak_mb'] is None else f"{record['peak_mb']:.1f}"
+            marks = ' <- slower' if (case, stage, 'ms') in flagged else ''
+            marks += ' <- more memory' if (case, stage, 'peak_mb') in flagged else ''
+            print(f"  {stage:<16} {record['ms']:>10.1f} {peak:>10}{marks}")
+
+
+def write_json(data, file_path):
+    output_dir = os.path.dirname(file_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Assignment 5 pipeline stages")
+    parser.add_argument('--sizes', nargs='*', choices=list(SYNTHETIC_SIZES), default=list(DEFAULT_SIZES),
+                        help=f"synthetic mesh sizes (default: {' '.join(DEFAULT_SIZES)})")
+    parser.add_argument('--no-cup', action='store_true', help="skip the bundled coffee cup")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per stage, median reported (default: 3)")
+    parser.add_argument('--output', default=RESULTS_FILE, help=f"results JSON (default: {RESULTS_FILE})")
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help=f"baseline JSON to compare with (default: {BASELINE_FILE})")
+    parser.add_argument('--time-tolerance', type=float, default=TIME_TOLERANCE,
+                        help=f"allowed slowdown before a stage is flagged (default: {TIME_TOLERANCE})")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store these results as the new baseline instead of comparing")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, include_cup=not args.no_cup, repeat=args.repeat)
+    write_json(results, args.output)
+
+    regressions = []
+    if args.save_baseline:
+        write_json(results, args.baseline)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_to_baseline(results, json.load(f), args.time_tolerance)
+
+    print_results(results, regressions)
+    print(f"\nResults written: {args.output}")
+    if args.save_baseline:
+        print(f"Baseline saved: {args.baseline}")
+    elif not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline} (use --save-baseline to create one)")
+    elif regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}:")
+        for r in regressions:
+            print(f"  {r['case']} / {r['stage']}: {r['metric']} {r['baseline']} -> {r['current']}")
+        sys.exit(1)
+    else:
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,7 @@
 import logging
 import os
 import time
-from typing import Any
+from typing import Any, Optional
 
 import psycopg2
 from psycopg2.extras import DictCursor
@@ -82,6 +82,19 @@ METRICS = {
     ),
 }
 
+# Player totals read straight from player_stats, used when team_summary
+# (setup_code/migrations/003_summary_tables.sql) is not installed
+PLAYER_STATS_QUERIES = {
+    "player_count": "SELECT COUNT(*) FROM player_stats",
+    "avg_player_rating": "SELECT COALESCE(AVG(rating), 0) FROM player_stats WHERE rating IS NOT NULL",
+    "top_player_rating": "SELECT COALESCE(MAX(rating), 0) FROM player_stats WHERE rating IS NOT NULL",
+    "total_kills": "SELECT COALESCE(SUM(kills), 0) FROM player_stats",
+    "total_deaths": "SELECT COALESCE(SUM(deaths), 0) FROM player_stats",
+    "total_assists": "SELECT COALESCE(SUM(assists), 0) FROM player_stats",
+}
+
+_team_summary_installed: Optional[bool] = None
+
 
 def get_connection() -> psycopg2.extensions.connection:
     return psycopg2.connect(cursor_factory=DictCursor, **DB_CONFIG)
@@ -93,6 +106,20 @@ def _fetch_single_value(cursor: psycopg2.extensions.cursor, query: str) -> Any:
     return result[0] if result else None
 
 
+def _has_team_summary(cursor: psycopg2.extensions.cursor) -> bool:
+    global _team_summary_installed
+    if _team_summary_installed is None:
+        _team_summary_installed = bool(
+            _fetch_single_value(cursor, "SELECT to_regclass('team_summary') IS NOT NULL")
+        )
+        if not _team_summary_installed:
+            logger.warning(
+                "team_summary not found (migration 003_summary_tables.sql); "
+                "reading player totals from player_stats"
+            )
+    return _team_summary_installed
+
+
 def collect_metrics() -> None:
     conn = None
     try:
@@ -100,26 +127,32 @@ def collect_metrics() -> None:
         with conn.cursor() as cursor:
             values = {}
 
-            values["player_count"] = _fetch_single_value(
-                cursor, "SELECT COUNT(*) FROM player_stats"
-            )
-            values["avg_player_rating"] = _fetch_single_value(
-                cursor,
-                "SELECT COALESCE(AVG(rating), 0) FROM player_stats WHERE rating IS NOT NULL",
-            )
-            values["top_player_rating"] = _fetch_single_value(
-                cursor,
-                "SELECT COALESCE(MAX(rating), 0) FROM player_stats WHERE rating IS NOT NULL",
-            )
-            values["total_kills"] = _fetch_single_value(
-                cursor, "SELECT COALESCE(SUM(kills), 0) FROM player_stats"
-            )
-            values["total_deaths"] = _fetch_single_value(
-                cursor, "SELECT COALESCE(SUM(deaths), 0) FROM player_stats"
-            )
-            values["total_assists"] = _fetch_single_value(
-                cursor, "SELECT COALESCE(SUM(assists), 0) FROM player_stats"
-            )
+            # Player totals come from team_summary (maintained by triggers,
+            # see setup_code/migrations/003_summary_tables.sql) when it exists
+            if _has_team_summary(cursor):
+                values["player_count"] = _fetch_single_value(
+                    cursor, "SELECT COALESCE(SUM(player_count), 0) FROM team_summary"
+                )
+                values["avg_player_rating"] = _fetch_single_value(
+                    cursor,
+                    "SELECT COALESCE(SUM(rating_sum) / NULLIF(SUM(rating_count), 0), 0) FROM team_summary",
+                )
+                values["top_player_rating"] = _fetch_single_value(
+                    cursor,
+                    "SELECT COALESCE(MAX(max_rating), 0) FROM team_summary",
+                )
+                values["total_kills"] = _fetch_single_value(
+                    cursor, "SELECT COALESCE(SUM(total_kills), 0) FROM team_summary"
+                )
+                values["total_deaths"] = _fetch_single_value(
+                    cursor, "SELECT COALESCE(SUM(total_deaths), 0) FROM team_summary"
+                )
+                values["total_assists"] = _fetch_single_value(
+                    cursor, "SELECT COALESCE(SUM(total_assists), 0) FROM team_summary"
+                )
+            else:
+                for name, query in PLAYER_STATS_QUERIES.items():
+                    values[name] = _fetch_single_value(cursor, query)
             values["matches_total"] = _fetch_single_value(
                 cursor, "SELECT COUNT(*) FROM matches"
             )
@@ -0,0 +1,145 @@
+"""
+Plane clipping for triangle meshes and point clouds
+
+clip_mesh_arrays() keeps the part of a mesh on the positive side of an
+arbitrary plane (dot(normal, x - point) > 0). Triangles entirely on the kept
+side are copied, triangles entirely on the other side are dropped, and
+triangles that straddle the plane are cut: the new vertices lie exactly on the
+plane, with colors and normals interpolated along the cut edges. A triangle
+with one kept vertex becomes one triangle and one with two kept vertices
+becomes two, both with the original winding.
+
+The classification and the cut are array operations over all triangles, so
+the cost grows linearly with the face count. Only the cut edges are sorted
+(to give the two triangles sharing an edge the same new vertex, which keeps
+the cut boundary connected). Nothing is deep-copied: the source geometry is
+read through NumPy views and the result is built from new arrays.
+
+Used by clip_geometry() in assignment5_solution_coffeecup.py.
+"""
+
+import numpy as np
+import open3d as o3d
+
+
+def plane_distances(points, plane_point, plane_normal):
+    """Signed distance of every point from the plane (positive on the kept side)"""
+    normal = np.asarray(plane_normal, dtype=np.float64)
+    normal = normal / np.linalg.norm(normal)
+    return (np.asarray(points) - np.asarray(plane_point, dtype=np.float64)) @ normal
+
+
+def _cut_edges(distances, edge_starts, edge_ends, num_vertices):
+    """Unique cut edges and, for every requested edge, the index of its cut vertex.
+
+    Returns (starts, ends, t, edge_index): the unique edges, the interpolation
+    parameter of the plane crossing along start -> end, and for each input edge
+    the position of its cut vertex in that unique list.
+    """
+    low = np.minimum(edge_starts, edge_ends).astype(np.int64)
+    high = np.maximum(edge_starts, edge_ends).astype(np.int64)
+    _, first, edge_index = np.unique(low * num_vertices + high,
+                                     return_index=True, return_inverse=True)
+    starts, ends = low[first], high[first]
+    t = distances[starts] / (distances[starts] - distances[ends])
+    return starts, ends, t, edge_index.reshape(-1)
+
+
+def _interpolate(values, starts, ends, t):
+    return values[starts] + t[:, None] * (values[ends] - values[starts])
+
+
+def clip_mesh_arrays(vertices, triangles, plane_point, plane_normal, colors=None, normals=None):
+    """Clip mesh arrays against a plane.
+
+    Returns (vertices, triangles, colors, normals); colors and normals are None
+    when not given. Kept vertices come first in their original order, followed
+    by the new vertices on the plane.
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    triangles = np.asarray(triangles, dtype=np.int64)
+    distances = plane_distances(vertices, plane_point, plane_normal)
+    inside = distances > 0
+
+    # Old index -> new index for the kept vertices
+    kept = np.flatnonzero(inside)
+    remap = np.full(len(vertices), -1, dtype=np.int64)
+    remap[kept] = np.arange(len(kept))
+
+    tri_inside = inside[triangles]
+    inside_count = tri_inside.sum(axis=1)
+    whole = triangles[inside_count == 3]
+    one_in = triangles[inside_count == 1]
+    two_in = triangles[inside_count == 2]
+
+    # Rotate each cut triangle (keeping its winding) so the odd vertex comes
+    # first: the single kept vertex, or the single dropped vertex
+    def rotate(tris, odd_mask):
+        shift = np.argmax(odd_mask, axis=1)
+        order = (shift[:, None] + np.arange(3)) % 3
+        return np.take_along_axis(tris, order, axis=1)
+
+    one_in = rotate(one_in, inside[one_in])
+    two_in = rotate(two_in, ~inside[two_in])
+
+    # Every cut triangle crosses the plane on the two edges at its odd vertex
+    edge_starts = np.concatenate((one_in[:, 0], one_in[:, 0], two_in[:, 0], two_in[:, 0]))
+    edge_ends = np.concatenate((one_in[:, 1], one_in[:, 2], two_in[:, 1], two_in[:, 2]))
+    starts, ends, t, edge_index = _cut_edges(distances, edge_starts, edge_ends, len(vertices))
+    cut_vertex = len(kept) + edge_index
+    n1, n2 = len(one_in), len(two_in)
+    cut_01, cut_02 = cut_vertex[:n1], cut_vertex[n1:2 * n1]
+    cut_01b, cut_02b = cut_vertex[2 * n1:2 * n1 + n2], cut_vertex[2 * n1 + n2:]
+
+    # one kept vertex a (a, b, c):  (a, ab, ac)
+    # two kept vertices b, c (a, b, c) with a dropped:  (b, c, ac) and (b, ac, ab)
+    new_triangles = np.concatenate((
+        remap[whole],
+        np.stack((remap[one_in[:, 0]], cut_01, cut_02), axis=1),
+        np.stack((remap[two_in[:, 1]], remap[two_in[:, 2]], cut_02b), axis=1),
+        np.stack((remap[two_in[:, 1]], cut_02b, cut_01b), axis=1),
+    ))
+
+    new_vertices = np.concatenate((vertices[kept], _interpolate(vertices, starts, ends, t)))
+    new_colors = None
+    if colors is not None:
+        colors = np.asarray(colors, dtype=np.float64)
+        new_colors = np.concatenate((colors[kept], _interpolate(colors, starts, ends, t)))
+    new_normals = None
+    if normals is not None:
+        normals = np.asarray(normals, dtype=np.float64)
+        cut_normals = _interpolate(normals, starts, ends, t)
+        lengths = np.linalg.norm(cut_normals, axis=1, keepdims=True)
+        cut_normals = np.divide(cut_normals, lengths, out=cut_normals, where=lengths > 0)
+        new_normals = np.concatenate((normals[kept], cut_normals))
+
+    return new_vertices, new_triangles.astype(np.int32), new_colors, new_normals
+
+
+def clip_mesh(mesh, plane_point, plane_normal):
+    """Clip an Open3D TriangleMesh against a plane; returns a new mesh (the input is not copied)"""
+    vertices, triangles, colors, normals = clip_mesh_arrays(
+        np.asarray(mesh.vertices), np.asarray(mesh.triangles), plane_point, plane_normal,
+        colors=np.asarray(mesh.vertex_colors) if mesh.has_vertex_colors() else None,
+        normals=np.asarray(mesh.vertex_normals) if mesh.has_vertex_normals() else None)
+
+    clipped = o3d.geometry.TriangleMesh()
+    clipped.vertices = o3d.utility.Vector3dVector(vertices)
+    clipped.triangles = o3d.utility.Vector3iVector(triangles)
+    if colors is not None:
+        clipped.vertex_colors = o3d.utility.Vector3dVector(colors)
+    if normals is not None:
+        clipped.vertex_normals = o3d.utility.Vector3dVector(normals)
+    return clipped
+
+
+def clip_point_cloud(pcd, plane_point, plane_normal):
+    """Points of an Open3D PointCloud on the kept side of the plane, with their colors and normals"""
+    mask = plane_distances(np.asarray(pcd.points), plane_point, plane_normal) > 0
+    clipped = o3d.geometry.PointCloud()
+    clipped.points = o3d.utility.Vector3dVector(np.asarray(pcd.points)[mask])
+    if pcd.has_colors():
+        clipped.colors = o3d.utility.Vector3dVector(np.asarray(pcd.colors)[mask])
+    if pcd.has_normals():
+        clipped.normals = o3d.utility.Vector3dVector(np.asarray(pcd.normals)[mask])
+    return clipped
@@ -0,0 +1,157 @@
+"""
+Vectorized OBJ loader with a binary geometry cache
+
+load_obj() parses the vertex positions (and optional per-vertex colors) and
+the faces of a Wavefront OBJ file into NumPy arrays. Quads and n-gons are fan
+triangulated, negative (relative) indices are resolved, and texture/normal
+indices (v/vt/vn) are ignored. The parser classifies lines and strips the
+"/vt/vn" parts with array operations over the raw bytes and converts all
+numbers in one call, so there is no Python loop per line.
+
+The arrays are cached as .npy files named after a hash of the file contents.
+Repeat runs memory-map the cached arrays and skip parsing entirely; editing
+the OBJ changes the hash, so stale entries are never used.
+
+Used by load_mesh() in assignment5_solution_coffeecup.py.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+CACHE_DIR = os.path.join("assignment_5", "output", "obj_cache")
+# Bump when the parser output changes so old cache entries are not reused
+CACHE_VERSION = 1
+
+SPACE, TAB, NEWLINE, CARRIAGE_RETURN, SLASH = b' \t\n\r/'
+
+
+def file_key(data):
+    """Cache key for the file contents"""
+    digest = hashlib.blake2b(data, digest_size=16)
+    digest.update(f"obj-cache-v{CACHE_VERSION}".encode())
+    return digest.hexdigest()
+
+
+def _line_selection(buf, line_id, line_starts, keep_lines):
+    """Bytes of the selected lines with their keyword removed, lines still newline separated"""
+    keep = keep_lines[line_id]
+    # Drop the keyword ('v' / 'f'); the whitespace after it separates the tokens
+    keyword = np.zeros(len(buf), dtype=bool)
+    starts = line_starts[keep_lines]
+    keyword[starts] = True
+    keep &= ~keyword
+    return buf[keep], line_id[keep]
+
+
+def _token_counts(buf, line_id, num_lines):
+    """Number of whitespace separated tokens on every line"""
+    is_space = ((buf == SPACE) | (buf == TAB) | (buf == NEWLINE) | (buf == CARRIAGE_RETURN))
+    starts_token = ~is_space
+    starts_token[1:] &= is_space[:-1]
+    return np.bincount(line_id[starts_token], minlength=num_lines)
+
+
+def parse_obj(data):
+    """Parse OBJ bytes into (vertices float64 (N,3), triangles int32 (M,3), colors float64 (N,3) or None)"""
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if len(buf) == 0:
+        return np.zeros((0, 3)), np.zeros((0, 3), dtype=np.int32), None
+    if buf[-1] != NEWLINE:
+        buf = np.append(buf, np.uint8(NEWLINE))
+
+    newlines = np.flatnonzero(buf == NEWLINE)
+    line_starts = np.concatenate(([0], newlines[:-1] + 1))
+    num_lines = len(line_starts)
+    # Line number of every byte (the newline belongs to the line it ends)
+    line_id = np.zeros(len(buf), dtype=np.int64)
+    line_id[newlines[:-1] + 1] = 1
+    line_id = np.cumsum(line_id)
+
+    first = buf[line_starts]
+    second = buf[np.minimum(line_starts + 1, len(buf) - 1)]
+    separated = (second == SPACE) | (second == TAB)
+    vertex_lines = (first == ord('v')) & separated
+    face_lines = (first == ord('f')) & separated
+
+    # Vertex positions, optionally followed by RGB (v x y z r g b) or w (v x y z w)
+    vertex_bytes, vertex_line_id = _line_selection(buf, line_id, line_starts, vertex_lines)
+    values = np.fromstring(vertex_bytes.tobytes(), sep=' ') if len(vertex_bytes) else np.zeros(0)
+    vertex_widths = _token_counts(vertex_bytes, vertex_line_id, num_lines)[vertex_lines]
+    vertex_offsets = np.concatenate(([0], np.cumsum(vertex_widths)[:-1]))
+    vertices = values[vertex_offsets[:, None] + np.arange(3)] if len(vertex_widths) else np.zeros((0, 3))
+    colors = None
+    if len(vertex_widths) and np.all(vertex_widths >= 6):
+        colors = values[vertex_offsets[:, None] + np.arange(3, 6)]
+
+    # Faces: keep only the vertex index of each v/vt/vn token
+    face_bytes, face_line_id = _line_selection(buf, line_id, line_starts, face_lines)
+    if len(face_bytes) == 0:
+        return vertices, np.zeros((0, 3), dtype=np.int32), colors
+    positions = np.arange(len(face_bytes))
+    is_space = ((face_bytes == SPACE) | (face_bytes == TAB)
+                | (face_bytes == NEWLINE) | (face_bytes == CARRIAGE_RETURN))
+    last_slash = np.maximum.accumulate(np.where(face_bytes == SLASH, positions, -1))
+    last_space = np.maximum.accumulate(np.where(is_space, positions, -1))
+    index_bytes = face_bytes.copy()
+    index_bytes[last_slash > last_space] = SPACE
+    indices = np.fromstring(index_bytes.tobytes(), dtype=np.int64, sep=' ')
+
+    face_sizes = _token_counts(index_bytes, face_line_id, num_lines)[face_lines]
+    # OBJ indices are 1-based; negative ones count back from the vertices defined so far
+    vertices_before = np.cumsum(vertex_lines)[face_lines]
+    indices = np.where(indices < 0, np.repeat(vertices_before, face_sizes) + indices, indices - 1)
+
+    # Fan triangulation: (v0, vi, vi+1) for i = 1 .. n-2
+    face_offsets = np.concatenate(([0], np.cumsum(face_sizes)[:-1]))
+    fans = np.maximum(face_sizes - 2, 0)
+    fan_face = np.repeat(np.arange(len(face_sizes)), fans)
+    fan_starts = np.concatenate(([0], np.cumsum(fans)[:-1]))
+    step = np.arange(len(fan_face)) - fan_starts[fan_face] + 1
+    base = face_offsets[fan_face]
+    triangles = np.stack((indices[base], indices[base + step], indices[base + step + 1]), axis=1)
+    return vertices, triangles.astype(np.int32), colors
+
+
+def _cache_paths(cache_dir, key):
+    names = ('vertices', 'triangles', 'colors')
+    return {name: os.path.join(cache_dir, f"{key}_{name}.npy") for name in names}
+
+
+def _save_array(path, array):
+    # Unique temp name: several batch workers may cache the same model at once
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(array))
+    os.replace(tmp_path, path)
+
+
+def load_obj(path, cache_dir=CACHE_DIR):
+    """Load an OBJ file as arrays, using the binary cache when cache_dir is set.
+
+    Returns (vertices, triangles, colors, cache_status) where colors may be
+    None and cache_status is 'hit', 'miss' or 'off'. Cached arrays are
+    copy-on-write memory maps (Open3D's vector wrappers reject read-only
+    arrays; nothing is copied unless the caller writes to them).
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if cache_dir is None:
+        return (*parse_obj(data), 'off')
+
+    paths = _cache_paths(cache_dir, file_key(data))
+    if os.path.exists(paths['vertices']) and os.path.exists(paths['triangles']):
+        vertices = np.load(paths['vertices'], mmap_mode='c')
+        triangles = np.load(paths['triangles'], mmap_mode='c')
+        colors = np.load(paths['colors'], mmap_mode='c') if os.path.exists(paths['colors']) else None
+        return vertices, triangles, colors, 'hit'
+
+    vertices, triangles, colors = parse_obj(data)
+    os.makedirs(cache_dir, exist_ok=True)
+    if colors is not None:
+        _save_array(paths['colors'], colors)
+    _save_array(paths['triangles'], triangles)
+    # Written last: its presence marks a complete entry
+    _save_array(paths['vertices'], vertices)
+    return vertices, triangles, colors, 'miss'
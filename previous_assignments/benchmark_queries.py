@@ -0,0 +1,405 @@
+"""
+Query benchmark at growing data volumes
+
+This script:
+- Clones the database into a scratch benchmark database (CREATE DATABASE ...
+  TEMPLATE), so the real data is never modified
+- Grows it to each requested scale factor (2x, 10x, 100x ... the number of
+  matches in the source) with synthetic matches built by the generators in
+  refresh_data.py, loaded in batches with COPY; the summary-table triggers
+  keep the derived tables in step as in production
+- Runs the shipped workload (queries.sql, the main.py reports, the
+  visualizations_simple.py chart queries and the exporter's collect_metrics()
+  queries) with EXPLAIN (ANALYZE, BUFFERS) and repetitions at every scale
+- Writes a JSON and a Markdown report with latency, plan outline and
+  sequential scans per query and scale; --compare flags queries that got
+  slower or changed plan against an earlier report
+
+Usage:
+    python benchmark_queries.py [--scales 1 10 100] [--repeat N] [--keep]
+    python benchmark_queries.py --compare exports/query_benchmark_old.json
+"""
+
+import argparse
+import ast
+import csv
+import io
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import psycopg2
+
+import refresh_data
+from index_advisor import collect_workload, profile_workload
+
+# Db connection parameters
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'data_v',
+    'user': 'postgres',
+    'password': '0412',
+    'port': '5432'
+}
+
+BENCH_DATABASE = 'data_v_bench'
+REPORT_FILE = os.path.join('exports', 'query_benchmark.json')
+EXPORTER_FILE = os.path.join('..', 'custom_exporter', 'custom_exporter.py')
+
+SCALE_FACTORS = [1, 10]
+REPEAT = 3
+# Synthetic matches generated and copied per batch
+SEED_BATCH_MATCHES = 2000
+RANDOM_SEED = 42
+
+# --compare: a query is slower if it takes this much longer and at least MIN_DELTA_MS more
+SLOWDOWN_RATIO = 1.25
+MIN_DELTA_MS = 1.0
+
+MATCH_COLUMNS = ('date', 'match_id', 'time', 'team1', 'score1', 'team2', 'score2', 'score',
+                 'winner', 'status', 'week', 'stage', 'match_code')
+PERFORMANCE_COLUMNS = ('"Match ID"', '"Map"', '"Player"', '"Team"', '"Agent"',
+                       '"2K"', '"3K"', '"4K"', '"5K"',
+                       '"1v1"', '"1v2"', '"1v3"', '"1v4"', '"1v5"',
+                       '"ECON"', '"PL"', '"DE"')
+PLAYER_STATS_COLUMNS = ('match_id', 'event_name', 'event_stage', 'match_date',
+                        'team1', 'team2', 'score_overall', 'player_name', 'player_id', 'player_team',
+                        'stat_type', 'agent', 'rating', 'acs', 'k', 'd', 'a', 'kd_diff',
+                        'kast', 'adr', 'hs_percent', 'fk', 'fd', 'fk_fd_diff', 'map_name', 'map_winner')
+COUNTED_TABLES = ('matches', 'detailed_matches_player_stats', 'performance_data')
+
+
+def connect_to_db(database=None):
+    """Establish db connection (to another database on the same server if given)"""
+    try:
+        config = dict(DB_CONFIG, database=database) if database else DB_CONFIG
+        conn = psycopg2.connect(**config)
+        return conn
+    except Exception as e:
+        print(f"Error connecting to db: {e}")
+        return None
+
+
+def clone_database(source, target):
+    """Recreate target as a copy of source; the source must have no other open sessions"""
+    admin = connect_to_db('postgres')
+    if not admin:
+        return False
+    admin.autocommit = True
+    cursor = admin.cursor()
+    try:
+        cursor.execute(f'DROP DATABASE IF EXISTS "{target}"')
+        cursor.execute(f'CREATE DATABASE "{target}" TEMPLATE "{source}"')
+        return True
+    except Exception as e:
+        print(f"Error cloning {source} into {target}: {e}")
+        print("CREATE DATABASE ... TEMPLATE needs the source database to have no other connections.")
+        return False
+    finally:
+        cursor.close()
+        admin.close()
+
+
+def drop_database(target):
+    admin = connect_to_db('postgres')
+    if not admin:
+        return
+    admin.autocommit = True
+    cursor = admin.cursor()
+    cursor.execute(f'DROP DATABASE IF EXISTS "{target}"')
+    cursor.close()
+    admin.close()
+
+
+def table_counts(conn):
+    cursor = conn.cursor()
+    counts = {}
+    for table in COUNTED_TABLES:
+        cursor.execute(f"SELECT COUNT(*) FROM {table}")
+        counts[table] = cursor.fetchone()[0]
+    cursor.close()
+    conn.commit()
+    return counts
+
+
+def copy_rows(cursor, table, columns, rows):
+    """Load rows with COPY ... FROM STDIN (CSV; None becomes NULL)"""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def synthetic_batch(cursor, count, team_players_dict, agents, maps, date_range):
+    """Rows for count new matches, generated like refresh_data.insert_new_match_data()"""
+    cursor.execute("SELECT nextval(pg_get_serial_sequence('matches', 'match_id')) "
+                   "FROM generate_series(1, %s)", (count,))
+    match_ids = [row[0] for row in cursor.fetchall()]
+    valid_teams = [team for team, players in team_players_dict.items() if len(players) >= 5]
+    first_date, days = date_range
+
+    matches, performance, player_stats = [], [], []
+    for match_id in match_ids:
+        match_date = first_date + timedelta(days=random.randint(0, days))
+        team1_name, team2_name = random.sample(valid_teams, 2)
+        score1 = random.randint(0, 2)
+        score2 = 2 if score1 < 2 else random.randint(0, 1)
+        winner = team1_name if score1 > score2 else team2_name
+        score = f"{score1}-{score2}"
+        map_name = random.choice(maps)
+        matches.append((match_date, match_id, '20:00', team1_name, score1, team2_name, score2, score,
+                        winner, 'Completed', 'Week 4', 'Group Stage', str(match_id)))
+
+        for team_name in (team1_name, team2_name):
+            for player_name, player_id, _ in random.sample(team_players_dict[team_name], 5):
+                agent = random.choice(agents)
+                performance.append(refresh_data.generate_realistic_performance_data(
+                    match_id, map_name, player_name, team_name, agent))
+                player_stats.append(refresh_data.generate_detailed_player_stats(
+                    match_id, 'Valorant Champions 2024', 'Group Stage', match_date,
+                    team1_name, team2_name, score, player_name, player_id, team_name,
+                    agent, map_name, winner))
+    return matches, performance, player_stats
+
+
+def grow_database(conn, target_matches):
+    """Add synthetic matches until the database has target_matches; returns the number added"""
+    team_players_dict, agents, maps, _ = refresh_data.get_existing_data(conn)
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*), MIN(date), MAX(date) FROM matches")
+    current, first_date, last_date = cursor.fetchone()
+    first_date = first_date or datetime.now().date()
+    days = max(((last_date or first_date) - first_date).days, 0)
+
+    added = 0
+    while current + added < target_matches:
+        count = min(SEED_BATCH_MATCHES, target_matches - current - added)
+        matches, performance, player_stats = synthetic_batch(
+            cursor, count, team_players_dict, agents, maps, (first_date, days))
+        copy_rows(cursor, 'matches', MATCH_COLUMNS, matches)
+        copy_rows(cursor, 'performance_data', PERFORMANCE_COLUMNS, performance)
+        copy_rows(cursor, 'detailed_matches_player_stats', PLAYER_STATS_COLUMNS, player_stats)
+        conn.commit()
+        added += count
+        print(f"  {current + added}/{target_matches} matches", end='\r')
+
+    # Fresh statistics, as after a real bulk load
+    cursor.execute("ANALYZE")
+    conn.commit()
+    cursor.close()
+    if added:
+        print()
+    return added
+
+
+def exporter_queries(file_path=EXPORTER_FILE):
+    """(metric, sql) pairs of collect_metrics(), read from the exporter's source.
+
+    Parsed rather than imported, so prometheus_client is not needed here.
+    """
+    with open(file_path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    queries = []
+    for node in ast.walk(tree):
+        if not (isinstance(node, ast.Assign) and isinstance(node.value, ast.Call)):
+            continue
+        call = node.value
+        if getattr(call.func, 'id', None) != '_fetch_single_value' or len(call.args) < 2:
+            continue
+        # Only literal SQL (the fallback loop passes its queries by name)
+        if not isinstance(call.args[1], ast.Constant):
+            continue
+        target = node.targets[0]
+        key = target.slice if isinstance(target, ast.Subscript) else None
+        label = key.value if isinstance(key, ast.Constant) else 'metric'
+        queries.append((label, call.args[1].value))
+    return queries
+
+
+def benchmark_workload():
+    """Every shipped query as (source, label, sql)"""
+    workload = collect_workload()
+    if os.path.exists(EXPORTER_FILE):
+        workload += [('custom_exporter.py', label, sql) for label, sql in exporter_queries()]
+    return workload
+
+
+def run_benchmark(source, database, scales, repeat):
+    """Clone, grow and profile at every scale; returns the report dict (None on failure).
+
+    If seeding a scale fails (for example a trigger rejecting the COPY), the
+    scales profiled so far are kept and the error is recorded as 'seed_error'.
+    """
+    print(f"Cloning {source} into {database}...")
+    if not clone_database(source, database):
+        return None
+    conn = connect_to_db(database)
+    if not conn:
+        return None
+
+    random.seed(RANDOM_SEED)
+    workload = benchmark_workload()
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'source_database': source,
+        'repeat': repeat,
+        'scales': [],
+        'queries': [{'source': src, 'label': label, 'results': {}} for src, label, _ in workload],
+    }
+    try:
+        base_matches = table_counts(conn)['matches']
+        for factor in scales:
+            print(f"\nScale {factor}x: growing to {base_matches * factor} matches...")
+            started = time.perf_counter()
+            try:
+                added = grow_database(conn, base_matches * factor)
+            except Exception as e:
+                conn.rollback()
+                print(f"\nError seeding the {factor}x scale: {e}")
+                report['seed_error'] = {'factor': factor, 'error': str(e).strip().splitlines()[0]}
+                break
+            seed_seconds = time.perf_counter() - started
+            counts = table_counts(conn)
+            report['scales'].append({'factor': factor, 'added_matches': added,
+                                     'seed_seconds': round(seed_seconds, 1), 'rows': counts})
+
+            print(f"Profiling {len(workload)} queries ({repeat} runs each)...")
+            profiles = profile_workload(conn, workload, repeat)
+            conn.rollback()
+            for entry, profile in zip(report['queries'], profiles):
+                entry['results'][str(factor)] = {key: value for key, value in profile.items()
+                                                 if key not in ('source', 'label')}
+    finally:
+        conn.close()
+    return report if report['scales'] else None
+
+
+def _cell(text):
+    return str(text).replace('|', '\\|').replace('\n', ' ')
+
+
+def markdown_report(report):
+    """The report as Markdown tables (stable order, so it diffs cleanly between commits)"""
+    factors = [str(scale['factor']) for scale in report['scales']]
+    lines = [
+        "# Query Benchmark",
+        "",
+        f"Generated {report['generated_at']} from `{report['source_database']}`, "
+        f"median of {report['repeat']} EXPLAIN ANALYZE runs.",
+        "",
+        "## Data Volume",
+        "",
+        "| Scale | " + " | ".join(COUNTED_TABLES) + " | Seed (s) |",
+        "|---|" + "---:|" * (len(COUNTED_TABLES) + 1),
+    ]
+    for scale in report['scales']:
+        counts = " | ".join(str(scale['rows'][table]) for table in COUNTED_TABLES)
+        lines.append(f"| {scale['factor']}x | {counts} | {scale['seed_seconds']} |")
+    if 'seed_error' in report:
+        error = report['seed_error']
+        lines += ["", f"Seeding the {error['factor']}x scale failed: `{error['error']}`"]
+
+    largest = factors[-1] if factors else None
+    lines += [
+        "",
+        "## Execution Time (ms)",
+        "",
+        "| Source | Query | " + " | ".join(f"{factor}x" for factor in factors)
+        + f" | Growth | Seq scans at {largest}x | Plan at {largest}x |",
+        "|---|---|" + "---:|" * (len(factors) + 1) + "---|---|",
+    ]
+    for entry in report['queries']:
+        results = [entry['results'].get(factor, {}) for factor in factors]
+        times = [result.get('execution_ms') for result in results]
+        cells = [('error' if 'error' in result else f"{ms:.2f}") for result, ms in zip(results, times)]
+        growth = ''
+        if len(times) > 1 and times[0] and times[-1] is not None:
+            growth = f"{times[-1] / times[0]:.1f}x"
+        last = results[-1] if results else {}
+        lines.append(
+            f"| {_cell(entry['source'])} | {_cell(entry['label'])} | " + " | ".join(cells)
+            + f" | {growth} | {_cell(', '.join(last.get('seq_scans', [])))} "
+            f"| {_cell(last.get('plan_shape', last.get('error', '')))} |")
+    return "\n".join(lines) + "\n"
+
+
+def compare_reports(current, previous):
+    """Queries that got slower or changed plan at a scale present in both reports"""
+    previous_queries = {(q['source'], q['label']): q['results'] for q in previous.get('queries', [])}
+    changes = []
+    for entry in current['queries']:
+        before_results = previous_queries.get((entry['source'], entry['label']))
+        if not before_results:
+            continue
+        for factor, result in entry['results'].items():
+            before = before_results.get(factor)
+            if not before or 'error' in result or 'error' in before:
+                continue
+            now_ms, before_ms = result['execution_ms'], before['execution_ms']
+            if now_ms > before_ms * SLOWDOWN_RATIO and now_ms - before_ms > MIN_DELTA_MS:
+                changes.append((entry, factor, f"slower: {before_ms:.2f} -> {now_ms:.2f} ms"))
+            if before.get('plan_shape') and result.get('plan_shape') != before['plan_shape']:
+                changes.append((entry, factor, f"plan changed: {before['plan_shape']} -> {result['plan_shape']}"))
+    return changes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shipped queries at growing data volumes")
+    parser.add_argument('--scales', type=int, nargs='+', default=SCALE_FACTORS,
+                        help=f"multiples of the source's match count (default: {' '.join(map(str, SCALE_FACTORS))})")
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help=f"EXPLAIN ANALYZE runs per query, median reported (default: {REPEAT})")
+    parser.add_argument('--source', default=DB_CONFIG['database'], help="database to clone")
+    parser.add_argument('--database', default=BENCH_DATABASE,
+                        help=f"scratch database, dropped and recreated (default: {BENCH_DATABASE})")
+    parser.add_argument('--keep', action='store_true', help="keep the scratch database afterwards")
+    parser.add_argument('--report', default=REPORT_FILE,
+                        help=f"JSON report path; the Markdown report is written next to it (default: {REPORT_FILE})")
+    parser.add_argument('--compare', metavar='JSON', help="earlier report to compare with")
+    args = parser.parse_args()
+
+    if args.database == args.source:
+        parser.error("--database must differ from --source; it is dropped and recreated")
+    scales = sorted(set(args.scales))
+    if scales[0] < 1:
+        parser.error("scale factors must be at least 1")
+
+    print("QUERY BENCHMARK")
+    print("=" * 60)
+    try:
+        report = run_benchmark(args.source, args.database, scales, args.repeat)
+    finally:
+        if not args.keep:
+            drop_database(args.database)
+    if report is None:
+        sys.exit(1)
+
+    report_dir = os.path.dirname(args.report)
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+    markdown_file = os.path.splitext(args.report)[0] + '.md'
+    with open(markdown_file, 'w', encoding='utf-8') as f:
+        f.write(markdown_report(report))
+    print(f"\nReports written: {args.report}, {markdown_file}")
+
+    failed = [q for q in report['queries'] if any('error' in r for r in q['results'].values())]
+    if failed:
+        print(f"{len(failed)} queries failed at some scale (see the report)")
+    if 'seed_error' in report:
+        print(f"Stopped before the {report['seed_error']['factor']}x scale: seeding failed")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            changes = compare_reports(report, json.load(f))
+        print(f"\nCompared with {args.compare}: {len(changes)} change(s)")
+        for entry, factor, change in changes:
+            print(f"  [{factor}x] {entry['source']} / {entry['label']}: {change}")
+
+
+if __name__ == "__main__":
+    main()
@@ -209,7 +209,7 @@ def cleanup_from_log():
             teams = f"{match['team1']} vs {match['team2']}"
             print(f"{idx:<4} {match['match_id']:<10} {teams:<40} {match['score']:<8} {match['match_date']:<12} {match['timestamp']:<20}")
         
-        # Get list of match IDs as text (we'll compare via ::text to avoid type issues)
+        # Log IDs are kept as text for selection; converted to BIGINT before querying
         match_ids_text = [match['match_id'] for match in logged_matches]
         
         print(f"\n{'='*60}")
@@ -253,20 +253,32 @@ def cleanup_from_log():
             print("No matches selected. Cleanup cancelled.")
             return
         
+        # match_id is a BIGINT surrogate key, so compare as integers (index-friendly)
+        ids_to_delete = []
+        for match_id in ids_to_delete_text:
+            try:
+                ids_to_delete.append(int(match_id))
+            except ValueError:
+                print(f"  Skipping non-numeric match ID from log: {match_id}")
+        
+        if not ids_to_delete:
+            print("No valid match IDs selected. Cleanup cancelled.")
+            return
+        
         # Count what will be deleted
         cursor.execute("""
-            SELECT COUNT(*) FROM matches WHERE match_id::text = ANY(%s)
-        """, (ids_to_delete_text,))
+            SELECT COUNT(*) FROM matches WHERE match_id = ANY(%s)
+        """, (ids_to_delete,))
         matches_to_delete = cursor.fetchone()[0]
         
         cursor.execute("""
-            SELECT COUNT(*) FROM performance_data WHERE "Match ID"::text = ANY(%s)
-        """, (ids_to_delete_text,))
+            SELECT COUNT(*) FROM performance_data WHERE "Match ID" = ANY(%s)
+        """, (ids_to_delete,))
         perf_to_delete = cursor.fetchone()[0]
         
         cursor.execute("""
-            SELECT COUNT(*) FROM detailed_matches_player_stats WHERE match_id::text = ANY(%s)
-        """, (ids_to_delete_text,))
+            SELECT COUNT(*) FROM detailed_matches_player_stats WHERE match_id = ANY(%s)
+        """, (ids_to_delete,))
         stats_to_delete = cursor.fetchone()[0]
         
         print(f"\nRecords to be deleted:")
@@ -289,18 +301,18 @@ def cleanup_from_log():
         print("\nDeleting data from database...")
         
         cursor.execute("""
-            DELETE FROM detailed_matches_player_stats WHERE match_id::text = ANY(%s)
-        """, (ids_to_delete_text,))
+            DELETE FROM detailed_matches_player_stats WHERE match_id = ANY(%s)
+        """, (ids_to_delete,))
         print(f"   Deleted {cursor.rowcount} player stats records")
         
         cursor.execute("""
-            DELETE FROM performance_data WHERE "Match ID"::text = ANY(%s)
-        """, (ids_to_delete_text,))
+            DELETE FROM performance_data WHERE "Match ID" = ANY(%s)
+        """, (ids_to_delete,))
         print(f"   Deleted {cursor.rowcount} performance records")
         
         cursor.execute("""
-            DELETE FROM matches WHERE match_id::text = ANY(%s)
-        """, (ids_to_delete_text,))
+            DELETE FROM matches WHERE match_id = ANY(%s)
+        """, (ids_to_delete,))
         print(f"   Deleted {cursor.rowcount} match records")
         
         conn.commit()
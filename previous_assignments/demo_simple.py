@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
 
 import psycopg2
-import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 from datetime import datetime
 
+from query_cache import cached_read_sql
+
 # Database connection parameters
 DB_CONFIG = {
     'host': 'localhost',
@@ -90,7 +91,7 @@ def create_demo_scatter_plot(conn, title_suffix=""):
     ORDER BY ps.rating DESC
     """
     
-    df = pd.read_sql_query(query, conn)
+    df = cached_read_sql(conn, query)
     if df is None or df.empty:
         return 0, "no_file"
     
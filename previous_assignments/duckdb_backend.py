@@ -0,0 +1,533 @@
+"""
+In-process DuckDB backend for the analysis queries over exported files
+
+This script:
+- Opens an in-memory DuckDB database and exposes the files of the data
+  directories under the name of the table they hold: CSV files (the Kaggle
+  all_csv/ set, all_csv/matches.csv -> matches) and Parquet / Arrow datasets
+  written by export_columnar.py (exports/columnar/match_player_stats/ ->
+  detailed_matches_player_stats)
+- Parses each CSV file once into DuckDB's columnar storage; Parquet and Arrow
+  datasets stay on disk behind views and are scanned by every query
+- Reads CSV columns with the types of setup_code/creating_sql.sql, cleaned
+  the way import_csv.py cleans them (percent signs, formatted dates, empty
+  and NaN strings), so raw files can be queried without importing them first
+- Defines the summary tables of migration 003 as views over the base tables
+  when no file provides them
+- Matches Postgres where the shipped SQL depends on it: NULLs first in
+  descending order, to_char() for dates
+- Runs queries.sql or ad-hoc SQL from the command line; main.py and
+  visualizations_simple.py use it with --backend duckdb
+- --compare runs every shipped query (index_advisor.collect_workload()) on
+  Postgres and on DuckDB and reports the queries whose results differ
+
+DuckDB scans the files column by column with vectorized, multi-threaded
+execution, so the reports and charts run on a laptop without a database server.
+
+Usage:
+    python duckdb_backend.py [queries.sql] [--data-dir DIR ...]
+    python duckdb_backend.py --query "SELECT ..." [--data-dir DIR ...]
+    python duckdb_backend.py --tables [--data-dir DIR ...]
+    python duckdb_backend.py --compare [--data-dir DIR ...]
+"""
+
+import argparse
+import datetime
+import glob
+import hashlib
+import math
+import numbers
+import os
+import re
+import sys
+import time
+
+import duckdb
+
+from sql_runner import BATCH_SIZE, split_sql_statements, stream_rows
+
+# Searched in order; the first directory providing a table wins
+DATA_DIRS = [
+    os.path.join('exports', 'columnar'),
+    'all_csv',
+    os.path.join('setup_code', 'all_csv'),
+]
+SCHEMA_FILE = os.path.join('setup_code', 'creating_sql.sql')
+QUERIES_FILE = 'queries.sql'
+
+# export_columnar.py dataset names that differ from the table name
+DATASET_TABLES = {
+    'match_player_stats': 'detailed_matches_player_stats',
+}
+
+# --compare rounds numbers to this many decimals (DuckDB and Postgres round
+# floating-point averages differently in the last digits)
+COMPARE_DECIMALS = 2
+
+# A trailing LIMIT; --compare reruns such queries without it when the rows differ
+TRAILING_LIMIT = re.compile(r'\bLIMIT\s+\d+\s*;?\s*$', re.IGNORECASE)
+
+# Date formats accepted by import_csv.clean_date() besides ISO dates
+DATE_FORMATS = ['%a, %B %d, %Y', '%Y-%m-%d %H:%M:%S']
+
+# Rows import_csv.py drops while importing
+CSV_ROW_FILTERS = {
+    'detailed_matches_player_stats': '"map_name" IS NOT NULL',
+}
+
+# Migration 003 summary tables, computed as in refresh_summary_tables():
+# name -> (query, tables it reads)
+SUMMARY_VIEWS = {
+    'team_summary': ("""
+        SELECT "team",
+               COUNT(*) AS "player_count",
+               COALESCE(SUM("rating"), 0) AS "rating_sum",
+               COUNT("rating") AS "rating_count",
+               COALESCE(SUM("acs"), 0) AS "acs_sum",
+               COUNT("acs") AS "acs_count",
+               COALESCE(SUM("kd_ratio"), 0) AS "kd_sum",
+               COUNT("kd_ratio") AS "kd_count",
+               MIN("rating") AS "min_rating",
+               MAX("rating") AS "max_rating",
+               COALESCE(SUM("kills"), 0) AS "total_kills",
+               COALESCE(SUM("deaths"), 0) AS "total_deaths",
+               COALESCE(SUM("assists"), 0) AS "total_assists",
+               ROUND(COALESCE(SUM("rating"), 0) / NULLIF(COUNT("rating"), 0), 2) AS "avg_rating",
+               ROUND(COALESCE(SUM("acs"), 0)::DOUBLE / NULLIF(COUNT("acs"), 0), 2) AS "avg_acs",
+               ROUND(COALESCE(SUM("kd_ratio"), 0) / NULLIF(COUNT("kd_ratio"), 0), 2) AS "avg_kd"
+        FROM "player_stats"
+        GROUP BY "team"
+    """, ['player_stats']),
+    'agent_pick_summary': ("""
+        SELECT "agent" AS "agent_name",
+               COUNT("player_id") AS "times_picked",
+               COALESCE(SUM("rating"), 0) AS "rating_sum",
+               COUNT("rating") AS "rating_count",
+               ROUND(COALESCE(SUM("rating"), 0) / NULLIF(COUNT("rating"), 0), 2) AS "avg_rating"
+        FROM "detailed_matches_player_stats"
+        WHERE "agent" IS NOT NULL
+        GROUP BY "agent"
+    """, ['detailed_matches_player_stats']),
+    'map_summary': ("""
+        SELECT "map_name",
+               COUNT(*) AS "player_rows",
+               COALESCE(SUM("rating"), 0) AS "rating_sum",
+               COUNT("rating") AS "rating_count",
+               COALESCE(SUM("acs"), 0) AS "acs_sum",
+               COUNT("acs") AS "acs_count",
+               COALESCE(SUM("k"), 0) AS "total_kills",
+               COALESCE(SUM("d"), 0) AS "total_deaths",
+               ROUND(COALESCE(SUM("rating"), 0) / NULLIF(COUNT("rating"), 0), 2) AS "avg_rating",
+               ROUND(COALESCE(SUM("acs"), 0)::DOUBLE / NULLIF(COUNT("acs"), 0), 2) AS "avg_acs"
+        FROM "detailed_matches_player_stats"
+        WHERE "stat_type" = 'map' AND "map_name" IS NOT NULL
+        GROUP BY "map_name"
+    """, ['detailed_matches_player_stats']),
+    'player_daily_summary': ("""
+        SELECT DISTINCT ON (dmps."player_name", m."date")
+               dmps."player_name",
+               m."date" AS "match_date",
+               m."match_id",
+               m."stage",
+               dmps."player_team" AS "team",
+               dmps."rating",
+               dmps."acs",
+               dmps."k" AS "kills",
+               dmps."d" AS "deaths",
+               dmps."a" AS "assists",
+               dmps."map_name",
+               COUNT(*) OVER (PARTITION BY dmps."player_name", m."date") AS "maps_played"
+        FROM "detailed_matches_player_stats" dmps
+        JOIN "matches" m ON m."match_id" = dmps."match_id"
+        WHERE dmps."stat_type" = 'map'
+          AND dmps."player_name" IS NOT NULL
+          AND m."date" IS NOT NULL
+        ORDER BY dmps."player_name", m."date",
+                 dmps."rating" DESC, dmps."acs" DESC, dmps."k" DESC, m."match_id" DESC
+    """, ['detailed_matches_player_stats', 'matches']),
+}
+
+# Postgres behavior the shipped queries rely on
+SESSION_SETTINGS = [
+    "SET default_null_order = 'nulls_last_on_asc_first_on_desc'",
+]
+# to_char(date, format) for the template patterns used in the queries
+TO_CHAR_MACRO = """
+CREATE OR REPLACE MACRO to_char(value, fmt) AS strftime(value,
+    replace(replace(replace(replace(replace(replace(replace(replace(replace(fmt,
+        'FM', ''), 'Month', '%B'), 'Mon', '%b'), 'YYYY', '%Y'), 'HH24', '%H'),
+        'MI', '%M'), 'SS', '%S'), 'DD', '%d'), 'MM', '%m'))
+"""
+
+CREATE_TABLE = re.compile(r'CREATE TABLE\s+"?(\w+)"?\s*\((.*?)\n\);', re.DOTALL | re.IGNORECASE)
+COLUMN_DEFINITION = re.compile(r'^\s*"([^"]+)"\s+([A-Za-z]+(?:\s*\(\s*\d+(?:\s*,\s*\d+)?\s*\))?)')
+
+
+def quote_identifier(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def quote_literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def load_schema(file_path=SCHEMA_FILE):
+    """Column types of the base tables as {table: [(column, type), ...]}"""
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        sql_text = f.read()
+    schema = {}
+    for table, body in CREATE_TABLE.findall(sql_text):
+        columns = []
+        for line in body.splitlines():
+            match = COLUMN_DEFINITION.match(line)
+            if match:
+                columns.append((match.group(1), match.group(2).upper().replace(' ', '')))
+        schema[table] = columns
+    return schema
+
+
+def clean_expression(column, sql_type):
+    """Expression turning the raw CSV text of a column into its schema type"""
+    raw = f"NULLIF(NULLIF(trim({quote_identifier(column)}), ''), 'NaN')"
+    base_type = sql_type.split('(')[0]
+    if base_type in ('INTEGER', 'BIGINT', 'SMALLINT', 'DECIMAL', 'NUMERIC', 'REAL', 'DOUBLE'):
+        # import_csv.py strips everything but digits, '.' and '-' ("72%" -> 72)
+        number = f"TRY_CAST(NULLIF(regexp_replace({raw}, '[^0-9.-]', '', 'g'), '') AS DOUBLE)"
+        if base_type in ('INTEGER', 'BIGINT', 'SMALLINT'):
+            number = f"round({number})"
+        return f"TRY_CAST({number} AS {sql_type})"
+    if base_type in ('DATE', 'TIMESTAMP'):
+        formats = ', '.join(quote_literal(fmt) for fmt in DATE_FORMATS)
+        return f"COALESCE(TRY_CAST({raw} AS {base_type}), CAST(try_strptime({raw}, [{formats}]) AS {base_type}))"
+    return raw
+
+
+def find_sources(data_dirs):
+    """{table: (kind, path, files)} for every CSV file and Parquet / Arrow dataset found"""
+    sources = {}
+    for data_dir in data_dirs:
+        if not os.path.isdir(data_dir):
+            continue
+        for entry in sorted(os.listdir(data_dir)):
+            path = os.path.join(data_dir, entry)
+            name, extension = os.path.splitext(entry)
+            if os.path.isdir(path):
+                parquet_files = glob.glob(os.path.join(path, '**', '*.parquet'), recursive=True)
+                arrow_files = glob.glob(os.path.join(path, '**', '*.arrow'), recursive=True)
+                kind, files = ('parquet', parquet_files) if parquet_files else ('arrow', arrow_files)
+                name = entry
+            elif extension.lower() in ('.csv', '.parquet'):
+                kind, files = extension.lower()[1:], [path]
+            else:
+                continue
+            if not files:
+                continue
+            table = DATASET_TABLES.get(name, name)
+            if table not in sources:
+                sources[table] = (kind, path, files)
+    return sources
+
+
+def files_version(files):
+    """Version stamp of a source from its files' sizes and modification times"""
+    stamp = ','.join(f"{path}:{os.path.getsize(path)}:{os.stat(path).st_mtime_ns}" for path in sorted(files))
+    return 'f' + hashlib.sha256(stamp.encode('utf-8')).hexdigest()[:16]
+
+
+def csv_view_query(conn, table, path, columns):
+    """SELECT over a CSV file with the schema's columns (or every column as text without one)"""
+    scan = f"read_csv({quote_literal(path)}, header = true, all_varchar = true)"
+    if not columns:
+        return f"SELECT * FROM {scan}"
+    present = {row[0] for row in conn.execute(f"DESCRIBE SELECT * FROM {scan}").fetchall()}
+    selected = []
+    for column, sql_type in columns:
+        if column in present:
+            selected.append(f"{clean_expression(column, sql_type)} AS {quote_identifier(column)}")
+        elif table == 'matches' and column == 'match_code':
+            # import_csv.py keeps the original string id as match_code
+            selected.append(f"{quote_identifier('match_id')} AS {quote_identifier(column)}")
+        else:
+            selected.append(f"CAST(NULL AS {sql_type}) AS {quote_identifier(column)}")
+    query = f"SELECT {', '.join(selected)} FROM {scan}"
+    if table in CSV_ROW_FILTERS:
+        query = f"SELECT * FROM ({query}) WHERE {CSV_ROW_FILTERS[table]}"
+    return query
+
+
+def register_source(conn, table, kind, path, columns):
+    """Load a CSV file into a table, or create the view over a dataset; columns are the schema's (or None)"""
+    view = quote_identifier(table)
+    if kind == 'csv':
+        conn.execute(f"CREATE OR REPLACE TABLE {view} AS {csv_view_query(conn, table, path, columns)}")
+        return
+
+    expressions = {}
+    if kind == 'parquet':
+        pattern = os.path.join(path, '**', '*.parquet') if os.path.isdir(path) else path
+        scan = f"read_parquet({quote_literal(pattern)}, hive_partitioning = true, union_by_name = true)"
+    else:
+        # Arrow IPC is read through a pyarrow dataset (scanned lazily, with filter pushdown)
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(path, format='ipc', partitioning='hive')
+        conn.register(f"{table}_arrow", dataset)
+        scan = quote_identifier(f"{table}_arrow")
+        # pyarrow discovers partition values as text; type dates as DuckDB does for Parquet
+        partitioning = dataset.partitioning
+        for field in partitioning.schema if partitioning is not None else []:
+            column = quote_identifier(field.name)
+            all_dates = conn.execute(f"SELECT bool_and(TRY_CAST({column} AS DATE) IS NOT NULL) "
+                                     f"FROM {scan} WHERE {column} IS NOT NULL").fetchone()[0]
+            if str(field.type) == 'string' and all_dates:
+                expressions[field.name] = f"CAST({column} AS DATE) AS {column}"
+
+    # Partition columns come last in a dataset; restore the schema's column order
+    present = [row[0] for row in conn.execute(f"DESCRIBE SELECT * FROM {scan}").fetchall()]
+    ordered = [column for column, _ in columns or [] if column in present]
+    ordered += [column for column in present if column not in ordered]
+    selected = [expressions.get(column, quote_identifier(column)) for column in ordered]
+    conn.execute(f"CREATE OR REPLACE VIEW {view} AS SELECT {', '.join(selected)} FROM {scan}")
+
+
+def connect(data_dirs=None, schema_file=SCHEMA_FILE, database=':memory:'):
+    """DuckDB connection with every table found in the data directories.
+
+    Raises FileNotFoundError if none of the directories holds a data file.
+    The duckdb_sources table lists every table with its files and version.
+    """
+    data_dirs = data_dirs or DATA_DIRS
+    sources = find_sources(data_dirs)
+    if not sources:
+        raise FileNotFoundError(f"no CSV, Parquet or Arrow files in {', '.join(data_dirs)}")
+
+    conn = duckdb.connect(database)
+    for setting in SESSION_SETTINGS:
+        conn.execute(setting)
+    conn.execute(TO_CHAR_MACRO)
+    conn.execute("CREATE OR REPLACE TEMP TABLE duckdb_sources "
+                 "(table_name VARCHAR, kind VARCHAR, path VARCHAR, files INTEGER, version VARCHAR)")
+
+    schema = load_schema(schema_file)
+    versions = {}
+    for table, (kind, path, files) in sources.items():
+        try:
+            register_source(conn, table, kind, path, schema.get(table))
+        except Exception as e:
+            print(f"Warning: skipping {path}: {e}")
+            continue
+        versions[table] = files_version(files)
+        conn.execute("INSERT INTO duckdb_sources VALUES (?, ?, ?, ?, ?)",
+                     [table, kind, path, len(files), versions[table]])
+
+    for table, (query, inputs) in SUMMARY_VIEWS.items():
+        if table in versions or not all(name in versions for name in inputs):
+            continue
+        conn.execute(f"CREATE OR REPLACE VIEW {quote_identifier(table)} AS {query}")
+        # A derived view changes whenever one of its inputs does
+        stamp = ','.join(versions[name] for name in inputs)
+        versions[table] = 'v' + hashlib.sha256(stamp.encode('utf-8')).hexdigest()[:16]
+        conn.execute("INSERT INTO duckdb_sources VALUES (?, 'view', ?, 0, ?)",
+                     [table, ' + '.join(inputs), versions[table]])
+    return conn
+
+
+def is_duckdb(conn):
+    return isinstance(conn, duckdb.DuckDBPyConnection)
+
+
+def table_versions(conn):
+    """Current version stamp of every table, as {table_name: stamp} (like query_cache.table_versions)"""
+    return dict(conn.execute("SELECT table_name, version FROM duckdb_sources").fetchall())
+
+
+def read_sql(conn, query):
+    """Run a query into a DataFrame (the DuckDB counterpart of pd.read_sql_query)"""
+    return conn.execute(query).df()
+
+
+def comparable(value):
+    """A result value in a form that is equal on both backends (numbers rounded, dates as ISO text)"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return None
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, numbers.Number):
+        return round(float(value), COMPARE_DECIMALS)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+def fetch_comparable(cursor, sql):
+    """(column names, rows of comparable values) of a query on a Postgres cursor or a DuckDB connection"""
+    cursor.execute(sql)
+    columns = [column[0] for column in cursor.description]
+    rows = [tuple(comparable(value) for value in row) for row in cursor.fetchall()]
+    return columns, rows
+
+
+def same_rows(expected, actual):
+    """True if both results hold the same rows, in any order"""
+    return sorted(expected, key=repr) == sorted(actual, key=repr)
+
+
+def same_rows_without_limit(conn, pg_conn, sql):
+    """True if the query returns the same rows on both backends once its trailing LIMIT is dropped"""
+    unlimited = TRAILING_LIMIT.sub('', sql.strip())
+    try:
+        with pg_conn.cursor() as cursor:
+            expected = fetch_comparable(cursor, unlimited)
+    finally:
+        pg_conn.rollback()
+    return same_rows(expected[1], fetch_comparable(conn, unlimited)[1])
+
+
+def compare_with_postgres(conn, pg_conn, workload):
+    """Run every (source, label, sql) of the workload on both backends.
+
+    Returns one record per query with a status: 'same', 'order' (the same
+    rows, but tied rows in another order), 'limit' (LIMIT kept other tied
+    rows; without the LIMIT both return the same rows), 'different' or
+    'error'.
+    """
+    records = []
+    for source, label, sql in workload:
+        record = {'source': source, 'label': label}
+        try:
+            with pg_conn.cursor() as cursor:
+                expected = fetch_comparable(cursor, sql)
+        except Exception as e:
+            record.update(status='error', detail=f"Postgres: {str(e).strip()}")
+            records.append(record)
+            continue
+        finally:
+            pg_conn.rollback()
+        try:
+            actual = fetch_comparable(conn, sql)
+        except Exception as e:
+            record.update(status='error', detail=f"DuckDB: {str(e).strip()}")
+            records.append(record)
+            continue
+
+        if expected[0] != actual[0]:
+            record.update(status='different', detail=f"columns {expected[0]} vs {actual[0]}")
+        elif expected[1] == actual[1]:
+            record.update(status='same', detail=f"{len(actual[1])} rows")
+        elif same_rows(expected[1], actual[1]):
+            record.update(status='order', detail=f"{len(actual[1])} rows")
+        elif TRAILING_LIMIT.search(sql) and same_rows_without_limit(conn, pg_conn, sql):
+            record.update(status='limit', detail=f"{len(actual[1])} rows")
+        else:
+            first = next((i for i, (a, b) in enumerate(zip(expected[1], actual[1])) if a != b),
+                         min(len(expected[1]), len(actual[1])))
+            record.update(status='different',
+                          detail=f"{len(expected[1])} vs {len(actual[1])} rows, first difference at row {first + 1}")
+        records.append(record)
+    return records
+
+
+def run_sql_script(conn, file_path, out=None, batch_size=BATCH_SIZE):
+    """Run every statement of a SQL script and stream the results to out, as sql_runner does.
+
+    Returns the per-statement timing records.
+    """
+    out = out or sys.stdout
+    with open(file_path, 'r', encoding='utf-8') as f:
+        statements = split_sql_statements(f.read())
+
+    results = []
+    script_started = time.perf_counter()
+    for index, (line, sql) in enumerate(statements, 1):
+        preview = ' '.join(sql.split())[:50]
+        out.write(f"\nExecuting query: {preview}...\n")
+        record = {'index': index, 'line': line, 'statement': preview}
+        started = time.perf_counter()
+        try:
+            conn.execute(sql)
+            execute_ms = (time.perf_counter() - started) * 1000
+            if conn.description:
+                rows = stream_rows(conn, out, batch_size)
+            else:
+                out.write("Query executed successfully, no results to display.\n")
+                rows = 0
+            record.update(status='ok', rows=rows, execute_ms=round(execute_ms, 3))
+        except Exception as e:
+            out.write(f"Error executing statement {index} (line {line}): {e}\n")
+            record.update(status='error', error=str(e).strip())
+        record['total_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        results.append(record)
+
+    total_ms = (time.perf_counter() - script_started) * 1000
+    errors = sum(1 for record in results if record['status'] == 'error')
+    out.write(f"\nExecuted {len(results)} statements from {file_path} "
+              f"({errors} errors) in {total_ms:.1f} ms\n")
+    return results
+
+
+def compare_backends(conn):
+    """Print compare_with_postgres() for the shipped workload; False if any query differs or fails"""
+    # index_advisor imports main.py and visualizations_simple.py, which import this module
+    from index_advisor import collect_workload, connect_to_db
+
+    pg_conn = connect_to_db()
+    if not pg_conn:
+        return False
+    try:
+        records = compare_with_postgres(conn, pg_conn, collect_workload())
+    finally:
+        pg_conn.close()
+
+    print(f"{'Source':<26} {'Query':<40} {'Result':<10} Detail")
+    print("-" * 100)
+    for record in records:
+        print(f"{record['source']:<26} {record['label'][:39]:<40} {record['status']:<10} {record['detail'][:80]}")
+    counts = {status: sum(1 for r in records if r['status'] == status)
+              for status in ('same', 'order', 'limit', 'different', 'error')}
+    print(f"\n{len(records)} queries: {counts['same']} same, {counts['order']} same rows with ties "
+          f"in another order, {counts['limit']} keeping other tied rows at the LIMIT, "
+          f"{counts['different']} different, {counts['error']} errors")
+    return counts['different'] == 0 and counts['error'] == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run SQL on DuckDB over the exported CSV / Parquet files")
+    parser.add_argument('file', nargs='?', default=QUERIES_FILE,
+                        help=f"SQL script to run (default: {QUERIES_FILE})")
+    parser.add_argument('--data-dir', action='append',
+                        help=f"directory of data files, repeatable (default: {', '.join(DATA_DIRS)})")
+    parser.add_argument('--query', help="run this SQL instead of a script")
+    parser.add_argument('--tables', action='store_true', help="list the tables found and exit")
+    parser.add_argument('--compare', action='store_true',
+                        help="run the shipped queries on Postgres too and report differing results")
+    args = parser.parse_args()
+
+    try:
+        conn = connect(args.data_dir)
+    except Exception as e:
+        print(f"Error opening the data files: {e}")
+        return
+
+    try:
+        if args.tables:
+            sources = conn.execute("SELECT table_name, kind, path, files FROM duckdb_sources "
+                                   "ORDER BY table_name").df()
+            print(sources.to_string(index=False))
+        elif args.compare:
+            if not compare_backends(conn):
+                sys.exit(1)
+        elif args.query:
+            df = read_sql(conn, args.query)
+            print(df.to_string(index=False) if not df.empty else "No results found.")
+            print(f"\nRows returned: {len(df)}")
+        else:
+            run_sql_script(conn, args.file)
+    except Exception as e:
+        print(f"Error executing query: {e}")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""
+Columnar Parquet / Arrow IPC export of tables and query results
+
+This script:
+- Streams a table or query from a server-side cursor in batches and converts
+  each batch to an Arrow record batch, typed from the Postgres column types
+- Writes the batches as a Hive-partitioned dataset (for example
+  match_date=2024-08-01/part-....parquet) in Parquet with zstd compression and
+  row-group statistics, or in Arrow IPC (Feather v2) format
+- Appends incrementally by match date: the last exported date is kept as a
+  watermark, and the next run rewrites that date's partitions and adds newer
+  ones, so matches inserted later on the same day are not lost
+- Writes each run into a hidden staging directory first and only swaps the
+  new files in (replacing the partitions they supersede) after the write has
+  succeeded, so a failed run leaves the previous export intact
+- Writes an _export_state.json next to each dataset (ignored by dataset readers)
+
+Usage:
+    python export_columnar.py [name ...] [--format parquet|arrow] [--full]
+    python export_columnar.py --query "SELECT ..." --name NAME [--partition-by COLUMN]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+import psycopg2
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+# Db connection parameters
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'data_v',
+    'user': 'postgres',
+    'password': '0412',
+    'port': '5432'
+}
+
+OUTPUT_DIR = os.path.join('exports', 'columnar')
+STATE_FILE = '_export_state.json'
+BATCH_SIZE = 50000
+ROW_GROUP_SIZE = 100000
+COMPRESSION = 'zstd'
+
+# Directory name pyarrow uses for NULL partition values
+HIVE_NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+# Hidden working directories inside a dataset; dataset readers and glob skip dot names
+STAGING_DIR = '.staging'
+REPLACED_DIR = '.replaced'
+
+# Default export set: name -> (query, match date column or None)
+COLUMNAR_EXPORTS = {
+    'matches': ("SELECT * FROM matches", 'date'),
+    'match_player_stats': ("SELECT * FROM detailed_matches_player_stats", 'match_date'),
+    'player_daily_summary': ("SELECT * FROM player_daily_summary", 'match_date'),
+    'player_stats': ("SELECT * FROM player_stats", None),
+    'team_summary': ("SELECT * FROM team_summary", None),
+    'maps_stats': ("SELECT * FROM maps_stats", None),
+    'map_summary': ("SELECT * FROM map_summary", None),
+    'agent_pick_summary': ("SELECT * FROM agent_pick_summary", None),
+}
+
+# Postgres type OID -> Arrow type; anything else is exported as text
+ARROW_TYPES = {
+    16: pa.bool_(),
+    20: pa.int64(),
+    21: pa.int16(),
+    23: pa.int32(),
+    700: pa.float32(),
+    701: pa.float64(),
+    25: pa.string(),
+    1042: pa.string(),
+    1043: pa.string(),
+    1082: pa.date32(),
+    1083: pa.time64('us'),
+    1114: pa.timestamp('us'),
+    1184: pa.timestamp('us', tz='UTC'),
+}
+NUMERIC_OID = 1700
+
+FORMATS = ('parquet', 'arrow')
+
+
+def connect_to_db():
+    """Establish db connection"""
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        return conn
+    except Exception as e:
+        print(f"Error connecting to db: {e}")
+        return None
+
+
+def arrow_schema(description):
+    """Arrow schema for a cursor description, plus a value converter per column (or None)"""
+    fields = []
+    converters = []
+    for column in description:
+        converter = None
+        if column.type_code == NUMERIC_OID:
+            if column.precision and column.precision <= 38 and column.scale is not None:
+                arrow_type = pa.decimal128(column.precision, column.scale)
+            else:
+                # Unconstrained NUMERIC has no fixed scale; store it as a double
+                arrow_type = pa.float64()
+                converter = float
+        elif column.type_code in ARROW_TYPES:
+            arrow_type = ARROW_TYPES[column.type_code]
+        else:
+            arrow_type = pa.string()
+            converter = str
+        fields.append(pa.field(column.name, arrow_type))
+        converters.append(converter)
+    return pa.schema(fields), converters
+
+
+def to_record_batch(rows, schema, converters):
+    """Convert a list of row tuples into an Arrow record batch"""
+    arrays = []
+    for index, (field, values) in enumerate(zip(schema, zip(*rows))):
+        converter = converters[index]
+        if converter is not None:
+            values = [None if value is None else converter(value) for value in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def load_state(target_dir):
+    """State of the previous export of a dataset, or {} if there is none"""
+    path = os.path.join(target_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(target_dir, state):
+    """Write the dataset state atomically"""
+    path = os.path.join(target_dir, STATE_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def partitions_from(target_dir, partition_by, watermark):
+    """Names of the partition directories whose value is >= the watermark (ISO dates)"""
+    prefix = f"{partition_by}="
+    partitions = []
+    for entry in os.listdir(target_dir):
+        if not entry.startswith(prefix):
+            continue
+        value = entry[len(prefix):]
+        if value != HIVE_NULL_PARTITION and value >= watermark:
+            partitions.append(entry)
+    return partitions
+
+
+def dataset_entries(target_dir):
+    """Every data file and partition directory of a dataset (not its state or working directories)"""
+    return [entry for entry in os.listdir(target_dir)
+            if entry not in (STATE_FILE, STAGING_DIR, REPLACED_DIR)]
+
+
+def swap_in_staged(target_dir, staging_dir, replaced):
+    """Replace the given entries of target_dir with everything written to staging_dir.
+
+    Only renames happen here, so the dataset is never left without the
+    superseded partitions unless the process dies between two renames.
+    """
+    replaced_dir = os.path.join(target_dir, REPLACED_DIR)
+    shutil.rmtree(replaced_dir, ignore_errors=True)
+    os.makedirs(replaced_dir)
+    for entry in replaced:
+        os.replace(os.path.join(target_dir, entry), os.path.join(replaced_dir, entry))
+    for entry in os.listdir(staging_dir):
+        os.replace(os.path.join(staging_dir, entry), os.path.join(target_dir, entry))
+    shutil.rmtree(replaced_dir)
+    os.rmdir(staging_dir)
+
+
+def export_query(conn, name, query, fmt='parquet', partition_by=None, full=False,
+                 output_dir=OUTPUT_DIR, batch_size=BATCH_SIZE):
+    """Export one query as a columnar dataset under output_dir/name.
+
+    With a partition column and an earlier export in the same format, only
+    rows with partition_by >= the stored watermark are read, and they replace
+    those partitions; otherwise the dataset is rebuilt. The rows are written
+    to a staging directory first, so the existing files are only replaced
+    once the query and the write have succeeded. Returns a dict with the row
+    count, file count and timing.
+    """
+    target_dir = os.path.join(output_dir, name)
+    state = load_state(target_dir)
+    incremental = (not full and partition_by is not None and state.get('format') == fmt
+                   and state.get('partition_by') == partition_by and state.get('watermark'))
+
+    params = None
+    if incremental:
+        watermark = state['watermark']
+        query = f'SELECT * FROM ({query}) src WHERE src."{partition_by}" >= %s'
+        params = (watermark,)
+    else:
+        watermark = None
+    os.makedirs(target_dir, exist_ok=True)
+    # Left over from a run that failed
+    staging_dir = os.path.join(target_dir, STAGING_DIR)
+    shutil.rmtree(staging_dir, ignore_errors=True)
+
+    started = time.perf_counter()
+    cursor = conn.cursor(name=f"columnar_export_{name}")
+    cursor.itersize = batch_size
+    try:
+        cursor.execute(query, params)
+        # DECLARE is lazy; the first FETCH runs the query and fills description
+        rows = cursor.fetchmany(batch_size)
+        schema, converters = arrow_schema(cursor.description)
+        if partition_by is not None and partition_by not in schema.names:
+            raise ValueError(f"partition column {partition_by!r} is not in the result of {name}")
+
+        totals = {'rows': 0, 'max_partition': None}
+
+        def record_batches():
+            batch_rows = rows
+            while batch_rows:
+                batch = to_record_batch(batch_rows, schema, converters)
+                totals['rows'] += batch.num_rows
+                if partition_by is not None:
+                    batch_max = pc.max(batch.column(partition_by)).as_py()
+                    if batch_max is not None and (totals['max_partition'] is None
+                                                  or batch_max > totals['max_partition']):
+                        totals['max_partition'] = batch_max
+                yield batch
+                batch_rows = cursor.fetchmany(batch_size)
+
+        written = []
+        file_format = ds.ParquetFileFormat() if fmt == 'parquet' else ds.IpcFileFormat()
+        if fmt == 'parquet':
+            file_options = file_format.make_write_options(compression=COMPRESSION,
+                                                          write_statistics=True)
+        else:
+            file_options = file_format.make_write_options(compression=COMPRESSION)
+
+        run_id = datetime.now().strftime('%Y%m%d%H%M%S')
+        extension = 'parquet' if fmt == 'parquet' else 'arrow'
+        ds.write_dataset(
+            pa.RecordBatchReader.from_batches(schema, record_batches()),
+            staging_dir,
+            format=file_format,
+            file_options=file_options,
+            partitioning=[partition_by] if partition_by else None,
+            partitioning_flavor='hive' if partition_by else None,
+            basename_template=f"part-{run_id}-{{i}}.{extension}",
+            existing_data_behavior='overwrite_or_ignore',
+            # A batch has at most batch_size rows, so it can never span more partitions
+            max_partitions=batch_size,
+            max_rows_per_group=ROW_GROUP_SIZE,
+            file_visitor=lambda written_file: written.append(written_file.path),
+        )
+    except Exception:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        raise
+    finally:
+        cursor.close()
+        # End the read transaction the cursor ran in
+        conn.rollback()
+
+    written_bytes = sum(os.path.getsize(path) for path in written)
+    os.makedirs(staging_dir, exist_ok=True)
+    if incremental:
+        replaced = partitions_from(target_dir, partition_by, watermark)
+    else:
+        replaced = dataset_entries(target_dir)
+    swap_in_staged(target_dir, staging_dir, replaced)
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    new_watermark = totals['max_partition'] if totals['max_partition'] is not None else watermark
+    save_state(target_dir, {
+        'format': fmt,
+        'partition_by': partition_by,
+        'watermark': new_watermark.isoformat() if hasattr(new_watermark, 'isoformat') else new_watermark,
+        'rows_written': totals['rows'],
+        'exported_at': datetime.now().isoformat(timespec='seconds'),
+    })
+    return {
+        'name': name,
+        'mode': 'incremental' if incremental else 'full',
+        'rows': totals['rows'],
+        'files': len(written),
+        'bytes': written_bytes,
+        'elapsed_ms': round(elapsed_ms, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export tables or queries as Parquet or Arrow datasets")
+    parser.add_argument('names', nargs='*',
+                        help=f"exports to run (default: all of {', '.join(COLUMNAR_EXPORTS)})")
+    parser.add_argument('--format', choices=FORMATS, default='parquet',
+                        help="file format (default: parquet)")
+    parser.add_argument('--full', action='store_true',
+                        help="rebuild datasets instead of appending from the watermark")
+    parser.add_argument('--query', help="ad hoc query to export (requires --name)")
+    parser.add_argument('--name', help="dataset name for --query")
+    parser.add_argument('--partition-by', help="partition column for --query (a date column)")
+    parser.add_argument('--output-dir', default=OUTPUT_DIR,
+                        help=f"base directory for the datasets (default: {OUTPUT_DIR})")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f"rows fetched per round trip (default: {BATCH_SIZE})")
+    args = parser.parse_args()
+
+    if args.query:
+        if not args.name:
+            parser.error("--query requires --name")
+        exports = {args.name: (args.query, args.partition_by)}
+    else:
+        unknown = [name for name in args.names if name not in COLUMNAR_EXPORTS]
+        if unknown:
+            parser.error(f"unknown export(s): {', '.join(unknown)}")
+        exports = {name: COLUMNAR_EXPORTS[name] for name in (args.names or COLUMNAR_EXPORTS)}
+
+    conn = connect_to_db()
+    if not conn:
+        return
+
+    try:
+        print(f"{'Dataset':<22} {'Mode':<12} {'Rows':>10} {'Files':>6} {'KB':>10} {'ms':>10}")
+        print("-" * 75)
+        for name, (query, partition_by) in exports.items():
+            try:
+                result = export_query(conn, name, query, fmt=args.format,
+                                      partition_by=partition_by, full=args.full,
+                                      output_dir=args.output_dir, batch_size=args.batch_size)
+            except Exception as e:
+                print(f"Error exporting {name}: {e}")
+                continue
+            print(f"{result['name']:<22} {result['mode']:<12} {result['rows']:>10} "
+                  f"{result['files']:>6} {result['bytes'] / 1024:>10.1f} {result['elapsed_ms']:>10.1f}")
+        print(f"\nDatasets written under {args.output_dir}/")
+    finally:
+        conn.close()
+        print("\nDb connection closed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+Index advisor for the shipped query workload
+
+This script:
+- Collects every query shipped with the project (queries.sql, the main.py reports,
+  and the chart/export queries in visualizations_simple.py)
+- Runs EXPLAIN (ANALYZE, BUFFERS) over each query to record a baseline
+- Creates the candidate indexes inside a transaction and re-runs the workload
+- Reports before/after latency per query and which candidates the planner used
+- Writes the candidates that made a query faster as a reproducible migration
+
+By default the candidate indexes are rolled back after the measurement, so the
+advisor can be run against a live database without changing it. Use --apply to
+create the recommended indexes for real.
+"""
+
+import argparse
+import json
+import os
+import statistics
+from datetime import datetime
+
+import psycopg2
+
+import main as analysis_reports
+from sql_runner import read_sql_statements
+import visualizations_simple as chart_queries
+
+# Db connection parameters
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'data_v',
+    'user': 'postgres',
+    'password': '0412',
+    'port': '5432'
+}
+
+QUERIES_FILE = 'queries.sql'
+REPORT_FILE = os.path.join('exports', 'index_advisor_report.json')
+MIGRATION_FILE = os.path.join('setup_code', 'migrations', '001_workload_indexes.sql')
+
+# A new index is only recommended if a query using it got at least this much faster
+MIN_SPEEDUP = 1.10
+
+# Candidate indexes derived from the filters, joins and sort keys of the workload.
+# Kinds: composite (several key columns), covering (INCLUDE columns for index-only
+# scans) and partial (WHERE stat_type = 'map', which every per-map query filters on).
+CANDIDATE_INDEXES = [
+    {
+        'name': 'idx_dmps_map_player_id',
+        'table': 'detailed_matches_player_stats',
+        'kind': 'partial, covering',
+        'definition': "(player_id) INCLUDE (rating, acs, map_name) WHERE stat_type = 'map'",
+        'reason': "player_stats JOIN detailed_matches_player_stats ON player_id WHERE stat_type = 'map'",
+    },
+    {
+        'name': 'idx_dmps_map_rating',
+        'table': 'detailed_matches_player_stats',
+        'kind': 'partial, composite',
+        'definition': "(rating DESC, map_name) WHERE stat_type = 'map'",
+        'reason': "Topic 6: WHERE stat_type = 'map' ORDER BY rating DESC, map_name LIMIT 10",
+    },
+    {
+        'name': 'idx_dmps_map_player_name',
+        'table': 'detailed_matches_player_stats',
+        'kind': 'partial, composite, covering',
+        'definition': "(player_name, match_id) INCLUDE (rating, acs, map_name) WHERE stat_type = 'map'",
+        'reason': "Line chart and timeline: stat_type = 'map' AND player_name IN (...) joined on match_id",
+    },
+    {
+        'name': 'idx_dmps_agent',
+        'table': 'detailed_matches_player_stats',
+        'kind': 'covering',
+        'definition': '(agent) INCLUDE (player_id, rating)',
+        'reason': 'Agent performance: agents_stats LEFT JOIN detailed_matches_player_stats ON agent',
+    },
+    {
+        'name': 'idx_player_stats_team',
+        'table': 'player_stats',
+        'kind': 'covering',
+        'definition': '(team) INCLUDE (rating, acs, kd_ratio)',
+        'reason': 'Team stats, pie chart and Excel team sheet: GROUP BY team',
+    },
+    {
+        'name': 'idx_player_stats_rating_rounds',
+        'table': 'player_stats',
+        'kind': 'composite',
+        'definition': '(rating DESC, rounds)',
+        'reason': 'Top players: WHERE rounds > 100 ORDER BY rating DESC LIMIT n',
+    },
+    {
+        'name': 'idx_player_stats_acs_rounds',
+        'table': 'player_stats',
+        'kind': 'composite',
+        'definition': '(acs DESC, rounds)',
+        'reason': 'Bar chart: WHERE rounds > 100 ORDER BY acs DESC LIMIT 10',
+    },
+    {
+        'name': 'idx_player_stats_hs_percent',
+        'table': 'player_stats',
+        'kind': 'partial',
+        'definition': '(hs_percent DESC) WHERE hs_percent IS NOT NULL',
+        'reason': 'Topic 8: WHERE hs_percent IS NOT NULL ORDER BY hs_percent DESC LIMIT 10',
+    },
+    {
+        'name': 'idx_economy_data_team',
+        'table': 'economy_data',
+        'kind': 'covering',
+        'definition': '("Team") INCLUDE ("Pistol Won")',
+        'reason': 'Topic 4: economy_data RIGHT JOIN player_stats ON "Team" = team',
+    },
+    {
+        'name': 'idx_matches_date',
+        'table': 'matches',
+        'kind': 'single column',
+        'definition': '(date)',
+        'reason': 'Timeline and line chart order by match date; cleanup filters by date',
+    },
+]
+
+
+def connect_to_db():
+    """Establish db connection"""
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        return conn
+    except Exception as e:
+        print(f"Error connecting to db: {e}")
+        return None
+
+
+def index_ddl(candidate):
+    """Build the CREATE INDEX statement for a candidate"""
+    return (
+        f"CREATE INDEX IF NOT EXISTS {candidate['name']} "
+        f"ON {candidate['table']} {candidate['definition']}"
+    )
+
+
+def collect_workload():
+    """Collect every shipped query as (source, label, sql) tuples"""
+    workload = []
+
+    for i, statement in enumerate(read_sql_statements(QUERIES_FILE), 1):
+        workload.append((QUERIES_FILE, f"Statement {i}", statement))
+
+    for _, reports in analysis_reports.ANALYSIS_SECTIONS:
+        for description, query in reports:
+            workload.append(('main.py', description, query))
+
+    for description, query in chart_queries.CHART_QUERIES.items():
+        workload.append(('visualizations_simple.py', description, query))
+
+    return workload
+
+
+def walk_plan(node, indexes_used, seq_scans):
+    """Collect index names and sequentially scanned tables from a JSON plan tree"""
+    if 'Index Name' in node:
+        indexes_used.add(node['Index Name'])
+    if node.get('Node Type') == 'Seq Scan' and 'Relation Name' in node:
+        seq_scans.add(node['Relation Name'])
+    for child in node.get('Plans', []):
+        walk_plan(child, indexes_used, seq_scans)
+
+
+def plan_shape(node):
+    """Compact outline of a JSON plan tree: node types with their index or table, children in parentheses"""
+    label = node['Node Type']
+    target = node.get('Index Name') or node.get('Relation Name')
+    if target:
+        label += f" on {target}"
+    children = [plan_shape(child) for child in node.get('Plans', [])]
+    return f"{label} ({', '.join(children)})" if children else label
+
+
+def profile_query(cursor, sql, repeat):
+    """Run EXPLAIN (ANALYZE, BUFFERS) on a query and summarize the runs"""
+    sql = sql.strip().rstrip(';')
+    execution_times = []
+    result = None
+
+    # The first run warms the buffer cache and is not counted
+    for run in range(repeat + 1):
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+        explain = cursor.fetchone()[0][0]
+        if run > 0:
+            execution_times.append(explain['Execution Time'])
+        result = explain
+
+    plan = result['Plan']
+    indexes_used, seq_scans = set(), set()
+    walk_plan(plan, indexes_used, seq_scans)
+
+    return {
+        'execution_ms': round(statistics.median(execution_times), 3),
+        'planning_ms': round(result['Planning Time'], 3),
+        'shared_hit_blocks': plan.get('Shared Hit Blocks', 0),
+        'shared_read_blocks': plan.get('Shared Read Blocks', 0),
+        'top_node': plan['Node Type'],
+        'plan_shape': plan_shape(plan),
+        'indexes_used': sorted(indexes_used),
+        'seq_scans': sorted(seq_scans),
+    }
+
+
+def profile_workload(conn, workload, repeat):
+    """Profile every query of the workload; failures are recorded, not raised"""
+    results = []
+    cursor = conn.cursor()
+    for source, label, sql in workload:
+        cursor.execute("SAVEPOINT advisor_query")
+        try:
+            profile = profile_query(cursor, sql, repeat)
+            cursor.execute("RELEASE SAVEPOINT advisor_query")
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT advisor_query")
+            profile = {'error': str(e).strip()}
+        results.append({'source': source, 'label': label, **profile})
+    cursor.close()
+    return results
+
+
+def existing_index_names(conn):
+    """Return the names of indexes that already exist in the current schema"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")
+    names = {row[0] for row in cursor.fetchall()}
+    cursor.close()
+    return names
+
+
+def evaluate_candidates(conn, workload, repeat):
+    """Measure the workload before and after creating the candidate indexes.
+
+    Everything runs in one transaction that the caller commits or rolls back,
+    so the candidates only exist for the duration of the measurement.
+    """
+    existing = existing_index_names(conn)
+    new_candidates = [c for c in CANDIDATE_INDEXES if c['name'] not in existing]
+
+    print(f"Profiling {len(workload)} queries without candidate indexes...")
+    before = profile_workload(conn, workload, repeat)
+
+    cursor = conn.cursor()
+    for candidate in new_candidates:
+        cursor.execute(index_ddl(candidate))
+    # Fresh statistics so the planner costs the new indexes correctly
+    for table in sorted({c['table'] for c in new_candidates}):
+        cursor.execute(f"ANALYZE {table}")
+    cursor.close()
+    print(f"Created {len(new_candidates)} candidate indexes "
+          f"({len(CANDIDATE_INDEXES) - len(new_candidates)} already present)")
+
+    print("Profiling the workload with candidate indexes...")
+    after = profile_workload(conn, workload, repeat)
+
+    return before, after, existing
+
+
+def summarize(before, after, existing):
+    """Combine before/after profiles and decide which candidates to recommend"""
+    queries = []
+    used_by = {c['name']: [] for c in CANDIDATE_INDEXES}
+    speedups = {c['name']: [] for c in CANDIDATE_INDEXES}
+
+    for b, a in zip(before, after):
+        entry = {
+            'source': b['source'],
+            'label': b['label'],
+            'before': b,
+            'after': a,
+        }
+        if 'error' not in b and 'error' not in a:
+            entry['speedup'] = round(b['execution_ms'] / max(a['execution_ms'], 0.001), 2)
+            for name in a['indexes_used']:
+                if name in used_by:
+                    used_by[name].append(f"{b['source']}: {b['label']}")
+                    speedups[name].append(entry['speedup'])
+        queries.append(entry)
+
+    candidates = []
+    for candidate in CANDIDATE_INDEXES:
+        name = candidate['name']
+        already_present = name in existing
+        if already_present:
+            # Present before and after, so there is no speedup to compare
+            recommended = bool(used_by[name])
+        else:
+            recommended = any(s >= MIN_SPEEDUP for s in speedups[name])
+        candidates.append({
+            **candidate,
+            'already_present': already_present,
+            'used_by': used_by[name],
+            'best_speedup': max(speedups[name], default=None),
+            'recommended': recommended,
+        })
+
+    return queries, candidates
+
+
+def print_report(queries, candidates):
+    """Print before/after latency per query and the candidate verdicts"""
+    print(f"\n{'='*100}")
+    print("QUERY LATENCY (median EXPLAIN ANALYZE execution time)")
+    print(f"{'='*100}")
+    print(f"{'Source':<26} {'Query':<36} {'Before ms':>10} {'After ms':>10} {'Speedup':>8}")
+    print("-" * 100)
+    for q in queries:
+        label = q['label'][:35]
+        if 'speedup' in q:
+            print(f"{q['source']:<26} {label:<36} {q['before']['execution_ms']:>10.3f} "
+                  f"{q['after']['execution_ms']:>10.3f} {q['speedup']:>7.2f}x")
+        else:
+            error = q['before'].get('error') or q['after'].get('error')
+            print(f"{q['source']:<26} {label:<36} ERROR: {error.splitlines()[0][:60]}")
+
+    print(f"\n{'='*100}")
+    print("CANDIDATE INDEXES")
+    print(f"{'='*100}")
+    for c in candidates:
+        if c['recommended']:
+            verdict = 'RECOMMENDED'
+        elif c['used_by']:
+            verdict = 'used, no gain'
+        else:
+            verdict = 'unused'
+        present = ' (already present)' if c['already_present'] else ''
+        print(f"[{verdict}] {c['name']} ({c['kind']}){present}")
+        print(f"    {index_ddl(c)}")
+        for usage in c['used_by']:
+            print(f"    used by {usage}")
+
+
+def write_migration(candidates, file_path):
+    """Write the recommended indexes as an idempotent SQL migration"""
+    recommended = [c for c in candidates if c['recommended']]
+    lines = [
+        "-- Secondary indexes for the shipped query workload",
+        "-- Generated by index_advisor.py; safe to re-run (IF NOT EXISTS).",
+        "",
+    ]
+    for c in recommended:
+        lines.append(f"-- {c['kind']}: {c['reason']}")
+        lines.append(f"{index_ddl(c)};")
+        lines.append("")
+    for table in sorted({c['table'] for c in recommended}):
+        lines.append(f"ANALYZE {table};")
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines).rstrip() + "\n")
+    print(f"\nMigration written: {file_path} ({len(recommended)} indexes)")
+
+
+def write_report(queries, candidates, file_path):
+    """Write the full before/after report as JSON"""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'queries': queries,
+        'candidates': candidates,
+    }
+    with open(file_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"Report written: {file_path}")
+
+
+def apply_recommended(conn, candidates):
+    """Create the recommended indexes permanently"""
+    cursor = conn.cursor()
+    recommended = [c for c in candidates if c['recommended'] and not c['already_present']]
+    for c in recommended:
+        cursor.execute(index_ddl(c))
+        print(f"  - Created {c['name']}")
+    for table in sorted({c['table'] for c in recommended}):
+        cursor.execute(f"ANALYZE {table}")
+    conn.commit()
+    cursor.close()
+    print(f"Applied {len(recommended)} indexes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propose indexes for the shipped query workload")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="measured EXPLAIN ANALYZE runs per query (default: 3)")
+    parser.add_argument('--apply', action='store_true',
+                        help="create the recommended indexes instead of only reporting them")
+    parser.add_argument('--report', default=REPORT_FILE, help="JSON report path")
+    parser.add_argument('--migration', default=MIGRATION_FILE, help="SQL migration path")
+    args = parser.parse_args()
+
+    print("INDEX ADVISOR - SHIPPED QUERY WORKLOAD")
+    print("=" * 60)
+
+    conn = connect_to_db()
+    if not conn:
+        return
+
+    try:
+        workload = collect_workload()
+        before, after, existing = evaluate_candidates(conn, workload, args.repeat)
+        # Candidate indexes only existed for the measurement
+        conn.rollback()
+
+        queries, candidates = summarize(before, after, existing)
+        print_report(queries, candidates)
+        write_migration(candidates, args.migration)
+        write_report(queries, candidates, args.report)
+
+        if args.apply:
+            print("\nApplying recommended indexes...")
+            apply_recommended(conn, candidates)
+    except Exception as e:
+        conn.rollback()
+        print(f"Error during index analysis: {e}")
+    finally:
+        conn.close()
+        print("\nDb connection closed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,20 @@
 #!/usr/bin/env python3
 
+import argparse
+import io
+import time
+
 import psycopg2
-import pandas as pd
+
+from query_cache import cached_read_sql_chunks
+from query_pool import MAX_WORKERS, QueryPool
+from query_stream import stream_query
+from sql_runner import run_sql_script
+
+try:
+    import duckdb_backend
+except ImportError:
+    duckdb_backend = None
 
 # Db connection parameters
 DB_CONFIG = {
@@ -21,85 +34,91 @@ def connect_to_db():
         print(f"Error connecting to db: {e}")
         return None
 
-def execute_query(conn, query, description):
-    """Execute a query and display results in a formatted table"""
+def connect_to_duckdb(data_dirs=None):
+    """Open the data files in DuckDB (see duckdb_backend.py)"""
+    if duckdb_backend is None:
+        print("Error: the duckdb backend needs the duckdb package (pip install duckdb)")
+        return None
     try:
-        print(f"\n{'='*60}")
-        print(f"QUERY: {description}")
-        print(f"{'='*60}")
-        
-        df = pd.read_sql_query(query, conn)
-        
-        if df.empty:
-            print("No results found.")
-            return
-        
-        # Display results in a nice table format
-        print(df.to_string(index=False))
-        print(f"\nRows returned: {len(df)}")
-        
+        return duckdb_backend.connect(data_dirs)
+    except Exception as e:
+        print(f"Error opening the data files: {e}")
+        return None
+
+def is_duckdb(conn):
+    return duckdb_backend is not None and duckdb_backend.is_duckdb(conn)
+
+def print_query_header(description):
+    print(f"\n{'='*60}")
+    print(f"QUERY: {description}")
+    print(f"{'='*60}")
+
+def print_query_chunks(description, chunks):
+    """Display a result streamed as DataFrame chunks; returns False if the query failed.
+
+    Rows are printed as they arrive, so the result never has to fit in memory.
+    The header comes with the first chunk and every chunk is aligned on its own.
+    """
+    print_query_header(description)
+    
+    row_count = 0
+    try:
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            print(chunk.to_string(index=False, header=row_count == 0))
+            row_count += len(chunk)
     except Exception as e:
         print(f"Error executing query: {e}")
+        return False
+    
+    if row_count == 0:
+        print("No results found.")
+    else:
+        print(f"\nRows returned: {row_count}")
+    return True
+
+def print_query_result(description, df, error=None):
+    """Display a query result (or its error) in a formatted table"""
+    if error is not None:
+        print_query_header(description)
+        print(f"Error executing query: {error}")
+        return
+    print_query_chunks(description, [df])
+
+def execute_query(conn, query, description):
+    """Execute a query and display results in a formatted table, streamed in chunks"""
+    if is_duckdb(conn):
+        chunks = stream_query(conn, query)
+    else:
+        chunks = cached_read_sql_chunks(conn, query)
+    if not print_query_chunks(description, chunks) and not is_duckdb(conn):
+        # Leave the failed transaction so the next report can run
+        conn.rollback()
 
 def execute_sql_file(conn, file_path):
-    """Execute all SQL commands from a file and display results."""
+    """Execute all SQL commands from a file and display results.
+
+    Statements are split and run by sql_runner: read-only statements share one
+    READ ONLY transaction and their rows are streamed in batches. On DuckDB
+    the statements run one after another through duckdb_backend.
+    """
     try:
-        with open(file_path, 'r') as file:
-            sql_commands = file.read()
-        
-        with conn.cursor() as cursor:
-            queries = sql_commands.split(';')  
-            for query in queries:
-                query = query.strip()
-                if query:  
-                    print(f"\nExecuting query: {query[:50]}...")  
-                    cursor.execute(query)
-                    conn.commit()
-
-             
-                    if cursor.description:  
-                        columns = [desc[0] for desc in cursor.description]
-                        rows = cursor.fetchall()
-                        df = pd.DataFrame(rows, columns=columns)
-                        print(df.to_string(index=False))
-                    else:
-                        print("Query executed successfully, no results to display.")
-
-            print(f"\nSuccessfully executed all queries in file: {file_path}")
+        if is_duckdb(conn):
+            duckdb_backend.run_sql_script(conn, file_path)
+        else:
+            run_sql_script(conn, file_path)
     except Exception as e:
         print(f"Error executing SQL file {file_path}: {e}")
 
-def main():
-    """Main function to run all analysis queries"""
-    print("VALORANT CHAMPIONS 2024 DATA ANALYSIS")
-    print("="*50)
-    
-    conn = connect_to_db()
-    if not conn:
-        return
-    
-    try:
-        # Execute queries.sql file
-        execute_sql_file(conn, 'queries.sql')
-        
-        # 1. Basic Data Exploration
-        print("\n1. BASIC DATA EXPLORATION")
-        print("-" * 30)
-        
-        # Check table structures
-        execute_query(conn, 
-            "SELECT * FROM player_stats LIMIT 5", 
-            "Player Stats Sample")
-        
-        execute_query(conn, 
-            "SELECT * FROM matches LIMIT 5", 
-            "Matches Sample")
-        
-        # 2. Filtering, Aggregation, and Sorting
-        print("\n2. FILTERING, AGGREGATION, AND SORTING")
-        print("-" * 40)
-        
-        execute_query(conn, """
+# Analysis reports run by main(), grouped by section: (section, [(description, query), ...])
+ANALYSIS_SECTIONS = [
+    ("1. BASIC DATA EXPLORATION", [
+        ("Player Stats Sample", "SELECT * FROM player_stats LIMIT 5"),
+        ("Matches Sample", "SELECT * FROM matches LIMIT 5"),
+    ]),
+    ("2. FILTERING, AGGREGATION, AND SORTING", [
+        ("Top Players by Rating", """
             SELECT 
                 player_name, 
                 team, 
@@ -111,26 +130,21 @@ def main():
             WHERE rounds > 100 
             ORDER BY rating DESC 
             LIMIT 10
-        """, "Top Players by Rating")
-        
-        execute_query(conn, """
+        """),
+        ("Team Stats", """
             SELECT 
                 team,
-                COUNT(*) as player_count,
-                ROUND(AVG(rating), 2) as avg_rating,
-                ROUND(AVG(acs), 2) as avg_acs,
-                ROUND(MIN(rating), 2) as min_rating,
-                ROUND(MAX(rating), 2) as max_rating
-            FROM player_stats 
-            GROUP BY team 
+                player_count,
+                avg_rating,
+                avg_acs,
+                min_rating,
+                max_rating
+            FROM team_summary 
             ORDER BY avg_rating DESC
-        """, "Team Stats")
-        
-        # 3. JOIN Operations
-        print("\n3. JOIN OPERATIONS")
-        print("-" * 20)
-        
-        execute_query(conn, """
+        """),
+    ]),
+    ("3. JOIN OPERATIONS", [
+        ("Players with Match Stats", """
             SELECT 
                 ps.player_name,
                 ps.team,
@@ -144,27 +158,22 @@ def main():
             WHERE dmps.stat_type = 'map'
             ORDER BY ps.rating DESC
             LIMIT 10
-        """, "Players with Match Stats")
-        
-        execute_query(conn, """
+        """),
+        ("Agent Performance", """
             SELECT 
                 ag.agent_name,
                 ag.total_utilization,
-                COUNT(dmps.player_id) as times_picked,
-                ROUND(AVG(dmps.rating), 2) as avg_rating_when_picked
+                COALESCE(aps.times_picked, 0) as times_picked,
+                aps.avg_rating as avg_rating_when_picked
             FROM agents_stats ag
-            LEFT JOIN detailed_matches_player_stats dmps 
-                ON ag.agent_name = dmps.agent
-            GROUP BY ag.agent_name, ag.total_utilization
+            LEFT JOIN agent_pick_summary aps 
+                ON ag.agent_name = aps.agent_name
             ORDER BY ag.total_utilization DESC
             LIMIT 10
-        """, "Agent Performance")
-        
-        # 4. Analytical Topics
-        print("\n4. ANALYTICAL TOPICS")
-        print("-" * 20)
-        
-        execute_query(conn, """
+        """),
+    ]),
+    ("4. ANALYTICAL TOPICS", [
+        ("Map Balance", """
             SELECT 
                 map_name,
                 times_played,
@@ -177,9 +186,8 @@ def main():
                 END as map_balance
             FROM maps_stats 
             ORDER BY times_played DESC
-        """, "Map Balance")
-        
-        execute_query(conn, """
+        """),
+        ("Best Headshots", """
             SELECT 
                 player_name,
                 team,
@@ -192,9 +200,8 @@ def main():
             WHERE hs_percent IS NOT NULL
             ORDER BY hs_percent DESC
             LIMIT 10
-        """, "Best Headshots")
-        
-        execute_query(conn, """
+        """),
+        ("First Kill Impact", """
             SELECT 
                 player_name,
                 team,
@@ -207,9 +214,8 @@ def main():
             WHERE first_kills > 0 OR first_deaths > 0
             ORDER BY fk_fd_diff DESC
             LIMIT 10
-        """, "First Kill Impact")
-        
-        execute_query(conn, """
+        """),
+        ("Tournament Stats", """
             SELECT 
                 'Total Matches' as metric,
                 COUNT(*)::text as value
@@ -229,7 +235,89 @@ def main():
                 'Average Player Rating',
                 ROUND(AVG(rating), 2)::text
             FROM player_stats
-        """, "Tournament Stats")
+        """),
+    ]),
+]
+
+def run_concurrent_analysis(max_workers):
+    """Run queries.sql and every report at once on a connection pool.
+
+    Results are buffered and printed in the same order as the sequential run.
+    """
+    started = time.perf_counter()
+    with QueryPool(max_workers) as pool:
+        script_output = io.StringIO()
+        script_future = pool.submit(
+            lambda conn: run_sql_script(conn, 'queries.sql', out=script_output)
+        )
+        report_futures = [
+            (section, [(description, pool.fetch(query)) for description, query in reports])
+            for section, reports in ANALYSIS_SECTIONS
+        ]
+        
+        try:
+            script_future.result()
+        except Exception as e:
+            script_output.write(f"Error executing SQL file queries.sql: {e}\n")
+        print(script_output.getvalue(), end='')
+        
+        timings = []
+        for section, reports in report_futures:
+            print(f"\n{section}")
+            print("-" * len(section))
+            
+            for description, future in reports:
+                result = future.result()
+                print_query_result(description, result['df'], result['error'])
+                timings.append((result['elapsed_ms'], description))
+    
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    slowest_ms, slowest = max(timings)
+    print(f"\nConcurrent run: {len(timings)} reports + queries.sql on {max_workers} connections "
+          f"in {elapsed_ms:.1f} ms (slowest report: {slowest}, {slowest_ms:.1f} ms)")
+
+def main():
+    """Main function to run all analysis queries"""
+    parser = argparse.ArgumentParser(description="Run the Valorant Champions 2024 analysis queries")
+    parser.add_argument('--concurrent', action='store_true',
+                        help="run queries.sql and the reports in parallel on a connection pool")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS,
+                        help=f"pooled connections for --concurrent (default: {MAX_WORKERS})")
+    parser.add_argument('--backend', choices=['postgres', 'duckdb'], default='postgres',
+                        help="run on the Postgres database or in-process on DuckDB over exported files")
+    parser.add_argument('--data-dir', action='append',
+                        help="data directory for --backend duckdb, repeatable (default: see duckdb_backend.py)")
+    args = parser.parse_args()
+    if args.concurrent and args.backend == 'duckdb':
+        parser.error("--concurrent needs the postgres backend (DuckDB already runs each query on all cores)")
+    
+    print("VALORANT CHAMPIONS 2024 DATA ANALYSIS")
+    print("="*50)
+    
+    if args.concurrent:
+        try:
+            run_concurrent_analysis(args.workers)
+            print(f"\n{'='*60}")
+            print("ANALYSIS COMPLETE!")
+            print(f"{'='*60}")
+        except Exception as e:
+            print(f"Error during analysis: {e}")
+        return
+    
+    conn = connect_to_duckdb(args.data_dir) if args.backend == 'duckdb' else connect_to_db()
+    if not conn:
+        return
+    
+    try:
+        # Execute queries.sql file
+        execute_sql_file(conn, 'queries.sql')
+        
+        for section, reports in ANALYSIS_SECTIONS:
+            print(f"\n{section}")
+            print("-" * len(section))
+            
+            for description, query in reports:
+                execute_query(conn, query, description)
         
         print(f"\n{'='*60}")
         print("ANALYSIS COMPLETE!")
@@ -0,0 +1,238 @@
+"""
+Query result cache keyed by normalized SQL and table versions
+
+cached_read_sql() is a drop-in replacement for pd.read_sql_query. It:
+- Normalizes the SQL (comments dropped, whitespace collapsed, keywords lower-cased)
+  and hashes it together with the parameters and the target database
+- Stamps the entry with the current version of every table the query names,
+  read from table_versions (migration 004). Without that migration nothing is
+  cached: the counters in pg_stat_user_tables lag behind writes, so they
+  cannot tell when a result is stale
+- Serves repeated runs from memory, or from Parquet files under cache/ across
+  processes, until one of those tables changes; stale files are evicted when
+  the query is stored again
+
+cached_read_sql_chunks() is the streaming counterpart (query_stream.py): hits
+are served from the cached DataFrame in chunks, misses are streamed from a
+server-side cursor and stored only if they stay within CACHE_MAX_ROWS rows.
+
+Queries calling volatile functions (now(), random(), ...) are never cached.
+Set QUERY_CACHE=0 to disable the cache, QUERY_CACHE_DIR to move it.
+"""
+
+import glob
+import hashlib
+import os
+import threading
+
+import pandas as pd
+
+from query_stream import CHUNK_SIZE, stream_query
+from sql_runner import tokenize_sql
+
+try:
+    import pyarrow  # noqa: F401 (parquet engine for DataFrame.to_parquet)
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+CACHE_ENABLED = os.getenv('QUERY_CACHE', '1') != '0'
+CACHE_DIR = os.getenv('QUERY_CACHE_DIR', os.path.join('cache', 'query_results'))
+# Largest streamed result kept by cached_read_sql_chunks(); bigger ones pass through uncached
+CACHE_MAX_ROWS = int(os.getenv('QUERY_CACHE_MAX_ROWS', '200000'))
+
+# Function names whose result changes without any table changing
+VOLATILE_FUNCTIONS = {
+    'now', 'current_date', 'current_time', 'current_timestamp', 'localtime',
+    'localtimestamp', 'clock_timestamp', 'statement_timestamp', 'timeofday',
+    'random', 'nextval', 'setval', 'txid_current', 'pg_sleep',
+}
+
+# Tables created after migration 004 have no row and get a NULL version
+VERSIONS_QUERY = """
+SELECT t.tablename, tv.version
+FROM pg_tables t
+LEFT JOIN table_versions tv ON tv.table_name = t.tablename
+WHERE t.schemaname = 'public'
+"""
+
+_memory = {}
+_lock = threading.Lock()
+cache_stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'uncached': 0}
+
+
+def _count(name):
+    with _lock:
+        cache_stats[name] += 1
+
+
+def normalize_sql(query):
+    """Canonical form of a query: no comments, single spaces, lower-cased keywords"""
+    sql = query.strip().rstrip(';')
+    parts = []
+    for kind, start, end in tokenize_sql(sql):
+        if kind in ('space', 'comment'):
+            if parts and parts[-1] != ' ':
+                parts.append(' ')
+        elif kind == 'word':
+            parts.append(sql[start:end].lower())
+        else:
+            parts.append(sql[start:end])
+    return ''.join(parts).strip()
+
+
+def referenced_names(query):
+    """Lower-cased words and quoted identifiers a query mentions"""
+    names = set()
+    for kind, start, end in tokenize_sql(query):
+        if kind == 'word':
+            names.add(query[start:end].lower())
+        elif kind == 'identifier':
+            names.add(query[start + 1:end - 1].replace('""', '"'))
+    return names
+
+
+def table_versions(conn):
+    """Current version of every user table, as {table_name: version}.
+
+    The version is None for a table the migration 004 triggers do not track;
+    returns None when the migration is not installed.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT to_regclass('table_versions') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            return None
+        cursor.execute(VERSIONS_QUERY)
+        return dict(cursor.fetchall())
+
+
+def cache_key(conn, query, params=None):
+    """Return (query_hash, version_hash) for a query, or None if it must not be cached"""
+    names = referenced_names(query)
+    if names & VOLATILE_FUNCTIONS:
+        return None
+
+    info = conn.info
+    query_hash = hashlib.sha256(
+        f"{info.host}:{info.port}/{info.dbname}\n{normalize_sql(query)}\n{params!r}".encode('utf-8')
+    ).hexdigest()[:32]
+
+    versions = table_versions(conn)
+    if versions is None:
+        return None
+    tables = sorted(names & versions.keys())
+    if any(versions[table] is None for table in tables):
+        return None
+    stamp = ','.join(f"{table}={versions[table]}" for table in tables)
+    version_hash = hashlib.sha256(stamp.encode('utf-8')).hexdigest()[:16]
+    return query_hash, version_hash
+
+
+def _cache_file(query_hash, version_hash):
+    return os.path.join(CACHE_DIR, f"{query_hash}-{version_hash}.parquet")
+
+
+def _load(query_hash, version_hash):
+    with _lock:
+        entry = _memory.get(query_hash)
+    if entry is not None and entry[0] == version_hash:
+        _count('memory_hits')
+        return entry[1]
+
+    path = _cache_file(query_hash, version_hash)
+    if PARQUET_AVAILABLE and os.path.exists(path):
+        try:
+            df = pd.read_parquet(path)
+        except Exception:
+            return None
+        with _lock:
+            _memory[query_hash] = (version_hash, df)
+        _count('disk_hits')
+        return df
+    return None
+
+
+def _store(query_hash, version_hash, df):
+    with _lock:
+        _memory[query_hash] = (version_hash, df)
+    if not PARQUET_AVAILABLE:
+        return
+
+    path = _cache_file(query_hash, version_hash)
+    # Write under a temporary name so concurrent readers never see half a file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        # Some object columns cannot be stored as Parquet; keep them in memory only
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+
+    # Entries for older table versions of the same query are stale
+    for stale in glob.glob(os.path.join(CACHE_DIR, f"{query_hash}-*.parquet")):
+        if stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def cached_read_sql(conn, query, params=None):
+    """pd.read_sql_query with a result cache; returns a copy the caller may modify"""
+    if not CACHE_ENABLED:
+        return pd.read_sql_query(query, conn, params=params)
+
+    # Versions are read before the data, so a concurrent write can only make
+    # the stored result newer than its stamp, never older
+    key = cache_key(conn, query, params)
+    if key is None:
+        _count('uncached')
+        return pd.read_sql_query(query, conn, params=params)
+
+    df = _load(*key)
+    if df is None:
+        _count('misses')
+        df = pd.read_sql_query(query, conn, params=params)
+        _store(*key, df)
+    return df.copy()
+
+
+def cached_read_sql_chunks(conn, query, params=None, chunk_size=CHUNK_SIZE):
+    """stream_query() with the result cache; yields DataFrames the caller may modify"""
+    key = cache_key(conn, query, params) if CACHE_ENABLED else None
+    if key is None:
+        if CACHE_ENABLED:
+            _count('uncached')
+        yield from stream_query(conn, query, params, chunk_size)
+        return
+
+    df = _load(*key)
+    if df is not None:
+        yield df.iloc[:chunk_size].copy()
+        for start in range(chunk_size, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size].copy()
+        return
+
+    _count('misses')
+    # Chunks are kept for the cache until the result outgrows CACHE_MAX_ROWS
+    kept, rows = [], 0
+    for chunk in stream_query(conn, query, params, chunk_size):
+        rows += len(chunk)
+        if kept is not None and rows <= CACHE_MAX_ROWS:
+            kept.append(chunk.copy())
+        else:
+            kept = None
+        yield chunk
+    if kept is not None:
+        _store(*key, pd.concat(kept, ignore_index=True) if len(kept) > 1 else kept[0])
+
+
+def clear_cache():
+    """Drop every cached result from memory and disk"""
+    with _lock:
+        _memory.clear()
+    for path in glob.glob(os.path.join(CACHE_DIR, '*.parquet')):
+        os.remove(path)
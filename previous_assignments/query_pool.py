@@ -0,0 +1,93 @@
+"""
+Connection pool for running independent queries concurrently
+
+QueryPool pairs a psycopg2 ThreadedConnectionPool with a thread pool of the
+same size, so every worker thread always has its own connection. Postgres runs
+each query in a separate backend, so the wall time of a batch of independent
+reports approaches that of the slowest one instead of the sum.
+
+Used by main.py --concurrent and the chart pipeline in visualizations_simple.py.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg2.pool import ThreadedConnectionPool
+
+from query_cache import cached_read_sql, cached_read_sql_chunks
+
+# Db connection parameters
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'data_v',
+    'user': 'postgres',
+    'password': '0412',
+    'port': '5432'
+}
+
+MAX_WORKERS = 6
+
+
+class QueryPool:
+    """Thread pool whose workers each borrow a connection from a shared pool"""
+
+    def __init__(self, max_workers=MAX_WORKERS, db_config=None):
+        self.max_workers = max_workers
+        # maxconn must cover every worker: ThreadedConnectionPool raises instead of waiting
+        self._connections = ThreadedConnectionPool(1, max_workers, **(db_config or DB_CONFIG))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='query_pool')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self, task):
+        conn = self._connections.getconn()
+        try:
+            return task(conn)
+        finally:
+            # End the task's transaction so the connection goes back clean
+            conn.rollback()
+            self._connections.putconn(conn)
+
+    def submit(self, task):
+        """Run task(conn) on a pooled connection; returns a Future"""
+        return self._executor.submit(self._run, task)
+
+    def fetch(self, query, params=None, reduce=None):
+        """Run a query into a DataFrame; the Future resolves to a result dict.
+
+        The dict has 'df' (None on failure), 'error' and 'elapsed_ms', so one
+        failing report does not raise out of the whole batch. With reduce, the
+        result is streamed in chunks and 'df' is reduce(chunks).
+        """
+        def task(conn):
+            started = time.perf_counter()
+            try:
+                if reduce is not None:
+                    df = reduce(cached_read_sql_chunks(conn, query, params))
+                else:
+                    df = cached_read_sql(conn, query, params)
+                error = None
+            except Exception as e:
+                df, error = None, e
+            return {'df': df, 'error': error,
+                    'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+        return self.submit(task)
+
+    def fetch_all(self, queries, reducers=None):
+        """Run {name: query} concurrently and return {name: result dict} in the same order.
+
+        reducers maps names to a reduce function for fetch().
+        """
+        reducers = reducers or {}
+        futures = {name: self.fetch(query, reduce=reducers.get(name)) for name, query in queries.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._connections.closeall()
@@ -0,0 +1,68 @@
+"""
+Streaming query results as DataFrame chunks
+
+stream_query() runs a query on a server-side (named) cursor and yields the
+result as DataFrames of at most chunk_size rows. Each chunk is one FETCH from
+the server, so client memory is bounded by the chunk size instead of the
+result size, and printing, exporting or aggregating can start with the first
+rows. Chunks are built like pd.read_sql_query builds its DataFrame (decimals
+coerced to float), so code written for one full DataFrame works per chunk.
+
+On a DuckDB connection (duckdb_backend.py) the chunks come from
+fetch_df_chunk() instead.
+
+Used by cached_read_sql_chunks() in query_cache.py, main.py and the histogram
+in visualizations_simple.py.
+"""
+
+import itertools
+
+import pandas as pd
+import psycopg2.extensions
+
+CHUNK_SIZE = 50000
+# DuckDB hands results over in vectors of this many rows
+DUCKDB_VECTOR_SIZE = 2048
+
+_cursor_ids = itertools.count(1)
+
+
+def _stream_duckdb(conn, query, params, chunk_size):
+    conn.execute(query, params)
+    vectors = max(1, chunk_size // DUCKDB_VECTOR_SIZE)
+    chunk = conn.fetch_df_chunk(vectors)
+    yield chunk
+    while not chunk.empty:
+        chunk = conn.fetch_df_chunk(vectors)
+        if not chunk.empty:
+            yield chunk
+
+
+def stream_query(conn, query, params=None, chunk_size=CHUNK_SIZE):
+    """Yield the result of a query as DataFrames of at most chunk_size rows.
+
+    The first chunk is always yielded, empty if there are no rows, so the
+    columns are known. The cursor lives in the connection's current
+    transaction and is closed when the generator is exhausted or closed;
+    ending the transaction is left to the caller.
+    """
+    if not isinstance(conn, psycopg2.extensions.connection):
+        yield from _stream_duckdb(conn, query, params, chunk_size)
+        return
+
+    cursor = conn.cursor(name=f"query_stream_{next(_cursor_ids)}")
+    cursor.itersize = chunk_size
+    try:
+        # DECLARE ... CURSOR FOR takes a single statement without the terminator
+        cursor.execute(query.strip().rstrip(';'), params)
+        # DECLARE is lazy; the first FETCH runs the query and fills description
+        rows = cursor.fetchmany(chunk_size)
+        columns = [desc[0] for desc in cursor.description]
+        yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+        while len(rows) == chunk_size:
+            rows = cursor.fetchmany(chunk_size)
+            if rows:
+                yield pd.DataFrame.from_records(rows, columns=columns, coerce_float=True)
+    finally:
+        cursor.close()
+
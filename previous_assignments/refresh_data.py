@@ -5,7 +5,6 @@ import csv
 import os
 from datetime import datetime, timedelta
 from faker import Faker
-import re
 
 # Database configuration
 DB_CONFIG = {
@@ -99,18 +98,9 @@ def get_existing_data(conn):
     cursor.execute("SELECT DISTINCT map_name FROM maps_stats")
     maps = [row[0] for row in cursor.fetchall()]
     
-    # Get recent match IDs to continue the sequence (ensure integer)
-    cursor.execute("SELECT MAX(match_id) FROM matches")
-    raw_max_match_id = cursor.fetchone()[0]
-    if raw_max_match_id is None:
-        max_match_id = 0
-    else:
-        try:
-            max_match_id = int(raw_max_match_id)
-        except (ValueError, TypeError):
-            # In case the DB column is TEXT and contains non-numeric prefix, extract trailing digits
-            match = re.search(r"(\d+)$", str(raw_max_match_id))
-            max_match_id = int(match.group(1)) if match else 0
+    # Get the latest match ID (match_id is a BIGINT identity column)
+    cursor.execute("SELECT COALESCE(MAX(match_id), 0) FROM matches")
+    max_match_id = cursor.fetchone()[0]
     
     cursor.close()
     return team_players_dict, agents, maps, max_match_id
@@ -191,8 +181,10 @@ def insert_new_match_data(conn, team_players_dict, agents, maps, current_match_i
             cursor.close()
             return current_match_id
         
-        # Generate a new match with DEMO prefix to distinguish from real data
-        new_match_id = current_match_id + 1
+        # Allocate the new match ID from the identity sequence so concurrent
+        # writers and imported ids never collide
+        cursor.execute("SELECT nextval(pg_get_serial_sequence('matches', 'match_id'))")
+        new_match_id = cursor.fetchone()[0]
         match_date = datetime.now().date()
         
         # Select two different teams that have enough players
@@ -210,12 +202,12 @@ def insert_new_match_data(conn, team_players_dict, agents, maps, current_match_i
         # Insert match
         cursor.execute("""
             INSERT INTO matches 
-            (date, match_id, time, team1, score1, team2, score2, score, winner, status, week, stage)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            (date, match_id, time, team1, score1, team2, score2, score, winner, status, week, stage, match_code)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             ON CONFLICT (match_id) DO NOTHING
         """, (match_date, new_match_id, '20:00', team1_name, score1, 
               team2_name, score2, f"{score1}-{score2}", winner, 
-              'Completed', 'Week 4', 'Group Stage'))
+              'Completed', 'Week 4', 'Group Stage', str(new_match_id)))
         # Export match row to CSV
         append_row_to_csv(
             EXPORT_MATCHES_FILE,
@@ -338,7 +330,7 @@ def main():
         print(f" Loaded {total_players} players from {len(team_players_dict)} teams")
         print(f" Teams with 5+ players: {len(valid_teams)}")
         print(f" Loaded {len(agents)} agents, {len(maps)} maps")
-        print(f" Starting from Match ID: {str(current_match_id + 1)}")
+        print(f" Latest Match ID: {current_match_id} (new IDs come from the matches sequence)")
         print("=" * 60)
         print("\nStarting auto-refresh loop... (Press Ctrl+C to stop)\n")
         
@@ -8,7 +8,7 @@ CREATE TABLE "event_info" (
 );
 
 CREATE TABLE "matches" (
-  "match_id" VARCHAR(255) PRIMARY KEY,
+  "match_id" BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
   "date" DATE,
   "time" VARCHAR(50),
   "team1" VARCHAR(255),
@@ -19,7 +19,8 @@ CREATE TABLE "matches" (
   "winner" VARCHAR(255),
   "status" VARCHAR(50),
   "week" VARCHAR(50),
-  "stage" VARCHAR(100)
+  "stage" VARCHAR(100),
+  "match_code" VARCHAR(255) NOT NULL UNIQUE
 );
 
 CREATE TABLE "player_stats" (
@@ -64,7 +65,7 @@ CREATE TABLE "agents_stats" (
 );
 
 CREATE TABLE "economy_data" (
-  "match_id" VARCHAR(255),
+  "match_id" BIGINT,
   "map" VARCHAR(100),
   "Team" VARCHAR(255),
   "Pistol Won" INTEGER,
@@ -76,7 +77,7 @@ CREATE TABLE "economy_data" (
 );
 
 CREATE TABLE "performance_data" (
-  "Match ID" VARCHAR(255),
+  "Match ID" BIGINT,
   "Map" VARCHAR(100),
   "Player" VARCHAR(255),
   "Team" VARCHAR(255),
@@ -97,7 +98,7 @@ CREATE TABLE "performance_data" (
 );
 
 CREATE TABLE "detailed_matches_player_stats" (
-  "match_id" VARCHAR(255),
+  "match_id" BIGINT,
   "event_name" VARCHAR(255),
   "event_stage" VARCHAR(100),
   "match_date" DATE,
@@ -127,7 +128,7 @@ CREATE TABLE "detailed_matches_player_stats" (
 );
 
 CREATE TABLE "detailed_matches_overview" (
-  "match_id" VARCHAR(255) PRIMARY KEY,
+  "match_id" BIGINT PRIMARY KEY,
   "match_title" VARCHAR(500),
   "event" VARCHAR(255),
   "date" DATE,
@@ -140,7 +141,7 @@ CREATE TABLE "detailed_matches_overview" (
 );
 
 CREATE TABLE "detailed_matches_maps" (
-  "match_id" VARCHAR(255),
+  "match_id" BIGINT,
   "map_name" VARCHAR(100),
   "map_order" INTEGER,
   "score" VARCHAR(50),
@@ -151,6 +152,7 @@ CREATE TABLE "detailed_matches_maps" (
 );
 
 COMMENT ON TABLE "event_info" IS 'Standalone event details; no PK defined';
+COMMENT ON COLUMN "matches"."match_code" IS 'Original string match id; match_id is the integer surrogate key';
 
 ALTER TABLE "detailed_matches_overview" ADD CONSTRAINT "fk_detailed_overview_matches"
 FOREIGN KEY ("match_id") REFERENCES "matches" ("match_id");
@@ -90,6 +90,10 @@ def import_csv_to_table(conn, csv_file, table_name, column_mapping=None, data_cl
             if df[col].dtype == 'object':  # String columns
                 df[col] = df[col].apply(clean_string)
         
+        # Keep the original string id; match_id is the integer surrogate key
+        if table_name == 'matches':
+            df['match_code'] = df['match_id'].astype(str)
+        
         # Filter out rows with null map_name for detailed_matches_player_stats
         if table_name == 'detailed_matches_player_stats':
             df = df.dropna(subset=['map_name'])
@@ -155,6 +159,39 @@ def import_csv_to_table(conn, csv_file, table_name, column_mapping=None, data_cl
         conn.rollback()
         return False
 
+def sync_match_id_sequence(conn):
+    """Move the match_id identity sequence past the imported ids"""
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT setval(pg_get_serial_sequence('matches', 'match_id'),
+                          COALESCE((SELECT MAX(match_id) FROM matches), 0) + 1,
+                          false)
+        """)
+        conn.commit()
+        cursor.close()
+        print("  - Synced matches.match_id sequence")
+    except Exception as e:
+        print(f"  - Warning: Could not sync match_id sequence: {e}")
+        conn.rollback()
+
+def refresh_summary_tables(conn):
+    """Rebuild the summary tables from the imported data (migration 003)"""
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT to_regproc('refresh_summary_tables') IS NOT NULL")
+        if not cursor.fetchone()[0]:
+            print("  - Summary tables not installed; apply setup_code/migrations/003_summary_tables.sql")
+            cursor.close()
+            return
+        cursor.execute("SELECT refresh_summary_tables()")
+        conn.commit()
+        cursor.close()
+        print("  - Refreshed summary tables")
+    except Exception as e:
+        print(f"  - Warning: Could not refresh summary tables: {e}")
+        conn.rollback()
+
 def main():
     """Main import function"""
     print("Starting CSV import to PostgreSQL db 'data_v'...")
@@ -278,6 +315,10 @@ def main():
             if import_csv_to_table(conn, **config):
                 success_count += 1
         
+        # Explicit ids were imported, so new matches must start after them
+        sync_match_id_sequence(conn)
+        refresh_summary_tables(conn)
+        
         print(f"\nImport completed: {success_count}/{total_count} files imported successfully")
         
     except Exception as e:
@@ -0,0 +1,27 @@
+-- Secondary indexes for the shipped query workload
+-- Generated by index_advisor.py; safe to re-run (IF NOT EXISTS).
+
+-- partial, covering: player_stats JOIN detailed_matches_player_stats ON player_id WHERE stat_type = 'map'
+CREATE INDEX IF NOT EXISTS idx_dmps_map_player_id ON detailed_matches_player_stats (player_id) INCLUDE (rating, acs, map_name) WHERE stat_type = 'map';
+
+-- partial, composite: Topic 6: WHERE stat_type = 'map' ORDER BY rating DESC, map_name LIMIT 10
+CREATE INDEX IF NOT EXISTS idx_dmps_map_rating ON detailed_matches_player_stats (rating DESC, map_name) WHERE stat_type = 'map';
+
+-- partial, composite, covering: Line chart and timeline: stat_type = 'map' AND player_name IN (...) joined on match_id
+CREATE INDEX IF NOT EXISTS idx_dmps_map_player_name ON detailed_matches_player_stats (player_name, match_id) INCLUDE (rating, acs, map_name) WHERE stat_type = 'map';
+
+-- composite: Top players: WHERE rounds > 100 ORDER BY rating DESC LIMIT n
+CREATE INDEX IF NOT EXISTS idx_player_stats_rating_rounds ON player_stats (rating DESC, rounds);
+
+-- composite: Bar chart: WHERE rounds > 100 ORDER BY acs DESC LIMIT 10
+CREATE INDEX IF NOT EXISTS idx_player_stats_acs_rounds ON player_stats (acs DESC, rounds);
+
+-- partial: Topic 8: WHERE hs_percent IS NOT NULL ORDER BY hs_percent DESC LIMIT 10
+CREATE INDEX IF NOT EXISTS idx_player_stats_hs_percent ON player_stats (hs_percent DESC) WHERE hs_percent IS NOT NULL;
+
+-- single column: Timeline and line chart order by match date; cleanup filters by date
+CREATE INDEX IF NOT EXISTS idx_matches_date ON matches (date);
+
+ANALYZE detailed_matches_player_stats;
+ANALYZE matches;
+ANALYZE player_stats;
@@ -0,0 +1,89 @@
+-- Integer surrogate keys for match_id
+--
+-- Converts matches.match_id and every match reference in the fact tables from
+-- VARCHAR(255) to BIGINT, keeps the original string as matches.match_code, and
+-- turns matches.match_id into an identity column so new ids come from a sequence.
+--
+-- Numeric ids (all Kaggle and generated matches) keep their value. Any
+-- non-numeric id is given a fresh number above the current maximum.
+--
+-- The fact tables are rewritten, so run it once in a quiet moment:
+--   psql -U postgres -d data_v -f setup_code/migrations/002_match_surrogate_keys.sql
+
+BEGIN;
+
+-- 1. Drop the foreign keys that reference matches.match_id
+ALTER TABLE "detailed_matches_overview" DROP CONSTRAINT IF EXISTS "fk_detailed_overview_matches";
+ALTER TABLE "economy_data" DROP CONSTRAINT IF EXISTS "fk_economy_matches";
+ALTER TABLE "performance_data" DROP CONSTRAINT IF EXISTS "fk_performance_matches";
+ALTER TABLE "detailed_matches_player_stats" DROP CONSTRAINT IF EXISTS "fk_detailed_player_matches";
+ALTER TABLE "detailed_matches_maps" DROP CONSTRAINT IF EXISTS "fk_detailed_maps_matches";
+
+-- 2. Keep the original string id as an attribute
+ALTER TABLE "matches" ADD COLUMN "match_code" VARCHAR(255);
+UPDATE "matches" SET "match_code" = "match_id";
+ALTER TABLE "matches" ALTER COLUMN "match_code" SET NOT NULL;
+ALTER TABLE "matches" ADD CONSTRAINT "matches_match_code_key" UNIQUE ("match_code");
+
+-- 3. Renumber non-numeric ids everywhere they are referenced
+CREATE TEMP TABLE "match_id_map" ON COMMIT DROP AS
+SELECT
+    "match_id" AS "old_id",
+    (SELECT COALESCE(MAX("match_id"::BIGINT), 0) FROM "matches" WHERE "match_id" ~ '^[0-9]{1,18}$')
+        + ROW_NUMBER() OVER (ORDER BY "match_id") AS "new_id"
+FROM "matches"
+WHERE "match_id" !~ '^[0-9]{1,18}$';
+
+UPDATE "matches" t SET "match_id" = map."new_id"::TEXT
+FROM "match_id_map" map WHERE t."match_id" = map."old_id";
+UPDATE "detailed_matches_overview" t SET "match_id" = map."new_id"::TEXT
+FROM "match_id_map" map WHERE t."match_id" = map."old_id";
+UPDATE "economy_data" t SET "match_id" = map."new_id"::TEXT
+FROM "match_id_map" map WHERE t."match_id" = map."old_id";
+UPDATE "performance_data" t SET "Match ID" = map."new_id"::TEXT
+FROM "match_id_map" map WHERE t."Match ID" = map."old_id";
+UPDATE "detailed_matches_player_stats" t SET "match_id" = map."new_id"::TEXT
+FROM "match_id_map" map WHERE t."match_id" = map."old_id";
+UPDATE "detailed_matches_maps" t SET "match_id" = map."new_id"::TEXT
+FROM "match_id_map" map WHERE t."match_id" = map."old_id";
+
+-- 4. Convert the columns in place; primary keys and indexes are rebuilt as BIGINT
+ALTER TABLE "matches" ALTER COLUMN "match_id" TYPE BIGINT USING "match_id"::BIGINT;
+ALTER TABLE "detailed_matches_overview" ALTER COLUMN "match_id" TYPE BIGINT USING "match_id"::BIGINT;
+ALTER TABLE "economy_data" ALTER COLUMN "match_id" TYPE BIGINT USING "match_id"::BIGINT;
+ALTER TABLE "performance_data" ALTER COLUMN "Match ID" TYPE BIGINT USING "Match ID"::BIGINT;
+ALTER TABLE "detailed_matches_player_stats" ALTER COLUMN "match_id" TYPE BIGINT USING "match_id"::BIGINT;
+ALTER TABLE "detailed_matches_maps" ALTER COLUMN "match_id" TYPE BIGINT USING "match_id"::BIGINT;
+
+-- 5. Allocate new ids from a sequence
+ALTER TABLE "matches" ALTER COLUMN "match_id" ADD GENERATED BY DEFAULT AS IDENTITY;
+SELECT setval(
+    pg_get_serial_sequence('matches', 'match_id'),
+    COALESCE((SELECT MAX("match_id") FROM "matches"), 0) + 1,
+    false
+);
+
+-- 6. Restore the foreign keys
+ALTER TABLE "detailed_matches_overview" ADD CONSTRAINT "fk_detailed_overview_matches"
+FOREIGN KEY ("match_id") REFERENCES "matches" ("match_id");
+
+ALTER TABLE "economy_data" ADD CONSTRAINT "fk_economy_matches"
+FOREIGN KEY ("match_id") REFERENCES "matches" ("match_id");
+
+ALTER TABLE "performance_data" ADD CONSTRAINT "fk_performance_matches"
+FOREIGN KEY ("Match ID") REFERENCES "matches" ("match_id");
+
+ALTER TABLE "detailed_matches_player_stats" ADD CONSTRAINT "fk_detailed_player_matches"
+FOREIGN KEY ("match_id") REFERENCES "matches" ("match_id");
+
+ALTER TABLE "detailed_matches_maps" ADD CONSTRAINT "fk_detailed_maps_matches"
+FOREIGN KEY ("match_id") REFERENCES "matches" ("match_id");
+
+COMMIT;
+
+ANALYZE "matches";
+ANALYZE "detailed_matches_overview";
+ANALYZE "economy_data";
+ANALYZE "performance_data";
+ANALYZE "detailed_matches_player_stats";
+ANALYZE "detailed_matches_maps";
@@ -0,0 +1,406 @@
+-- Materialized summary tables
+--
+-- Team, map, agent-pick and player-per-day aggregates are kept in summary
+-- tables instead of being recomputed from the raw rows by every report, chart
+-- and exporter scrape. Statement-level triggers with transition tables keep
+-- them current as refresh_data.py / import_csv.py insert rows and
+-- cleanup_generated_data.py deletes them:
+--
+--   team_summary          <- player_stats                    (affected teams recomputed)
+--   agent_pick_summary    <- detailed_matches_player_stats   (additive deltas)
+--   map_summary           <- detailed_matches_player_stats   (additive deltas, stat_type = 'map')
+--   player_daily_summary  <- detailed_matches_player_stats,  (affected player/date pairs recomputed)
+--                            matches
+--
+-- TRUNCATE and session_replication_role = replica bypass the triggers, so
+-- reset_and_import.py clears the summaries with the fact tables and
+-- import_csv.py calls refresh_summary_tables() after loading.
+--
+-- Requires migration 002 (BIGINT match ids). Run once per database, fresh
+-- installs included:
+--   psql -U postgres -d data_v -f setup_code/migrations/003_summary_tables.sql
+
+BEGIN;
+
+-- 1. Summary tables
+
+CREATE TABLE IF NOT EXISTS "team_summary" (
+  "team" VARCHAR(255),
+  "player_count" INTEGER NOT NULL,
+  "rating_sum" NUMERIC NOT NULL,
+  "rating_count" INTEGER NOT NULL,
+  "acs_sum" BIGINT NOT NULL,
+  "acs_count" INTEGER NOT NULL,
+  "kd_sum" NUMERIC NOT NULL,
+  "kd_count" INTEGER NOT NULL,
+  "min_rating" DECIMAL(3,2),
+  "max_rating" DECIMAL(3,2),
+  "total_kills" BIGINT NOT NULL,
+  "total_deaths" BIGINT NOT NULL,
+  "total_assists" BIGINT NOT NULL,
+  "avg_rating" NUMERIC GENERATED ALWAYS AS (ROUND("rating_sum" / NULLIF("rating_count", 0), 2)) STORED,
+  "avg_acs" NUMERIC GENERATED ALWAYS AS (ROUND("acs_sum"::NUMERIC / NULLIF("acs_count", 0), 2)) STORED,
+  "avg_kd" NUMERIC GENERATED ALWAYS AS (ROUND("kd_sum" / NULLIF("kd_count", 0), 2)) STORED
+);
+-- One row per team; NULL team is its own group, as in GROUP BY team
+CREATE UNIQUE INDEX IF NOT EXISTS "team_summary_team_key" ON "team_summary" (COALESCE("team", ''));
+
+CREATE TABLE IF NOT EXISTS "agent_pick_summary" (
+  "agent_name" VARCHAR(100) PRIMARY KEY,
+  "times_picked" BIGINT NOT NULL,
+  "rating_sum" NUMERIC NOT NULL,
+  "rating_count" BIGINT NOT NULL,
+  "avg_rating" NUMERIC GENERATED ALWAYS AS (ROUND("rating_sum" / NULLIF("rating_count", 0), 2)) STORED
+);
+
+CREATE TABLE IF NOT EXISTS "map_summary" (
+  "map_name" VARCHAR(100) PRIMARY KEY,
+  "player_rows" BIGINT NOT NULL,
+  "rating_sum" NUMERIC NOT NULL,
+  "rating_count" BIGINT NOT NULL,
+  "acs_sum" BIGINT NOT NULL,
+  "acs_count" BIGINT NOT NULL,
+  "total_kills" BIGINT NOT NULL,
+  "total_deaths" BIGINT NOT NULL,
+  "avg_rating" NUMERIC GENERATED ALWAYS AS (ROUND("rating_sum" / NULLIF("rating_count", 0), 2)) STORED,
+  "avg_acs" NUMERIC GENERATED ALWAYS AS (ROUND("acs_sum"::NUMERIC / NULLIF("acs_count", 0), 2)) STORED
+);
+
+-- Best map of each player per match day (highest rating, then ACS, kills, latest match)
+CREATE TABLE IF NOT EXISTS "player_daily_summary" (
+  "player_name" VARCHAR(255),
+  "match_date" DATE,
+  "match_id" BIGINT NOT NULL,
+  "stage" VARCHAR(100),
+  "team" VARCHAR(255),
+  "rating" DECIMAL(3,2),
+  "acs" INTEGER,
+  "kills" INTEGER,
+  "deaths" INTEGER,
+  "assists" INTEGER,
+  "map_name" VARCHAR(100),
+  "maps_played" INTEGER NOT NULL,
+  PRIMARY KEY ("player_name", "match_date")
+);
+
+-- Recomputing a player's days looks rows up through idx_dmps_map_player_name
+-- from 001_workload_indexes.sql
+
+-- 2. Recompute helpers (NULL argument = rebuild everything)
+
+CREATE OR REPLACE FUNCTION "refresh_team_summary"(p_teams VARCHAR[] DEFAULT NULL)
+RETURNS VOID LANGUAGE plpgsql AS $$
+BEGIN
+    -- Serialize recomputes so concurrent writers cannot insert the same team twice
+    LOCK TABLE "team_summary" IN SHARE ROW EXCLUSIVE MODE;
+
+    DELETE FROM "team_summary"
+    WHERE p_teams IS NULL OR array_position(p_teams, "team") IS NOT NULL;
+
+    INSERT INTO "team_summary" (
+        "team", "player_count", "rating_sum", "rating_count", "acs_sum", "acs_count",
+        "kd_sum", "kd_count", "min_rating", "max_rating",
+        "total_kills", "total_deaths", "total_assists"
+    )
+    SELECT
+        "team",
+        COUNT(*),
+        COALESCE(SUM("rating"), 0),
+        COUNT("rating"),
+        COALESCE(SUM("acs"), 0),
+        COUNT("acs"),
+        COALESCE(SUM("kd_ratio"), 0),
+        COUNT("kd_ratio"),
+        MIN("rating"),
+        MAX("rating"),
+        COALESCE(SUM("kills"), 0),
+        COALESCE(SUM("deaths"), 0),
+        COALESCE(SUM("assists"), 0)
+    FROM "player_stats"
+    WHERE p_teams IS NULL OR array_position(p_teams, "team") IS NOT NULL
+    GROUP BY "team";
+END;
+$$;
+
+-- p_player_names/p_dates are parallel arrays of (player_name, match_date) pairs
+CREATE OR REPLACE FUNCTION "refresh_player_daily_summary"(
+    p_player_names VARCHAR[] DEFAULT NULL,
+    p_dates DATE[] DEFAULT NULL
+)
+RETURNS VOID LANGUAGE plpgsql AS $$
+BEGIN
+    IF p_player_names IS NULL THEN
+        TRUNCATE "player_daily_summary";
+    ELSE
+        DELETE FROM "player_daily_summary" p
+        USING unnest(p_player_names, p_dates) AS k("player_name", "match_date")
+        WHERE p."player_name" = k."player_name" AND p."match_date" = k."match_date";
+    END IF;
+
+    -- Same ordering as the timeline chart's ROW_NUMBER() (DESC puts NULL ratings first)
+    INSERT INTO "player_daily_summary" (
+        "player_name", "match_date", "match_id", "stage", "team", "rating", "acs",
+        "kills", "deaths", "assists", "map_name", "maps_played"
+    )
+    SELECT DISTINCT ON (dmps."player_name", m."date")
+        dmps."player_name",
+        m."date",
+        m."match_id",
+        m."stage",
+        dmps."player_team",
+        dmps."rating",
+        dmps."acs",
+        dmps."k",
+        dmps."d",
+        dmps."a",
+        dmps."map_name",
+        COUNT(*) OVER (PARTITION BY dmps."player_name", m."date")
+    FROM "detailed_matches_player_stats" dmps
+    JOIN "matches" m ON m."match_id" = dmps."match_id"
+    WHERE dmps."stat_type" = 'map'
+      AND dmps."player_name" IS NOT NULL
+      AND m."date" IS NOT NULL
+      AND (p_player_names IS NULL OR (dmps."player_name", m."date") IN (
+          SELECT k."player_name", k."match_date"
+          FROM unnest(p_player_names, p_dates) AS k("player_name", "match_date")
+      ))
+    ORDER BY dmps."player_name", m."date",
+             dmps."rating" DESC, dmps."acs" DESC, dmps."k" DESC, m."match_id" DESC;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION "refresh_summary_tables"()
+RETURNS VOID LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM "refresh_team_summary"(NULL);
+
+    TRUNCATE "agent_pick_summary";
+    INSERT INTO "agent_pick_summary" ("agent_name", "times_picked", "rating_sum", "rating_count")
+    SELECT "agent", COUNT("player_id"), COALESCE(SUM("rating"), 0), COUNT("rating")
+    FROM "detailed_matches_player_stats"
+    WHERE "agent" IS NOT NULL
+    GROUP BY "agent";
+
+    TRUNCATE "map_summary";
+    INSERT INTO "map_summary" (
+        "map_name", "player_rows", "rating_sum", "rating_count",
+        "acs_sum", "acs_count", "total_kills", "total_deaths"
+    )
+    SELECT "map_name", COUNT(*), COALESCE(SUM("rating"), 0), COUNT("rating"),
+           COALESCE(SUM("acs"), 0), COUNT("acs"), COALESCE(SUM("k"), 0), COALESCE(SUM("d"), 0)
+    FROM "detailed_matches_player_stats"
+    WHERE "stat_type" = 'map' AND "map_name" IS NOT NULL
+    GROUP BY "map_name";
+
+    PERFORM "refresh_player_daily_summary"(NULL, NULL);
+END;
+$$;
+
+-- 3. Trigger functions
+
+CREATE OR REPLACE FUNCTION "summary_player_stats_changed"()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+    v_teams VARCHAR[];
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT array_agg(DISTINCT "team") INTO v_teams FROM new_rows;
+    ELSIF TG_OP = 'DELETE' THEN
+        SELECT array_agg(DISTINCT "team") INTO v_teams FROM old_rows;
+    ELSE
+        SELECT array_agg(DISTINCT "team") INTO v_teams
+        FROM (SELECT "team" FROM new_rows UNION ALL SELECT "team" FROM old_rows) t;
+    END IF;
+
+    IF v_teams IS NOT NULL THEN
+        PERFORM "refresh_team_summary"(v_teams);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION "summary_match_player_stats_changed"()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+    v_delta TEXT;
+    v_player_names VARCHAR[];
+    v_dates DATE[];
+BEGIN
+    -- Signed view of the changed rows: +1 for new rows, -1 for removed rows
+    IF TG_OP = 'INSERT' THEN
+        v_delta := 'SELECT *, 1 AS "sign" FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        v_delta := 'SELECT *, -1 AS "sign" FROM old_rows';
+    ELSE
+        v_delta := 'SELECT *, 1 AS "sign" FROM new_rows UNION ALL SELECT *, -1 AS "sign" FROM old_rows';
+    END IF;
+
+    EXECUTE format('
+        INSERT INTO "agent_pick_summary" AS s ("agent_name", "times_picked", "rating_sum", "rating_count")
+        SELECT "agent",
+               SUM("sign" * ("player_id" IS NOT NULL)::INT),
+               COALESCE(SUM("sign" * "rating"), 0),
+               SUM("sign" * ("rating" IS NOT NULL)::INT)
+        FROM (%s) d
+        WHERE "agent" IS NOT NULL
+        GROUP BY "agent"
+        ON CONFLICT ("agent_name") DO UPDATE SET
+            "times_picked" = s."times_picked" + EXCLUDED."times_picked",
+            "rating_sum" = s."rating_sum" + EXCLUDED."rating_sum",
+            "rating_count" = s."rating_count" + EXCLUDED."rating_count"', v_delta);
+
+    EXECUTE format('
+        INSERT INTO "map_summary" AS s (
+            "map_name", "player_rows", "rating_sum", "rating_count",
+            "acs_sum", "acs_count", "total_kills", "total_deaths"
+        )
+        SELECT "map_name",
+               SUM("sign"),
+               COALESCE(SUM("sign" * "rating"), 0),
+               SUM("sign" * ("rating" IS NOT NULL)::INT),
+               COALESCE(SUM("sign" * "acs"), 0),
+               SUM("sign" * ("acs" IS NOT NULL)::INT),
+               COALESCE(SUM("sign" * "k"), 0),
+               COALESCE(SUM("sign" * "d"), 0)
+        FROM (%s) d
+        WHERE "stat_type" = ''map'' AND "map_name" IS NOT NULL
+        GROUP BY "map_name"
+        ON CONFLICT ("map_name") DO UPDATE SET
+            "player_rows" = s."player_rows" + EXCLUDED."player_rows",
+            "rating_sum" = s."rating_sum" + EXCLUDED."rating_sum",
+            "rating_count" = s."rating_count" + EXCLUDED."rating_count",
+            "acs_sum" = s."acs_sum" + EXCLUDED."acs_sum",
+            "acs_count" = s."acs_count" + EXCLUDED."acs_count",
+            "total_kills" = s."total_kills" + EXCLUDED."total_kills",
+            "total_deaths" = s."total_deaths" + EXCLUDED."total_deaths"', v_delta);
+
+    IF TG_OP <> 'INSERT' THEN
+        DELETE FROM "agent_pick_summary" WHERE "times_picked" = 0 AND "rating_count" = 0;
+        DELETE FROM "map_summary" WHERE "player_rows" = 0;
+    END IF;
+
+    -- Transition tables are only visible here, so collect the affected days first
+    EXECUTE format('
+        SELECT array_agg("player_name"), array_agg("match_date")
+        FROM (
+            SELECT DISTINCT d."player_name", m."date" AS "match_date"
+            FROM (%s) d
+            JOIN "matches" m ON m."match_id" = d."match_id"
+            WHERE d."stat_type" = ''map'' AND d."player_name" IS NOT NULL AND m."date" IS NOT NULL
+        ) k', v_delta)
+    INTO v_player_names, v_dates;
+
+    IF v_player_names IS NOT NULL THEN
+        PERFORM "refresh_player_daily_summary"(v_player_names, v_dates);
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION "summary_matches_changed"()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+DECLARE
+    v_player_names VARCHAR[];
+    v_dates DATE[];
+BEGIN
+    -- A match that is inserted, deleted, moved to another date or renamed
+    -- changes the days of every player with stats in it. One function serves
+    -- all three triggers, so each branch only reads the transition tables
+    -- its event has.
+    IF TG_OP = 'UPDATE' THEN
+        -- Only matches whose date or stage changed; both the old and the new day
+        SELECT array_agg("player_name"), array_agg("match_date")
+        INTO v_player_names, v_dates
+        FROM (
+            SELECT DISTINCT dmps."player_name", d."match_date"
+            FROM new_rows n
+            JOIN old_rows o ON o."match_id" = n."match_id"
+            CROSS JOIN LATERAL (VALUES (o."date"), (n."date")) AS d("match_date")
+            JOIN "detailed_matches_player_stats" dmps ON dmps."match_id" = n."match_id"
+            WHERE (n."date", n."stage") IS DISTINCT FROM (o."date", o."stage")
+              AND dmps."stat_type" = 'map'
+              AND dmps."player_name" IS NOT NULL
+              AND d."match_date" IS NOT NULL
+        ) k;
+    ELSE
+        EXECUTE format('
+            SELECT array_agg("player_name"), array_agg("match_date")
+            FROM (
+                SELECT DISTINCT dmps."player_name", m."date" AS "match_date"
+                FROM %I m
+                JOIN "detailed_matches_player_stats" dmps ON dmps."match_id" = m."match_id"
+                WHERE dmps."stat_type" = ''map'' AND dmps."player_name" IS NOT NULL AND m."date" IS NOT NULL
+            ) k', CASE TG_OP WHEN 'INSERT' THEN 'new_rows' ELSE 'old_rows' END)
+        INTO v_player_names, v_dates;
+    END IF;
+
+    IF v_player_names IS NOT NULL THEN
+        PERFORM "refresh_player_daily_summary"(v_player_names, v_dates);
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+-- 4. Triggers (transition tables allow only one event per trigger)
+
+DROP TRIGGER IF EXISTS "player_stats_summary_ins" ON "player_stats";
+DROP TRIGGER IF EXISTS "player_stats_summary_upd" ON "player_stats";
+DROP TRIGGER IF EXISTS "player_stats_summary_del" ON "player_stats";
+
+CREATE TRIGGER "player_stats_summary_ins" AFTER INSERT ON "player_stats"
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION "summary_player_stats_changed"();
+
+CREATE TRIGGER "player_stats_summary_upd" AFTER UPDATE ON "player_stats"
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION "summary_player_stats_changed"();
+
+CREATE TRIGGER "player_stats_summary_del" AFTER DELETE ON "player_stats"
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION "summary_player_stats_changed"();
+
+DROP TRIGGER IF EXISTS "dmps_summary_ins" ON "detailed_matches_player_stats";
+DROP TRIGGER IF EXISTS "dmps_summary_upd" ON "detailed_matches_player_stats";
+DROP TRIGGER IF EXISTS "dmps_summary_del" ON "detailed_matches_player_stats";
+
+CREATE TRIGGER "dmps_summary_ins" AFTER INSERT ON "detailed_matches_player_stats"
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION "summary_match_player_stats_changed"();
+
+CREATE TRIGGER "dmps_summary_upd" AFTER UPDATE ON "detailed_matches_player_stats"
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION "summary_match_player_stats_changed"();
+
+CREATE TRIGGER "dmps_summary_del" AFTER DELETE ON "detailed_matches_player_stats"
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION "summary_match_player_stats_changed"();
+
+DROP TRIGGER IF EXISTS "matches_summary_ins" ON "matches";
+DROP TRIGGER IF EXISTS "matches_summary_upd" ON "matches";
+DROP TRIGGER IF EXISTS "matches_summary_del" ON "matches";
+
+CREATE TRIGGER "matches_summary_ins" AFTER INSERT ON "matches"
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION "summary_matches_changed"();
+
+-- Transition tables cannot be combined with UPDATE OF column lists, so the
+-- function filters for date/stage changes itself
+CREATE TRIGGER "matches_summary_upd" AFTER UPDATE ON "matches"
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION "summary_matches_changed"();
+
+CREATE TRIGGER "matches_summary_del" AFTER DELETE ON "matches"
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION "summary_matches_changed"();
+
+-- 5. Backfill from the current data
+SELECT "refresh_summary_tables"();
+
+COMMIT;
+
+ANALYZE "team_summary";
+ANALYZE "agent_pick_summary";
+ANALYZE "map_summary";
+ANALYZE "player_daily_summary";
@@ -0,0 +1,56 @@
+-- Per-table version counters for the query result cache
+--
+-- Every INSERT, UPDATE, DELETE or TRUNCATE statement on a table in the public
+-- schema bumps that table's row in table_versions. query_cache.py keys cached
+-- results on these versions, so a cached report is reused exactly until one of
+-- the tables it reads changes. Without this migration the cache falls back to
+-- the pg_stat_user_tables counters, which are updated asynchronously.
+--
+-- Writers to the same table serialize on its table_versions row until commit;
+-- that is fine for the single refresh_data.py writer.
+--
+-- Re-run after adding tables so they get the trigger too:
+--   psql -U postgres -d data_v -f setup_code/migrations/004_table_versions.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS "table_versions" (
+  "table_name" TEXT PRIMARY KEY,
+  "version" BIGINT NOT NULL DEFAULT 0,
+  "changed_at" TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION "bump_table_version"()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO "table_versions" ("table_name", "version", "changed_at")
+    VALUES (TG_TABLE_NAME, 1, now())
+    ON CONFLICT ("table_name") DO UPDATE
+    SET "version" = "table_versions"."version" + 1,
+        "changed_at" = now();
+    RETURN NULL;
+END;
+$$;
+
+DO $$
+DECLARE
+    t RECORD;
+BEGIN
+    FOR t IN
+        SELECT tablename FROM pg_tables
+        WHERE schemaname = 'public' AND tablename <> 'table_versions'
+    LOOP
+        EXECUTE format('DROP TRIGGER IF EXISTS "table_version_bump" ON %I', t.tablename);
+        EXECUTE format(
+            'CREATE TRIGGER "table_version_bump" '
+            'AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE FUNCTION "bump_table_version"()',
+            t.tablename
+        );
+        INSERT INTO "table_versions" ("table_name") VALUES (t.tablename)
+        ON CONFLICT ("table_name") DO NOTHING;
+    END LOOP;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- Timeline chart served from player_daily_summary
+--
+-- The interactive timeline in visualizations_simple.py reads one row per
+-- player per day from player_daily_summary (migration 003) instead of joining
+-- and de-duplicating detailed_matches_player_stats on every run. The covering
+-- index lets the "most active players" ranking run as an index-only scan, and
+-- the chosen players' days are fetched by key.
+--
+-- Keeping the days current when a match is inserted, deleted or changes date
+-- or stage is done by the matches triggers of migration 003.
+--
+-- Requires migration 003:
+--   psql -U postgres -d data_v -f setup_code/migrations/005_timeline_summary_index.sql
+
+BEGIN;
+
+CREATE INDEX IF NOT EXISTS "idx_player_daily_summary_activity"
+ON "player_daily_summary" ("player_name", "match_date") INCLUDE ("maps_played");
+
+ANALYZE "player_daily_summary";
+
+COMMIT;
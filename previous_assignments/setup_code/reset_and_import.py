@@ -26,6 +26,10 @@ def reset_db():
         
         # Clear all tables in reverse dependency order
         tables_to_clear = [
+            'player_daily_summary',
+            'map_summary',
+            'agent_pick_summary',
+            'team_summary',
             'detailed_matches_player_stats',
             'detailed_matches_maps', 
             'detailed_matches_overview',
@@ -0,0 +1,384 @@
+"""
+Statement-aware runner for SQL scripts such as queries.sql
+
+This script:
+- Splits a script into statements with a small tokenizer, so semicolons inside
+  string literals, quoted identifiers, comments and dollar-quoted bodies do not
+  end a statement
+- Runs consecutive read-only statements in a single REPEATABLE READ, READ ONLY
+  transaction, with a savepoint per statement so one failure does not stop the rest
+- Fetches SELECT results through server-side named cursors in batches and
+  streams them as text rows instead of building a DataFrame
+- Runs anything that writes outside the read-only transaction and commits it
+- Writes per-statement timings to a JSON report
+
+Usage:
+    python sql_runner.py [queries.sql] [--batch-size N] [--report PATH] [--quiet]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+
+import psycopg2
+
+# Db connection parameters
+DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'data_v',
+    'user': 'postgres',
+    'password': '0412',
+    'port': '5432'
+}
+
+QUERIES_FILE = 'queries.sql'
+REPORT_FILE = os.path.join('exports', 'sql_script_report.json')
+BATCH_SIZE = 500
+
+# Statements that can run in a READ ONLY transaction, unless they contain a write keyword
+READ_ONLY_STATEMENTS = {'SELECT', 'WITH', 'VALUES', 'TABLE', 'SHOW', 'EXPLAIN'}
+WRITE_KEYWORDS = {
+    'INSERT', 'UPDATE', 'DELETE', 'MERGE', 'INTO', 'CREATE', 'ALTER', 'DROP',
+    'TRUNCATE', 'COPY', 'CALL', 'LOCK', 'NEXTVAL', 'SETVAL',
+}
+# Statements that DECLARE ... CURSOR accepts
+CURSOR_STATEMENTS = {'SELECT', 'WITH', 'VALUES', 'TABLE'}
+
+DOLLAR_TAG = re.compile(r'\$(?:[A-Za-z_\u0080-\uffff][A-Za-z0-9_\u0080-\uffff]*)?\$')
+
+
+def connect_to_db():
+    """Establish db connection"""
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        return conn
+    except Exception as e:
+        print(f"Error connecting to db: {e}")
+        return None
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch in '_$'
+
+
+def _quoted_end(sql_text, i, quote, backslashes=False):
+    """End offset of the quoted token opening at i (doubled quotes are escapes)"""
+    n = len(sql_text)
+    j = i + 1
+    while j < n:
+        ch = sql_text[j]
+        if backslashes and ch == '\\':
+            j += 2
+        elif ch == quote:
+            if sql_text[j + 1:j + 2] == quote:
+                j += 2
+            else:
+                return j + 1
+        else:
+            j += 1
+    return n
+
+
+def _block_comment_end(sql_text, i):
+    """End offset of the /* comment */ opening at i; comments nest in Postgres"""
+    n = len(sql_text)
+    depth = 0
+    j = i
+    while j < n:
+        pair = sql_text[j:j + 2]
+        if pair == '/*':
+            depth += 1
+            j += 2
+        elif pair == '*/':
+            depth -= 1
+            j += 2
+            if depth == 0:
+                return j
+        else:
+            j += 1
+    return n
+
+
+def tokenize_sql(sql_text):
+    """Yield (kind, start, end) tokens: space, comment, string, identifier, word, semicolon, other"""
+    i, n = 0, len(sql_text)
+    while i < n:
+        ch = sql_text[i]
+        nxt = sql_text[i + 1:i + 2]
+
+        if ch.isspace():
+            j = i + 1
+            while j < n and sql_text[j].isspace():
+                j += 1
+            yield 'space', i, j
+        elif ch == '-' and nxt == '-':
+            j = sql_text.find('\n', i)
+            j = n if j == -1 else j
+            yield 'comment', i, j
+        elif ch == '/' and nxt == '*':
+            j = _block_comment_end(sql_text, i)
+            yield 'comment', i, j
+        elif ch == "'":
+            j = _quoted_end(sql_text, i, "'")
+            yield 'string', i, j
+        elif ch == '"':
+            j = _quoted_end(sql_text, i, '"')
+            yield 'identifier', i, j
+        elif ch == '$' and DOLLAR_TAG.match(sql_text, i):
+            tag = DOLLAR_TAG.match(sql_text, i).group(0)
+            end = sql_text.find(tag, i + len(tag))
+            j = n if end == -1 else end + len(tag)
+            yield 'string', i, j
+        elif ch == ';':
+            j = i + 1
+            yield 'semicolon', i, j
+        elif ch.isalpha() or ch == '_':
+            j = i + 1
+            while j < n and _is_word_char(sql_text[j]):
+                j += 1
+            if sql_text[j:j + 1] == "'" and sql_text[i:j] in ('E', 'e'):
+                # E'...' strings use backslash escapes
+                j = _quoted_end(sql_text, j, "'", backslashes=True)
+                yield 'string', i, j
+            else:
+                yield 'word', i, j
+        else:
+            j = i + 1
+            yield 'other', i, j
+        i = j
+
+
+def split_sql_statements(sql_text):
+    """Split a SQL script into (line, statement) pairs; comment-only chunks are skipped"""
+    statements = []
+    start = end = None
+    for kind, token_start, token_end in tokenize_sql(sql_text):
+        if kind == 'semicolon':
+            if start is not None:
+                line = sql_text.count('\n', 0, start) + 1
+                statements.append((line, sql_text[start:end]))
+            start = None
+        elif kind not in ('space', 'comment'):
+            if start is None:
+                start = token_start
+            end = token_end
+
+    if start is not None:
+        line = sql_text.count('\n', 0, start) + 1
+        statements.append((line, sql_text[start:end]))
+    return statements
+
+
+def read_sql_statements(file_path):
+    """Read a SQL file and return its statements"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return [sql for _, sql in split_sql_statements(f.read())]
+
+
+def statement_keywords(sql):
+    """Upper-cased keywords of a statement, ignoring strings, identifiers and comments"""
+    return [sql[s:e].upper() for kind, s, e in tokenize_sql(sql) if kind == 'word']
+
+
+def is_read_only(sql):
+    """True if the statement can run inside a READ ONLY transaction"""
+    keywords = statement_keywords(sql)
+    if not keywords or keywords[0] not in READ_ONLY_STATEMENTS:
+        return False
+    return not WRITE_KEYWORDS.intersection(keywords)
+
+
+def _format_value(value):
+    return 'NULL' if value is None else str(value)
+
+
+def stream_rows(cursor, out, batch_size, first_batch=None):
+    """Write the cursor's result as an aligned text table, one batch at a time.
+
+    Column widths are fixed from the header and the first batch; later values
+    may overflow them rather than forcing the whole result into memory.
+    """
+    columns = [desc[0] for desc in cursor.description]
+    widths = None
+    row_count = 0
+
+    rows = first_batch if first_batch is not None else cursor.fetchmany(batch_size)
+    while rows:
+        cells = [[_format_value(value) for value in row] for row in rows]
+        if widths is None:
+            widths = [
+                max([len(name)] + [len(row[k]) for row in cells])
+                for k, name in enumerate(columns)
+            ]
+            out.write(' '.join(name.rjust(w) for name, w in zip(columns, widths)) + '\n')
+        for row in cells:
+            out.write(' '.join(value.rjust(w) for value, w in zip(row, widths)) + '\n')
+        row_count += len(rows)
+        rows = cursor.fetchmany(batch_size)
+
+    if row_count == 0:
+        out.write("No results found.\n")
+    else:
+        out.write(f"\nRows returned: {row_count}\n")
+    return row_count
+
+
+def _execute_statement(conn, sql, index, read_only, out, batch_size):
+    """Execute one statement and stream its rows; returns (rows, execute_ms)"""
+    keywords = statement_keywords(sql)
+    use_named_cursor = read_only and keywords[0] in CURSOR_STATEMENTS
+
+    if use_named_cursor:
+        cursor = conn.cursor(name=f"sql_runner_{index}")
+        cursor.itersize = batch_size
+    else:
+        cursor = conn.cursor()
+
+    try:
+        started = time.perf_counter()
+        cursor.execute(sql)
+        if use_named_cursor:
+            # DECLARE is lazy; the first FETCH is where the query actually runs
+            first = cursor.fetchmany(batch_size)
+            execute_ms = (time.perf_counter() - started) * 1000
+            rows = stream_rows(cursor, out, batch_size, first_batch=first)
+        else:
+            execute_ms = (time.perf_counter() - started) * 1000
+            if cursor.description:
+                rows = stream_rows(cursor, out, batch_size)
+            else:
+                out.write("Query executed successfully, no results to display.\n")
+                rows = cursor.rowcount
+        return rows, execute_ms
+    finally:
+        cursor.close()
+
+
+def run_sql_script(conn, file_path, out=None, batch_size=BATCH_SIZE, report_file=REPORT_FILE):
+    """Run every statement of a SQL script and stream the results to out.
+
+    Returns the per-statement timing records, which are also written to
+    report_file as JSON (pass None to skip the report).
+    """
+    out = out or sys.stdout
+    with open(file_path, 'r', encoding='utf-8') as f:
+        statements = split_sql_statements(f.read())
+
+    # Named cursors need a transaction
+    was_autocommit = conn.autocommit
+    conn.autocommit = False
+    conn.commit()
+
+    results = []
+    in_read_only = False
+    script_started = time.perf_counter()
+
+    try:
+        for index, (line, sql) in enumerate(statements, 1):
+            read_only = is_read_only(sql)
+            preview = ' '.join(sql.split())[:50]
+            out.write(f"\nExecuting query: {preview}...\n")
+
+            if read_only and not in_read_only:
+                # One snapshot for the whole run of read-only statements
+                with conn.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+                in_read_only = True
+            elif not read_only and in_read_only:
+                conn.commit()
+                in_read_only = False
+
+            record = {
+                'index': index,
+                'line': line,
+                'kind': 'read' if read_only else 'write',
+                'statement': preview,
+            }
+            started = time.perf_counter()
+            try:
+                if read_only:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SAVEPOINT sql_runner_statement")
+                    rows, execute_ms = _execute_statement(conn, sql, index, True, out, batch_size)
+                    with conn.cursor() as cursor:
+                        cursor.execute("RELEASE SAVEPOINT sql_runner_statement")
+                else:
+                    rows, execute_ms = _execute_statement(conn, sql, index, False, out, batch_size)
+                    conn.commit()
+                record.update(status='ok', rows=rows, execute_ms=round(execute_ms, 3))
+            except Exception as e:
+                if read_only:
+                    with conn.cursor() as cursor:
+                        cursor.execute("ROLLBACK TO SAVEPOINT sql_runner_statement")
+                else:
+                    conn.rollback()
+                out.write(f"Error executing statement {index} (line {line}): {e}\n")
+                record.update(status='error', error=str(e).strip())
+            record['total_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            results.append(record)
+    finally:
+        conn.commit()
+        conn.autocommit = was_autocommit
+
+    total_ms = (time.perf_counter() - script_started) * 1000
+    errors = sum(1 for record in results if record['status'] == 'error')
+    out.write(f"\nExecuted {len(results)} statements from {file_path} "
+              f"({errors} errors) in {total_ms:.1f} ms\n")
+
+    if report_file:
+        write_report(file_path, results, total_ms, report_file, out)
+    return results
+
+
+def write_report(file_path, results, total_ms, report_file, out=None):
+    """Write the per-statement timings as JSON"""
+    out = out or sys.stdout
+    report_dir = os.path.dirname(report_file)
+    if report_dir:
+        os.makedirs(report_dir, exist_ok=True)
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'script': file_path,
+        'total_ms': round(total_ms, 3),
+        'statements': results,
+    }
+    with open(report_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, default=str)
+    out.write(f"Report written: {report_file}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a SQL script statement by statement")
+    parser.add_argument('file', nargs='?', default=QUERIES_FILE,
+                        help=f"SQL script to run (default: {QUERIES_FILE})")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help=f"rows fetched per round trip (default: {BATCH_SIZE})")
+    parser.add_argument('--report', default=REPORT_FILE, help="JSON report path")
+    parser.add_argument('--quiet', action='store_true',
+                        help="do not print result rows, only the timing summary")
+    args = parser.parse_args()
+
+    conn = connect_to_db()
+    if not conn:
+        return
+
+    try:
+        out = open(os.devnull, 'w') if args.quiet else sys.stdout
+        results = run_sql_script(conn, args.file, out=out, batch_size=args.batch_size,
+                                 report_file=args.report)
+        if args.quiet:
+            out.close()
+            for record in results:
+                status = f"{record['total_ms']:>10.1f} ms" if record['status'] == 'ok' else '     ERROR'
+                print(f"{record['index']:>3}  line {record['line']:<4} {status}  {record['statement']}")
+    finally:
+        conn.close()
+        print("\nDb connection closed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,38 @@
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
 import psycopg2
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # charts are only saved to files; also required in worker processes
 import matplotlib.pyplot as plt
 import plotly.express as px
 import plotly.graph_objects as go
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.formatting.rule import ColorScaleRule
-from openpyxl.utils.dataframe import dataframe_to_rows
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.filters import AutoFilter
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
 import os
 from datetime import datetime
 import numpy as np
+
+from query_cache import cached_read_sql, cached_read_sql_chunks, normalize_sql, table_versions
+from query_pool import QueryPool, MAX_WORKERS
+from query_stream import stream_query
+
+try:
+    import duckdb_backend
+except ImportError:
+    duckdb_backend = None
  
 # Configuration
 TIMELINE_PLAYER_LIMIT = 24
@@ -32,10 +55,36 @@ def connect_to_db():
         print(f"Error connecting to database: {e}")
         return None
 
+def connect_to_duckdb(data_dirs=None):
+    """Open the data files in DuckDB (see duckdb_backend.py)"""
+    if duckdb_backend is None:
+        print("Error: the duckdb backend needs the duckdb package (pip install duckdb)")
+        return None
+    try:
+        return duckdb_backend.connect(data_dirs)
+    except Exception as e:
+        print(f"Error opening the data files: {e}")
+        return None
+
+def is_duckdb(conn):
+    return duckdb_backend is not None and duckdb_backend.is_duckdb(conn)
+
+def read_query(conn, query):
+    """Query into a DataFrame: on DuckDB directly, on Postgres through the query cache"""
+    if is_duckdb(conn):
+        return duckdb_backend.read_sql(conn, query)
+    return cached_read_sql(conn, query)
+
+def read_query_chunks(conn, query):
+    """Query as a stream of DataFrame chunks (see query_stream.py), through the query cache on Postgres"""
+    if is_duckdb(conn):
+        return stream_query(conn, query)
+    return cached_read_sql_chunks(conn, query)
+
 def execute_query(conn, query, description):
-    """Execute a query and return DataFrame"""
+    """Execute a query and return DataFrame (served from the query cache when unchanged)"""
     try:
-        df = pd.read_sql_query(query, conn)
+        df = read_query(conn, query)
         return df
     except Exception as e:
         print(f"Error executing query: {e}")
@@ -48,19 +97,22 @@ def create_charts_directory():
     if not os.path.exists('exports'):
         os.makedirs('exports')
 
+TEAM_RATINGS_QUERY = """
+SELECT 
+    ts.team,
+    ts.avg_rating,
+    ts.player_count
+FROM team_summary ts
+ORDER BY ts.avg_rating DESC
+"""
+
 def create_pie_chart(conn):
     """Create pie chart: Distribution of teams by average rating"""
-    query = """
-    SELECT 
-        ps.team,
-        ROUND(AVG(ps.rating), 2) as avg_rating,
-        COUNT(*) as player_count
-    FROM player_stats ps
-    GROUP BY ps.team
-    ORDER BY avg_rating DESC
-    """
-    
-    df = execute_query(conn, query, "Team Average Ratings")
+    df = execute_query(conn, TEAM_RATINGS_QUERY, "Team Average Ratings")
+    return render_pie_chart(df)
+
+def render_pie_chart(df):
+    """Render from TEAM_RATINGS_QUERY results (no database access, safe in a worker process)"""
     if df is None or df.empty:
         return 0
     
@@ -91,21 +143,25 @@ def create_pie_chart(conn):
     print(f"Pie Chart: Team rating distribution - {len(df)} teams")
     return len(df)
 
+TOP_PLAYERS_ACS_QUERY = """
+SELECT 
+    ps.player_name,
+    ps.team,
+    ps.acs,
+    ps.rating
+FROM player_stats ps
+WHERE ps.rounds > 100
+ORDER BY ps.acs DESC
+LIMIT 10
+"""
+
 def create_bar_chart(conn):
     """Create bar chart: Top 10 players by ACS (Average Combat Score)"""
-    query = """
-    SELECT 
-        ps.player_name,
-        ps.team,
-        ps.acs,
-        ps.rating
-    FROM player_stats ps
-    WHERE ps.rounds > 100
-    ORDER BY ps.acs DESC
-    LIMIT 10
-    """
-    
-    df = execute_query(conn, query, "Top Players by ACS")
+    df = execute_query(conn, TOP_PLAYERS_ACS_QUERY, "Top Players by ACS")
+    return render_bar_chart(df)
+
+def render_bar_chart(df):
+    """Render from TOP_PLAYERS_ACS_QUERY results (no database access, safe in a worker process)"""
     if df is None or df.empty:
         return 0
     
@@ -141,19 +197,23 @@ def create_bar_chart(conn):
     print(f"Bar Chart: Top players by ACS - {len(df)} players")
     return len(df)
 
+MAP_WIN_RATES_QUERY = """
+SELECT 
+    ms.map_name,
+    ms.attack_win_percent,
+    ms.defense_win_percent,
+    ms.times_played
+FROM maps_stats ms
+ORDER BY ms.times_played DESC
+"""
+
 def create_horizontal_bar_chart(conn):
     """Create horizontal bar chart: Map win rates by side (Attack vs Defense)"""
-    query = """
-    SELECT 
-        ms.map_name,
-        ms.attack_win_percent,
-        ms.defense_win_percent,
-        ms.times_played
-    FROM maps_stats ms
-    ORDER BY ms.times_played DESC
-    """
-    
-    df = execute_query(conn, query, "Map Win Rates")
+    df = execute_query(conn, MAP_WIN_RATES_QUERY, "Map Win Rates")
+    return render_horizontal_bar_chart(df)
+
+def render_horizontal_bar_chart(df):
+    """Render from MAP_WIN_RATES_QUERY results (no database access, safe in a worker process)"""
     if df is None or df.empty:
         return 0
     
@@ -188,30 +248,34 @@ def create_horizontal_bar_chart(conn):
     print(f"Horizontal Bar Chart: Map win rates - {len(df)} maps")
     return len(df)
 
+PLAYER_PERFORMANCE_QUERY = """
+SELECT 
+    m.date,
+    m.match_id,
+    dmps.player_name,
+    dmps.rating,
+    dmps.acs,
+    dmps.map_name
+FROM matches m
+INNER JOIN detailed_matches_player_stats dmps ON m.match_id = dmps.match_id
+WHERE dmps.stat_type = 'map' 
+AND dmps.player_name IN (
+    SELECT player_name 
+    FROM player_stats 
+    WHERE rating > 1.1 
+    ORDER BY rating DESC 
+    LIMIT 5
+)
+ORDER BY m.date, dmps.player_name
+"""
+
 def create_line_chart(conn):
     """Create line chart: Player performance over time (matches)"""
-    query = """
-    SELECT 
-        m.date,
-        m.match_id,
-        dmps.player_name,
-        dmps.rating,
-        dmps.acs,
-        dmps.map_name
-    FROM matches m
-    INNER JOIN detailed_matches_player_stats dmps ON m.match_id = dmps.match_id
-    WHERE dmps.stat_type = 'map' 
-    AND dmps.player_name IN (
-        SELECT player_name 
-        FROM player_stats 
-        WHERE rating > 1.1 
-        ORDER BY rating DESC 
-        LIMIT 5
-    )
-    ORDER BY m.date, dmps.player_name
-    """
-    
-    df = execute_query(conn, query, "Player Performance Over Time")
+    df = execute_query(conn, PLAYER_PERFORMANCE_QUERY, "Player Performance Over Time")
+    return render_line_chart(df)
+
+def render_line_chart(df):
+    """Render from PLAYER_PERFORMANCE_QUERY results (no database access, safe in a worker process)"""
     if df is None or df.empty:
         return 0
     
@@ -243,17 +307,41 @@ def create_line_chart(conn):
     print(f"Line Chart: Player performance over time - {len(df)} data points")
     return len(df)
 
-def create_histogram(conn):
-    """Create histogram: Distribution of player ratings"""
-    query = """
-    SELECT 
-        ps.rating,
-        ps.team
-    FROM player_stats ps
-    WHERE ps.rounds > 50
+PLAYER_RATINGS_QUERY = """
+SELECT 
+    ps.rating,
+    ps.team
+FROM player_stats ps
+WHERE ps.rounds > 50
+"""
+
+def rating_counts(chunks):
+    """Reduce streamed PLAYER_RATINGS_QUERY chunks to the number of players per rating.
+
+    Ratings have two decimals, so the result stays small however many rows
+    are streamed, and the histogram is the same as one drawn from every row.
     """
-    
-    df = execute_query(conn, query, "Player Ratings Distribution")
+    counts = None
+    for chunk in chunks:
+        chunk_counts = chunk['rating'].dropna().astype(float).value_counts()
+        counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+    if counts is None or counts.empty:
+        return pd.DataFrame({'rating': pd.Series(dtype=float), 'players': pd.Series(dtype=int)})
+    counts = counts.sort_index()
+    return pd.DataFrame({'rating': counts.index.to_numpy(dtype=float),
+                         'players': counts.to_numpy().astype(int)})
+
+def create_histogram(conn):
+    """Create histogram: Distribution of player ratings (aggregated while streaming)"""
+    try:
+        df = rating_counts(read_query_chunks(conn, PLAYER_RATINGS_QUERY))
+    except Exception as e:
+        print(f"Error executing query: {e}")
+        df = None
+    return render_histogram(df)
+
+def render_histogram(df):
+    """Render from rating_counts() of PLAYER_RATINGS_QUERY (no database access, safe in a worker process)"""
     if df is None or df.empty:
         return 0
     
@@ -261,7 +349,8 @@ def create_histogram(conn):
     plt.figure(figsize=(12, 8))
     
     # Create histogram with different colors for different rating ranges
-    n, bins, patches = plt.hist(df['rating'], bins=20, alpha=0.7, edgecolor='black', linewidth=0.5)
+    n, bins, patches = plt.hist(df['rating'], weights=df['players'], bins=20,
+                                alpha=0.7, edgecolor='black', linewidth=0.5)
     
     # Color bars based on rating ranges
     for i, (patch, bin_left, bin_right) in enumerate(zip(patches, bins[:-1], bins[1:])):
@@ -280,9 +369,12 @@ def create_histogram(conn):
     plt.title('Distribution of Player Ratings\n(Valorant Champions 2024)', 
               fontsize=16, fontweight='bold', pad=20)
     
-    # Add statistics text
-    mean_rating = df['rating'].mean()
-    median_rating = df['rating'].median()
+    # Add statistics text (weighted by the players at each rating)
+    total_players = int(df['players'].sum())
+    mean_rating = np.average(df['rating'], weights=df['players'])
+    cumulative = df['players'].cumsum().to_numpy()
+    middle = np.searchsorted(cumulative, [(total_players - 1) // 2, total_players // 2], side='right')
+    median_rating = df['rating'].to_numpy()[middle].mean()
     plt.axvline(mean_rating, color='red', linestyle='--', linewidth=2, label=f'Mean: {mean_rating:.2f}')
     plt.axvline(median_rating, color='blue', linestyle='--', linewidth=2, label=f'Median: {median_rating:.2f}')
     
@@ -292,24 +384,28 @@ def create_histogram(conn):
     plt.savefig('charts/player_ratings_histogram.png', dpi=300, bbox_inches='tight')
     plt.close()
     
-    print(f"Histogram: Player ratings distribution - {len(df)} players")
-    return len(df)
+    print(f"Histogram: Player ratings distribution - {total_players} players")
+    return total_players
+
+ACS_RATING_QUERY = """
+SELECT 
+    ps.player_name,
+    ps.team,
+    ps.acs,
+    ps.rating,
+    ps.kd_ratio,
+    ps.rounds
+FROM player_stats ps
+WHERE ps.rounds > 100
+"""
 
 def create_scatter_plot(conn):
     """Create scatter plot: ACS vs Rating correlation with team colors"""
-    query = """
-    SELECT 
-        ps.player_name,
-        ps.team,
-        ps.acs,
-        ps.rating,
-        ps.kd_ratio,
-        ps.rounds
-    FROM player_stats ps
-    WHERE ps.rounds > 100
-    """
-    
-    df = execute_query(conn, query, "ACS vs Rating Correlation")
+    df = execute_query(conn, ACS_RATING_QUERY, "ACS vs Rating Correlation")
+    return render_scatter_plot(df)
+
+def render_scatter_plot(df):
+    """Render from ACS_RATING_QUERY results (no database access, safe in a worker process)"""
     if df is None or df.empty:
         return 0
     
@@ -354,50 +450,41 @@ def create_scatter_plot(conn):
     print(f"Scatter Plot: ACS vs Rating correlation - {len(df)} players")
     return len(df)
 
+# One row per player per day (best map of the day) from player_daily_summary,
+# already typed, formatted and ordered for plotting
+TIMELINE_QUERY = f"""
+WITH eligible_players AS (
+    SELECT player_name
+    FROM player_daily_summary
+    GROUP BY player_name
+    ORDER BY COUNT(*) DESC, SUM(maps_played) DESC, player_name
+    LIMIT {TIMELINE_PLAYER_LIMIT}
+)
+SELECT 
+    pds.match_date::timestamp AS date,
+    to_char(pds.match_date, 'FMMonth DD, YYYY') AS date_display,
+    pds.match_id,
+    pds.stage,
+    pds.player_name,
+    pds.team,
+    pds.rating,
+    pds.acs,
+    pds.kills,
+    pds.deaths,
+    pds.assists,
+    pds.map_name
+FROM player_daily_summary pds
+JOIN eligible_players ep ON ep.player_name = pds.player_name
+ORDER BY pds.match_date, pds.player_name;
+"""
+
 def create_time_slider_chart(conn):
     """Create interactive Plotly chart with time slider - Top Players Performance Over Time"""
-    query = f"""
-    WITH eligible_players AS (
-        SELECT dmps.player_name
-        FROM detailed_matches_player_stats dmps
-        JOIN matches m ON m.match_id = dmps.match_id
-        WHERE dmps.stat_type = 'map'
-        GROUP BY dmps.player_name
-        ORDER BY COUNT(DISTINCT m.date) DESC, COUNT(*) DESC
-        LIMIT {TIMELINE_PLAYER_LIMIT}
-    ), raw AS (
-        SELECT 
-            m.date AS date,
-            m.match_id,
-            m.stage,
-            dmps.player_name,
-            dmps.player_team AS team,
-            dmps.rating,
-            dmps.acs,
-            dmps.k AS kills,
-            dmps.d AS deaths,
-            dmps.a AS assists,
-            dmps.map_name
-        FROM matches m
-        INNER JOIN detailed_matches_player_stats dmps ON m.match_id = dmps.match_id
-        WHERE dmps.stat_type = 'map'
-          AND dmps.player_name IN (SELECT player_name FROM eligible_players)
-    ), ranked AS (
-        SELECT 
-            *,
-            ROW_NUMBER() OVER (
-                PARTITION BY player_name, date
-                ORDER BY rating DESC, acs DESC, kills DESC, match_id DESC
-            ) AS rn
-        FROM raw
-    )
-    SELECT *
-    FROM ranked
-    WHERE rn = 1
-    ORDER BY date, rating DESC;
-    """
-    
-    df = execute_query(conn, query, "Top Players Performance Over Time")
+    df = execute_query(conn, TIMELINE_QUERY, "Top Players Performance Over Time")
+    return render_time_slider_chart(df)
+
+def render_time_slider_chart(df):
+    """Render from TIMELINE_QUERY results (no database access, safe in a worker process)"""
     if df is None or df.empty:
         # Write placeholder HTML so the file is created even if no data
         fig = go.Figure()
@@ -410,48 +497,30 @@ def create_time_slider_chart(conn):
         print("[ Time Slider Chart: No data returned; wrote placeholder HTML")
         return 0
     
-    # Convert date to datetime (robust), sort, and derive daily key for animation
-    df['date'] = pd.to_datetime(df['date'], errors='coerce')
-    df = df.dropna(subset=['date']).sort_values(['date', 'player_name'])
-    df['date_display'] = df['date'].dt.strftime('%B %d, %Y')
+    # TIMELINE_QUERY returns typed dates, display strings and date order, so no parsing here
     # Log which players are included
     included_players = sorted(df['player_name'].unique().tolist())
     print(f"[INFO] Timeline includes {len(included_players)} players (limit {TIMELINE_PLAYER_LIMIT}): {', '.join(included_players)}")
     if len(included_players) < TIMELINE_PLAYER_LIMIT:
         print("[INFO] Fewer players than limit due to data availability across dates.")
-    if df.empty:
-        fig = go.Figure()
-        fig.update_layout(
-            title="Top Players Performance Over Time - No valid dates",
-            annotations=[dict(text="No valid dates after parsing", x=0.5, y=0.5, showarrow=False)]
+    # Each point is shipped once; frames only move the right edge of the x-axis,
+    # so the HTML grows linearly with the number of dates instead of quadratically
+    frame_dates = df['date'].drop_duplicates().tolist()
+    range_start = (frame_dates[0] - pd.Timedelta(hours=12)).strftime('%Y-%m-%d %H:%M')
+    frames = [
+        go.Frame(
+            name=frame_date.strftime('%Y-%m-%d'),
+            layout=dict(xaxis=dict(range=[
+                range_start,
+                (frame_date + pd.Timedelta(hours=12)).strftime('%Y-%m-%d %H:%M')
+            ]))
         )
-        create_charts_directory()
-        fig.write_html('charts/interactive_player_performance_timeline.html')
-        print("[Time Slider Chart: No valid dates after parsing; wrote placeholder HTML")
-        return 0
-    # Build cumulative frames so lines connect over time
-    df['date_norm'] = df['date'].dt.normalize()
-    unique_frames = sorted(df['date_norm'].unique())
-    cumulative_frames = []
-    for frame_date in unique_frames:
-        frame_df = df[df['date_norm'] <= frame_date].copy()
-        frame_df['frame'] = pd.to_datetime(frame_date).strftime('%Y-%m-%d')
-        cumulative_frames.append(frame_df)
-    if not cumulative_frames:
-        fig = go.Figure()
-        fig.update_layout(
-            title="Top Players Performance Over Time - No frames",
-            annotations=[dict(text="No timeline frames to animate", x=0.5, y=0.5, showarrow=False)]
-        )
-        create_charts_directory()
-        fig.write_html('charts/interactive_player_performance_timeline.html')
-        print("[ Time Slider Chart: No frames to animate; wrote placeholder HTML")
-        return 0
-    df_anim = pd.concat(cumulative_frames, ignore_index=True)
+        for frame_date in frame_dates
+    ]
 
     # Create interactive line chart with time navigation (no animation for continuity)
     fig = px.line(
-        df_anim,
+        df,
         x='date',
         y='rating',
         color='player_name',
@@ -469,9 +538,6 @@ def create_time_slider_chart(conn):
             'date': 'Match Date',
             'player_name': 'Player'
         },
-        animation_frame='frame',
-        animation_group='player_name',
-        category_orders={'frame': sorted(df_anim['frame'].unique())}
     )
     
     # Update layout for better appearance
@@ -514,25 +580,6 @@ def create_time_slider_chart(conn):
                      '<extra></extra>'
     )
 
-    # Ensure markers/hover settings apply to animation frames as well
-    if fig.frames:
-        for frame in fig.frames:
-            for tr in frame.data:
-                tr.update(
-                    mode='lines+markers',
-                    line=dict(width=3),
-                    marker=dict(size=8, line=dict(width=2, color='white')),
-                    hovertemplate='<b>%{hovertext}</b><br>' +
-                                  'Team: %{customdata[0]}<br>' +
-                                  'Rating: %{y:.2f}<br>' +
-                                  'ACS: %{customdata[1]}<br>' +
-                                  'K/D/A: %{customdata[2]}/%{customdata[3]}/%{customdata[4]}<br>' +
-                                  'Map: %{customdata[5]}<br>' +
-                                  'Stage: %{customdata[6]}<br>' +
-                                  'Date: %{customdata[7]}<br>' +
-                                  '<extra></extra>'
-                )
-    
     # Update x-axis
     fig.update_xaxes(
         showgrid=True,
@@ -549,13 +596,28 @@ def create_time_slider_chart(conn):
         range=[0.5, 1.5]  # Focus on relevant rating range
     )
     
-    # Animation works best without range slider/selectors
+    # Animation works best without range slider/selectors; start on the first date
+    fig.frames = frames
     fig.update_layout(
         xaxis=dict(
             rangeslider=dict(visible=False),
-            type="date"
+            type="date",
+            range=frames[0].layout.xaxis.range
         ),
         transition=dict(duration=300),
+        sliders=[{
+            'active': 0,
+            'currentvalue': {'prefix': 'Date: '},
+            'pad': {'t': 60},
+            'steps': [
+                {
+                    'label': frame.name,
+                    'method': 'animate',
+                    'args': [[frame.name], {'frame': {'duration': 300, 'redraw': False}, 'mode': 'immediate', 'transition': {'duration': 300}}]
+                }
+                for frame in frames
+            ]
+        }],
         updatemenus=[{
             'type': 'buttons',
             'showactive': True,
@@ -580,229 +642,530 @@ def create_time_slider_chart(conn):
     print(f"Time Slider Chart: Interactive player performance timeline - {len(df)} data points")
     return len(df)
 
-def export_to_excel(conn):
-    """Export data to Excel with formatting"""
-    # Create workbook
-    wb = Workbook()
-    
-    # Remove default sheet
-    wb.remove(wb.active)
-    
-    # Define styles
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True)
-    border = Border(left=Side(style='thin'), right=Side(style='thin'), 
-                   top=Side(style='thin'), bottom=Side(style='thin'))
-    
-    # Sheet 1: Player Statistics
-    ws1 = wb.create_sheet("Player Statistics")
-    query1 = """
-    SELECT 
-        ps.player_name,
-        ps.team,
-        ps.rating,
-        ps.acs,
-        ps.kd_ratio,
-        ps.rounds,
-        ps.kills,
-        ps.deaths,
-        ps.assists
-    FROM player_stats ps
-    ORDER BY ps.rating DESC
-    """
-    df1 = execute_query(conn, query1, "Player Statistics")
-    
-    if df1 is not None and not df1.empty:
-        # Add data to worksheet
-        for r in dataframe_to_rows(df1, index=False, header=True):
-            ws1.append(r)
-        
-        # Format headers
-        for cell in ws1[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center')
-            cell.border = border
-        
-        # Apply borders to all data cells
-        for row in ws1.iter_rows(min_row=2, max_row=ws1.max_row, min_col=1, max_col=ws1.max_column):
-            for cell in row:
-                cell.border = border
-        
-        # Freeze headers
-        ws1.freeze_panes = 'A2'
-        
-        # Add filters
-        ws1.auto_filter.ref = ws1.dimensions
-        
-        # Apply conditional formatting for rating column (column C)
-        rating_range = f"C2:C{ws1.max_row}"
-        ws1.conditional_formatting.add(rating_range, 
-            ColorScaleRule(start_type='min', start_color='FF6B6B',
-                          end_type='max', end_color='4ECDC4'))
-        
-        # Apply conditional formatting for ACS column (column D)
-        acs_range = f"D2:D{ws1.max_row}"
-        ws1.conditional_formatting.add(acs_range,
-            ColorScaleRule(start_type='min', start_color='FFE66D',
-                          end_type='max', end_color='FF6B6B'))
-    
-    # Sheet 2: Team Performance
-    ws2 = wb.create_sheet("Team Performance")
-    query2 = """
-    SELECT 
-        ps.team,
-        COUNT(*) as player_count,
-        ROUND(AVG(ps.rating), 2) as avg_rating,
-        ROUND(AVG(ps.acs), 2) as avg_acs,
-        ROUND(AVG(ps.kd_ratio), 2) as avg_kd,
-        ROUND(MIN(ps.rating), 2) as min_rating,
-        ROUND(MAX(ps.rating), 2) as max_rating
-    FROM player_stats ps
-    GROUP BY ps.team
-    ORDER BY avg_rating DESC
-    """
-    df2 = execute_query(conn, query2, "Team Performance")
-    
-    if df2 is not None and not df2.empty:
-        for r in dataframe_to_rows(df2, index=False, header=True):
-            ws2.append(r)
-        
-        # Format headers
-        for cell in ws2[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center')
-            cell.border = border
-        
-        # Apply borders
-        for row in ws2.iter_rows(min_row=2, max_row=ws2.max_row, min_col=1, max_col=ws2.max_column):
-            for cell in row:
-                cell.border = border
-        
-        # Freeze headers
-        ws2.freeze_panes = 'A2'
-        ws2.auto_filter.ref = ws2.dimensions
-        
-        # Apply conditional formatting for average rating
-        rating_range = f"C2:C{ws2.max_row}"
-        ws2.conditional_formatting.add(rating_range,
-            ColorScaleRule(start_type='min', start_color='FF6B6B',
-                          end_type='max', end_color='4ECDC4'))
-    
-    # Sheet 3: Map Statistics
-    ws3 = wb.create_sheet("Map Statistics")
-    query3 = """
-    SELECT 
-        ms.map_name,
-        ms.times_played,
-        ms.attack_win_percent,
-        ms.defense_win_percent,
-        CASE 
-            WHEN ms.attack_win_percent > ms.defense_win_percent THEN 'Attack Favored'
-            WHEN ms.defense_win_percent > ms.attack_win_percent THEN 'Defense Favored'
-            ELSE 'Balanced'
-        END as map_balance
-    FROM maps_stats ms
-    ORDER BY ms.times_played DESC
+PLAYER_STATISTICS_QUERY = """
+SELECT 
+    ps.player_name,
+    ps.team,
+    ps.rating,
+    ps.acs,
+    ps.kd_ratio,
+    ps.rounds,
+    ps.kills,
+    ps.deaths,
+    ps.assists
+FROM player_stats ps
+ORDER BY ps.rating DESC
+"""
+
+TEAM_PERFORMANCE_QUERY = """
+SELECT 
+    ts.team,
+    ts.player_count,
+    ts.avg_rating,
+    ts.avg_acs,
+    ts.avg_kd,
+    ts.min_rating,
+    ts.max_rating
+FROM team_summary ts
+ORDER BY ts.avg_rating DESC
+"""
+
+MAP_STATISTICS_QUERY = """
+SELECT 
+    ms.map_name,
+    ms.times_played,
+    ms.attack_win_percent,
+    ms.defense_win_percent,
+    CASE 
+        WHEN ms.attack_win_percent > ms.defense_win_percent THEN 'Attack Favored'
+        WHEN ms.defense_win_percent > ms.attack_win_percent THEN 'Defense Favored'
+        ELSE 'Balanced'
+    END as map_balance,
+    COALESCE(msum.player_rows, 0) as player_map_rows,
+    msum.avg_rating as avg_player_rating,
+    msum.avg_acs as avg_player_acs
+FROM maps_stats ms
+LEFT JOIN map_summary msum ON msum.map_name = ms.map_name
+ORDER BY ms.times_played DESC
+"""
+
+# Every query read by the charts and the Excel export, keyed by description
+CHART_QUERIES = {
+    "Team Average Ratings": TEAM_RATINGS_QUERY,
+    "Top Players by ACS": TOP_PLAYERS_ACS_QUERY,
+    "Map Win Rates": MAP_WIN_RATES_QUERY,
+    "Player Performance Over Time": PLAYER_PERFORMANCE_QUERY,
+    "Player Ratings Distribution": PLAYER_RATINGS_QUERY,
+    "ACS vs Rating Correlation": ACS_RATING_QUERY,
+    "Top Players Performance Over Time": TIMELINE_QUERY,
+    "Player Statistics": PLAYER_STATISTICS_QUERY,
+    "Team Performance": TEAM_PERFORMANCE_QUERY,
+    "Map Statistics": MAP_STATISTICS_QUERY,
+}
+
+# Queries whose charts only need an aggregate: streamed and reduced chunk by
+# chunk (see fetch_chart_data) instead of read into one DataFrame
+CHART_REDUCERS = {
+    "Player Ratings Distribution": rating_counts,
+}
+
+# Excel report sheets: (title, query, color scales as (column, start color, end color))
+EXCEL_SHEETS = [
+    ("Player Statistics", PLAYER_STATISTICS_QUERY, [('C', 'FF6B6B', '4ECDC4'), ('D', 'FFE66D', 'FF6B6B')]),
+    ("Team Performance", TEAM_PERFORMANCE_QUERY, [('C', 'FF6B6B', '4ECDC4')]),
+    ("Map Statistics", MAP_STATISTICS_QUERY, [('C', 'FF6B6B', '4ECDC4'), ('D', 'FF6B6B', '4ECDC4')]),
+]
+
+# Rows fetched per round trip when streaming a sheet from a server-side cursor
+EXCEL_BATCH_SIZE = 5000
+
+# Grid borders and row banding come from the table style instead of per-cell objects
+EXCEL_TABLE_STYLE = "TableStyleLight15"
+EXCEL_HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+EXCEL_HEADER_FONT = Font(color="FFFFFF", bold=True)
+EXCEL_HEADER_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'),
+                             top=Side(style='thin'), bottom=Side(style='thin'))
+
+def dataframe_batches(df, batch_size=EXCEL_BATCH_SIZE):
+    """Rows of a DataFrame as batches of at most batch_size tuples, with NaN/NaT written as empty cells"""
+    for start in range(0, len(df), batch_size):
+        part = df.iloc[start:start + batch_size]
+        yield list(part.astype(object).where(part.notna(), None).itertuples(index=False, name=None))
+
+def cursor_batches(cursor, batch_size, first_batch=None):
+    """Batches of rows from a (server-side) cursor until it is exhausted"""
+    rows = first_batch if first_batch is not None else cursor.fetchmany(batch_size)
+    while rows:
+        yield rows
+        rows = cursor.fetchmany(batch_size)
+
+def write_excel_sheet(wb, title, columns, row_batches, color_scales):
+    """Stream rows into a write-only sheet and return the number of data rows.
+
+    Only the header row gets cell styles; the data is covered by an Excel
+    table (style, filters) and range-level color scales, so memory does not
+    grow with the number of rows.
     """
-    df3 = execute_query(conn, query3, "Map Statistics")
-    
-    if df3 is not None and not df3.empty:
-        for r in dataframe_to_rows(df3, index=False, header=True):
-            ws3.append(r)
-        
-        # Format headers
-        for cell in ws3[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center')
-            cell.border = border
-        
-        # Apply borders
-        for row in ws3.iter_rows(min_row=2, max_row=ws3.max_row, min_col=1, max_col=ws3.max_column):
-            for cell in row:
-                cell.border = border
-        
-        # Freeze headers
-        ws3.freeze_panes = 'A2'
-        ws3.auto_filter.ref = ws3.dimensions
-        
-        # Apply conditional formatting for attack win percentage
-        attack_range = f"C2:C{ws3.max_row}"
-        ws3.conditional_formatting.add(attack_range,
-            ColorScaleRule(start_type='min', start_color='FF6B6B',
-                          end_type='max', end_color='4ECDC4'))
-        
-        # Apply conditional formatting for defense win percentage
-        defense_range = f"D2:D{ws3.max_row}"
-        ws3.conditional_formatting.add(defense_range,
-            ColorScaleRule(start_type='min', start_color='FF6B6B',
-                          end_type='max', end_color='4ECDC4'))
-    
-    # Save workbook
+    ws = wb.create_sheet(title)
+    # Sheet view is written with the first row, so freeze before appending
+    ws.freeze_panes = 'A2'
+
+    header = []
+    for name in columns:
+        cell = WriteOnlyCell(ws, value=name)
+        cell.fill = EXCEL_HEADER_FILL
+        cell.font = EXCEL_HEADER_FONT
+        cell.alignment = Alignment(horizontal='center')
+        cell.border = EXCEL_HEADER_BORDER
+        header.append(cell)
+    ws.append(header)
+
+    row_count = 0
+    for batch in row_batches:
+        for row in batch:
+            ws.append(row)
+        row_count += len(batch)
+
+    # Tables and conditional formats are written when the sheet is closed,
+    # so their ranges can be set after the rows have been streamed
+    if row_count:
+        last_row = row_count + 1
+        table = Table(displayName=title.replace(' ', ''),
+                      ref=f"A1:{get_column_letter(len(columns))}{last_row}")
+        # Write-only sheets cannot read the header back, so name the columns here
+        table.tableColumns = [TableColumn(id=idx, name=name) for idx, name in enumerate(columns, 1)]
+        table.autoFilter = AutoFilter(ref=table.ref)
+        table.tableStyleInfo = TableStyleInfo(name=EXCEL_TABLE_STYLE, showRowStripes=True)
+        with warnings.catch_warnings():
+            # openpyxl warns for every write-only table, even with columns set
+            warnings.simplefilter('ignore', UserWarning)
+            ws.add_table(table)
+
+        for column, start_color, end_color in color_scales:
+            ws.conditional_formatting.add(f"{column}2:{column}{last_row}",
+                ColorScaleRule(start_type='min', start_color=start_color,
+                               end_type='max', end_color=end_color))
+    return row_count
+
+def save_excel_report(wb, total_rows):
+    """Save a report workbook under a timestamped name and print a short summary"""
     filename = f'exports/valorant_champions_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
     wb.save(filename)
     
-    # Calculate total rows
-    total_rows = 0
-    if df1 is not None:
-        total_rows += len(df1)
-    if df2 is not None:
-        total_rows += len(df2)
-    if df3 is not None:
-        total_rows += len(df3)
-    
     print(f"Excel Export: Created {filename}")
     print(f"  - 3 sheets: Player Statistics, Team Performance, Map Statistics")
     print(f"  - Total rows: {total_rows}")
-    print(f"  - Features: Frozen headers, gradient fills, filters, conditional formatting")
+    print(f"  - Features: Frozen headers, table styles, filters, conditional formatting")
     
     return filename
 
+def write_chunked_sheet(wb, title, chunks, color_scales, batch_size):
+    """Stream DataFrame chunks (see query_stream.py) into a sheet; returns the number of data rows"""
+    first = next(chunks)
+    if first.empty:
+        wb.create_sheet(title)
+        return 0
+    batches = (batch for chunk in itertools.chain([first], chunks)
+               for batch in dataframe_batches(chunk, batch_size))
+    return write_excel_sheet(wb, title, [str(name) for name in first.columns], batches, color_scales)
+
+def write_excel_report(conn, batch_size=EXCEL_BATCH_SIZE):
+    """Write the Excel report, streaming each sheet from the database.
+
+    Postgres rows come from a server-side cursor, DuckDB rows from
+    DataFrame chunks, so memory stays bounded by batch_size whatever the
+    size of the sheets. Returns (filename, number of sheets whose query failed).
+    """
+    wb = Workbook(write_only=True)
+    total_rows = 0
+    failed = 0
+
+    for index, (title, query, color_scales) in enumerate(EXCEL_SHEETS):
+        if is_duckdb(conn):
+            try:
+                total_rows += write_chunked_sheet(wb, title, stream_query(conn, query, chunk_size=batch_size),
+                                                  color_scales, batch_size)
+            except Exception as e:
+                print(f"Error executing query: {e}")
+                failed += 1
+                if title not in wb.sheetnames:
+                    wb.create_sheet(title)
+            continue
+
+        cursor = conn.cursor(name=f"excel_export_{index}")
+        cursor.itersize = batch_size
+        try:
+            cursor.execute(query)
+            # DECLARE is lazy; the first FETCH runs the query and fills description
+            first = cursor.fetchmany(batch_size)
+            columns = [desc[0] for desc in cursor.description]
+        except Exception as e:
+            print(f"Error executing query: {e}")
+            conn.rollback()
+            failed += 1
+            wb.create_sheet(title)
+            continue
+
+        try:
+            if first:
+                total_rows += write_excel_sheet(wb, title, columns,
+                                                cursor_batches(cursor, batch_size, first), color_scales)
+            else:
+                wb.create_sheet(title)
+        finally:
+            cursor.close()
+
+    if not is_duckdb(conn):
+        # End the read transaction the cursors ran in
+        conn.rollback()
+    return save_excel_report(wb, total_rows), failed
+
+def export_to_excel(conn, batch_size=EXCEL_BATCH_SIZE):
+    """Export data to Excel, streaming each sheet from the database"""
+    return write_excel_report(conn, batch_size)[0]
+
+# Chart pipeline. Each entry declares the CHART_QUERIES it reads, the tables
+# behind them (for incremental rebuilds), its output files and a summary line.
+# A 'streamed' entry is not prefetched: its render reads the data itself from
+# the connection and returns (result, failed query count).
+CHART_PIPELINE = [
+    {'name': "Pie Chart", 'queries': ["Team Average Ratings"],
+     'tables': ["team_summary"],
+     'outputs': ["charts/team_rating_distribution_pie.png"],
+     'render': render_pie_chart,
+     'summary': "Pie Chart: Team rating distribution - {} teams"},
+    {'name': "Bar Chart", 'queries': ["Top Players by ACS"],
+     'tables': ["player_stats"],
+     'outputs': ["charts/top_players_acs_bar.png"],
+     'render': render_bar_chart,
+     'summary': "Bar Chart: Top players by ACS - {} players"},
+    {'name': "Horizontal Bar", 'queries': ["Map Win Rates"],
+     'tables': ["maps_stats"],
+     'outputs': ["charts/map_win_rates_horizontal_bar.png"],
+     'render': render_horizontal_bar_chart,
+     'summary': "Horizontal Bar: Map win rates - {} maps"},
+    {'name': "Line Chart", 'queries': ["Player Performance Over Time"],
+     'tables': ["matches", "detailed_matches_player_stats", "player_stats"],
+     'outputs': ["charts/player_performance_line.png"],
+     'render': render_line_chart,
+     'summary': "Line Chart: Player performance over time - {} data points"},
+    {'name': "Histogram", 'queries': ["Player Ratings Distribution"],
+     'tables': ["player_stats"],
+     'outputs': ["charts/player_ratings_histogram.png"],
+     'render': render_histogram,
+     'summary': "Histogram: Player ratings distribution - {} players"},
+    {'name': "Scatter Plot", 'queries': ["ACS vs Rating Correlation"],
+     'tables': ["player_stats"],
+     'outputs': ["charts/acs_rating_scatter.png"],
+     'render': render_scatter_plot,
+     'summary': "Scatter Plot: ACS vs Rating correlation - {} players"},
+    {'name': "Time Slider", 'queries': ["Top Players Performance Over Time"],
+     'tables': ["player_daily_summary"],
+     'outputs': ["charts/interactive_player_performance_timeline.html"],
+     'render': render_time_slider_chart,
+     'summary': "Time Slider: Interactive player performance timeline - {} data points"},
+    # The report file name is timestamped, so its output is the returned path
+    {'name': "Excel Export", 'queries': ["Player Statistics", "Team Performance", "Map Statistics"],
+     'tables': ["player_stats", "team_summary", "maps_stats", "map_summary"],
+     'outputs': [],
+     'render': write_excel_report,
+     'streamed': True,
+     'summary': "Excel Export: {}"},
+]
+
+CHART_MANIFEST_FILE = os.path.join('charts', 'chart_manifest.json')
+
+def load_chart_manifest(path=CHART_MANIFEST_FILE):
+    """Load {chart name: {fingerprint, outputs, result, built_at}} from the last run"""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable chart manifest {path}: {e}")
+        return {}
+
+def save_chart_manifest(manifest, path=CHART_MANIFEST_FILE):
+    """Write the manifest atomically so an interrupted run cannot truncate it"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+def chart_fingerprint(chart, versions):
+    """Hash of a chart's query text and the current version of every table it reads"""
+    parts = [normalize_sql(CHART_QUERIES[query_name]) for query_name in chart['queries']]
+    parts += [f"{table}={versions.get(table)}" for table in sorted(chart['tables'])]
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+def is_chart_current(entry, fingerprint):
+    """True if the manifest entry was built from the same data and its files still exist"""
+    if not entry or entry.get('fingerprint') != fingerprint:
+        return False
+    return all(os.path.exists(path) for path in entry.get('outputs', []))
+
+def timed_render(render, frames):
+    """Run a render function and return (result, elapsed_ms); executed in a worker process"""
+    started = time.perf_counter()
+    result = render(*frames)
+    return result, round((time.perf_counter() - started) * 1000, 1)
+
+def timed_streamed_render(conn, chart):
+    """Run a streamed pipeline entry on the connection; returns (result, failed, elapsed_ms)"""
+    started = time.perf_counter()
+    try:
+        result, failed = chart['render'](conn)
+    except Exception as e:
+        print(f"Error rendering {chart['name']}: {e}")
+        if not is_duckdb(conn):
+            conn.rollback()
+        return None, 0, None
+    return result, failed, round((time.perf_counter() - started) * 1000, 1)
+
+def fetch_chart_data(conn, query_names, parallel=False, max_workers=MAX_WORKERS):
+    """Fetch the named CHART_QUERIES; concurrently through a QueryPool when parallel.
+
+    The pool is Postgres-only; on DuckDB the queries run one after another,
+    each on all cores.
+
+    Queries with a CHART_REDUCERS entry are streamed and reduced chunk by
+    chunk, so their 'df' is the reduced frame.
+
+    Returns {query name: result dict} with 'df', 'error' and 'elapsed_ms' keys.
+    """
+    queries = {name: query for name, query in CHART_QUERIES.items() if name in query_names}
+    if not queries:
+        return {}
+
+    if parallel and not is_duckdb(conn):
+        with QueryPool(max_workers) as pool:
+            results = pool.fetch_all(queries, CHART_REDUCERS)
+    else:
+        results = {}
+        for name, query in queries.items():
+            started = time.perf_counter()
+            try:
+                reduce = CHART_REDUCERS.get(name)
+                if reduce is not None:
+                    df = reduce(read_query_chunks(conn, query))
+                else:
+                    df = read_query(conn, query)
+                error = None
+            except Exception as e:
+                if not is_duckdb(conn):
+                    conn.rollback()
+                df, error = None, e
+            results[name] = {'df': df, 'error': error,
+                             'elapsed_ms': round((time.perf_counter() - started) * 1000, 3)}
+
+    for name, result in results.items():
+        if result['error'] is not None:
+            print(f"Error executing query ({name}): {result['error']}")
+    return results
+
+def run_chart_pipeline(conn, parallel=False, max_workers=MAX_WORKERS, force=False):
+    """Rebuild the charts and the Excel export whose input tables changed.
+
+    A chart is skipped when its fingerprint (query text plus the versions of
+    its declared tables) matches the manifest and its files exist; force=True
+    rebuilds everything. Data for the remaining charts is fetched first, then
+    rendered. With parallel=True the queries run concurrently on a connection
+    pool and the renders run in a process pool (spawn start method, Agg
+    backend, at most one process per core), so a full regeneration scales
+    across cores. Streamed entries (the Excel export) read their data on conn
+    while the charts render; their time is reported as render time.
+
+    Returns a list of (name, result, fetch_ms, render_ms) tuples in
+    CHART_PIPELINE order; both times are None for a skipped chart.
+    """
+    manifest = load_chart_manifest()
+    # Versions are read before the data, so a concurrent write can only make
+    # an artifact newer than its fingerprint, never older
+    if is_duckdb(conn):
+        versions = duckdb_backend.table_versions(conn)
+    else:
+        versions = table_versions(conn)
+        conn.rollback()
+    # Without migration 004 (or for a table it does not track) there is no
+    # reliable version to compare, so the chart is always rebuilt
+    versions = versions or {}
+    fingerprints = {chart['name']: chart_fingerprint(chart, versions) for chart in CHART_PIPELINE}
+    stale = [chart for chart in CHART_PIPELINE
+             if force or any(versions.get(table) is None for table in chart['tables'])
+             or not is_chart_current(manifest.get(chart['name']), fingerprints[chart['name']])]
+
+    streamed = [chart for chart in stale if chart.get('streamed')]
+    needed = {query_name for chart in stale if not chart.get('streamed')
+              for query_name in chart['queries']}
+    fetched = fetch_chart_data(conn, needed, parallel, max_workers)
+
+    rendered = {}
+    def run_streamed():
+        for chart in streamed:
+            result, failed, render_ms = timed_streamed_render(conn, chart)
+            rendered[chart['name']] = (result, 0.0, render_ms, failed > 0)
+
+    jobs = []
+    for chart in stale:
+        if chart.get('streamed'):
+            continue
+        frames = [fetched[query_name]['df'] for query_name in chart['queries']]
+        fetch_ms = sum(fetched[query_name]['elapsed_ms'] for query_name in chart['queries'])
+        jobs.append((chart, frames, fetch_ms))
+
+    if parallel and jobs:
+        # spawn: workers import a fresh matplotlib instead of inheriting the parent's state
+        context = multiprocessing.get_context('spawn')
+        # Rendering is CPU-bound: more processes than cores only adds contention
+        render_workers = max(1, min(max_workers, len(jobs), os.cpu_count() or 1))
+        with ProcessPoolExecutor(max_workers=render_workers, mp_context=context) as executor:
+            futures = [(chart, executor.submit(timed_render, chart['render'], frames), fetch_ms)
+                       for chart, frames, fetch_ms in jobs]
+            # The connection is free while the workers render
+            run_streamed()
+            for chart, future, fetch_ms in futures:
+                try:
+                    result, render_ms = future.result()
+                except Exception as e:
+                    print(f"Error rendering {chart['name']}: {e}")
+                    result, render_ms = None, None
+                failed_fetch = any(fetched[query_name]['error'] is not None for query_name in chart['queries'])
+                rendered[chart['name']] = (result, fetch_ms, render_ms, failed_fetch)
+    else:
+        for chart, frames, fetch_ms in jobs:
+            try:
+                result, render_ms = timed_render(chart['render'], frames)
+            except Exception as e:
+                print(f"Error rendering {chart['name']}: {e}")
+                result, render_ms = None, None
+            failed_fetch = any(fetched[query_name]['error'] is not None for query_name in chart['queries'])
+            rendered[chart['name']] = (result, fetch_ms, render_ms, failed_fetch)
+        run_streamed()
+
+    timings = []
+    for chart in CHART_PIPELINE:
+        name = chart['name']
+        if name not in rendered:
+            timings.append((name, manifest[name].get('result'), None, None))
+            continue
+
+        result, fetch_ms, render_ms, failed_fetch = rendered[name]
+        timings.append((name, result, fetch_ms, render_ms))
+        if render_ms is None or failed_fetch:
+            # Leave the old entry so the next run retries this chart
+            continue
+        outputs = list(chart['outputs'])
+        if isinstance(result, str):
+            outputs.append(result)
+        manifest[name] = {
+            'fingerprint': fingerprints[name],
+            'tables': {table: versions.get(table) for table in chart['tables']},
+            'outputs': outputs,
+            'result': result,
+            'built_at': datetime.now().isoformat(timespec='seconds'),
+        }
+
+    save_chart_manifest(manifest)
+    return timings
+
+def print_pipeline_timings(timings, total_ms):
+    """Print per-chart fetch and render times"""
+    print(f"\n{'Chart':<16} {'Fetch ms':>10} {'Render ms':>10}")
+    print("-" * 38)
+    for name, _, fetch_ms, render_ms in timings:
+        if fetch_ms is None:
+            print(f"{name:<16} {'up to date':>21}")
+            continue
+        render_text = f"{render_ms:>10.1f}" if render_ms is not None else f"{'failed':>10}"
+        print(f"{name:<16} {fetch_ms:>10.1f} {render_text}")
+    print("-" * 38)
+    print(f"{'Total wall time':<27} {total_ms:>10.1f}")
+
 def main():
     """Main function to create all visualizations and exports"""
+    parser = argparse.ArgumentParser(description="Create charts and the Excel report")
+    parser.add_argument("--parallel", action="store_true",
+                        help="fetch data on a connection pool and render charts in a process pool")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help=f"pool size for --parallel (default: {MAX_WORKERS})")
+    parser.add_argument("--force", action="store_true",
+                        help="rebuild every chart even if its input tables are unchanged")
+    parser.add_argument("--backend", choices=["postgres", "duckdb"], default="postgres",
+                        help="query the Postgres database or the exported files in-process on DuckDB")
+    parser.add_argument("--data-dir", action="append",
+                        help="data directory for --backend duckdb, repeatable (default: see duckdb_backend.py)")
+    args = parser.parse_args()
+
     print("VALORANT CHAMPIONS 2024 - DATA VISUALIZATION & EXPORT")
     print("=" * 60)
     
     # Create directories
     create_charts_directory()
     
-    # Connect to database
-    conn = connect_to_db()
+    # Connect to database (also used for table versions in parallel mode)
+    conn = connect_to_duckdb(args.data_dir) if args.backend == "duckdb" else connect_to_db()
     if not conn:
         return
     
     try:
-        # Create all charts
+        # Create changed charts and the Excel export
         print("\nCreating Visualizations...")
         print("-" * 30)
         
-        pie_rows = create_pie_chart(conn)
-        bar_rows = create_bar_chart(conn)
-        hbar_rows = create_horizontal_bar_chart(conn)
-        line_rows = create_line_chart(conn)
-        hist_rows = create_histogram(conn)
-        scatter_rows = create_scatter_plot(conn)
-        timeline_rows = create_time_slider_chart(conn)
-        
-        # Export to Excel
-        print("\nCreating Excel Export...")
-        print("-" * 30)
-        excel_file = export_to_excel(conn)
+        started = time.perf_counter()
+        timings = run_chart_pipeline(conn, parallel=args.parallel,
+                                     max_workers=args.workers, force=args.force)
+        total_ms = (time.perf_counter() - started) * 1000
         
         # Print summary report
         print(f"\n{'='*60}")
         print("VISUALIZATION SUMMARY REPORT")
         print(f"{'='*60}")
-        print(f"Pie Chart: Team rating distribution - {pie_rows} teams")
-        print(f"Bar Chart: Top players by ACS - {bar_rows} players")
-        print(f"Horizontal Bar: Map win rates - {hbar_rows} maps")
-        print(f"Line Chart: Player performance over time - {line_rows} data points")
-        print(f"Histogram: Player ratings distribution - {hist_rows} players")
-        print(f"Scatter Plot: ACS vs Rating correlation - {scatter_rows} players")
-        print(f"Time Slider: Interactive player performance timeline - {timeline_rows} data points")
-        print(f"Excel Export: {excel_file}")
+        for chart, (_, result, fetch_ms, _) in zip(CHART_PIPELINE, timings):
+            suffix = " (unchanged)" if fetch_ms is None else ""
+            print(chart['summary'].format(result) + suffix)
+        print_pipeline_timings(timings, total_ms)
         print(f"\nAll charts saved to /charts/ directory")
         print(f"Excel report saved to /exports/ directory")
         print(f"{'='*60}")
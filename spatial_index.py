@@ -0,0 +1,121 @@
+"""
+Spatial index for nearest-neighbor queries against a point cloud
+
+SpatialIndex wraps a scipy cKDTree built once per cloud and answers batched
+k-NN queries in parallel: on OMP_NUM_THREADS threads when it is set (the
+batch driver's share of the cores per worker), otherwise on all cores. On top
+of the raw query it provides the operations the pipeline needs:
+
+- transfer(): copy per-point values (colors, normals) onto other positions,
+  from the nearest point or as an inverse-distance weighted mean of k points
+- spacing(): typical distance between neighboring points of the cloud
+- far_from_cloud(): mask of positions whose k nearest points are much farther
+  away than the cloud spacing (surface artifacts that no sample supports)
+
+get_index() keeps the most recently used indexes keyed by a hash of the
+points, so stages that query the same cloud share one tree.
+
+Used by reconstruct_surface() in assignment5_solution_coffeecup.py.
+"""
+
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Parallel queries on every core unless OMP_NUM_THREADS limits the process
+ALL_CORES = -1
+# Indexes kept by get_index()
+CACHE_SIZE = 4
+# Inverse-distance weight exponent
+IDW_POWER = 2
+
+
+def query_workers():
+    """Threads for a k-NN query: OMP_NUM_THREADS when set to a positive count, else every core"""
+    threads = os.environ.get('OMP_NUM_THREADS', '').strip()
+    if threads.isdigit() and int(threads) > 0:
+        return int(threads)
+    return ALL_CORES
+
+
+class SpatialIndex:
+    """k-d tree over a point cloud with batched, parallel k-NN queries"""
+
+    def __init__(self, points):
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        # Sliding-midpoint splits build faster and query as well for scan data
+        self.tree = cKDTree(self.points, balanced_tree=False, compact_nodes=False)
+        self._spacing = {}
+
+    def __len__(self):
+        return len(self.points)
+
+    def query(self, targets, k=1):
+        """(distances, indices) of the k nearest points, each shaped (n,) for k=1 else (n, k)"""
+        return self.tree.query(np.asarray(targets, dtype=np.float64), k=k, workers=query_workers())
+
+    def transfer(self, values, targets, k=1, normalize=False):
+        """Per-point values interpolated at the target positions.
+
+        k=1 copies the nearest point's value; k>1 takes the inverse-distance
+        weighted mean of the k nearest (a target on a point gets its value).
+        normalize rescales the results to unit length (for normals).
+        Returns (values at targets, mean distance to the nearest point).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        distances, indices = self.query(targets, k=k)
+        if k == 1:
+            result = values[indices]
+            nearest = distances
+        else:
+            weights = 1.0 / np.maximum(distances, 1e-12) ** IDW_POWER
+            weights /= weights.sum(axis=1, keepdims=True)
+            result = np.einsum('nk,nkc->nc', weights, values[indices])
+            nearest = distances[:, 0]
+        if normalize:
+            lengths = np.linalg.norm(result, axis=1, keepdims=True)
+            result = np.divide(result, lengths, out=result, where=lengths > 0)
+        return result, float(nearest.mean()) if len(nearest) else 0.0
+
+    def spacing(self, k=8):
+        """Median over the cloud of each point's mean distance to its k nearest other points"""
+        if k not in self._spacing:
+            # k + 1: every point is its own nearest neighbor
+            distances, _ = self.query(self.points, k=k + 1)
+            self._spacing[k] = float(np.median(distances[:, 1:].mean(axis=1)))
+        return self._spacing[k]
+
+    def far_from_cloud(self, targets, k=8, factor=4.0):
+        """Mask of targets whose mean distance to their k nearest points exceeds factor * spacing(k)"""
+        distances, _ = self.query(targets, k=k)
+        return distances.mean(axis=1) > factor * self.spacing(k)
+
+
+_cache = OrderedDict()
+
+
+def points_key(points):
+    """Cache key for a point array (its contents, not its identity)"""
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    return hashlib.blake2b(points.tobytes(), digest_size=16).hexdigest()
+
+
+def get_index(points):
+    """SpatialIndex for the points, reused while it stays among the CACHE_SIZE most recent"""
+    key = points_key(points)
+    if key in _cache:
+        _cache.move_to_end(key)
+        return _cache[key]
+    index = SpatialIndex(points)
+    _cache[key] = index
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return index
+
+
+def clear_cache():
+    """Drop every cached index"""
+    _cache.clear()
@@ -0,0 +1,164 @@
+"""
+Out-of-core voxelization of large point clouds
+
+voxelize_arrays() builds the same voxel grid as
+o3d.geometry.VoxelGrid.create_from_point_cloud, but reads the points (and
+colors) in chunks, so they can be memory-mapped .npy files much larger than
+RAM:
+
+- a first pass finds the bounding box; like Open3D, the grid origin is the
+  minimum bound minus half a voxel
+- a second pass quantizes each chunk (floor((p - origin) / size)), packs the
+  three voxel indices into one 64-bit key, and reduces the chunk to unique
+  keys with color sums and point counts
+- each partial grid is merged into the running one, so memory is bounded by
+  the chunk size plus the number of occupied voxels, not the number of points
+
+Colors are averaged per voxel, as in Open3D. to_voxel_grid() converts the
+result to an Open3D VoxelGrid for display and export.
+
+Used by voxelize() in assignment5_solution_coffeecup.py.
+
+Usage:
+    python voxelizer.py points.npy --voxel-size 0.04 [--colors colors.npy] [--output grid.ply]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import open3d as o3d
+
+CHUNK_SIZE = 2_000_000
+# Bits per axis in a packed voxel key (3 x 21 bits fit in an int64)
+KEY_BITS = 21
+KEY_MASK = (1 << KEY_BITS) - 1
+
+
+def _chunks(length, chunk_size):
+    for start in range(0, length, chunk_size):
+        yield start, min(start + chunk_size, length)
+
+
+def point_bounds(points, chunk_size=CHUNK_SIZE):
+    """(min, max) over all points, read chunk by chunk"""
+    low = np.full(3, np.inf)
+    high = np.full(3, -np.inf)
+    for start, end in _chunks(len(points), chunk_size):
+        chunk = np.asarray(points[start:end], dtype=np.float64)
+        low = np.minimum(low, chunk.min(axis=0))
+        high = np.maximum(high, chunk.max(axis=0))
+    return low, high
+
+
+def pack_keys(indices):
+    """(n, 3) non-negative voxel indices -> (n,) int64 keys"""
+    indices = indices.astype(np.int64)
+    return (indices[:, 0] << (2 * KEY_BITS)) | (indices[:, 1] << KEY_BITS) | indices[:, 2]
+
+
+def unpack_keys(keys):
+    """(n,) int64 keys -> (n, 3) voxel indices"""
+    return np.stack(((keys >> (2 * KEY_BITS)) & KEY_MASK, (keys >> KEY_BITS) & KEY_MASK,
+                     keys & KEY_MASK), axis=1)
+
+
+def _reduce(keys, color_sums, counts):
+    """Combine rows with equal keys: sorted unique keys, summed colors and counts"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    merged_counts = np.bincount(inverse, weights=counts, minlength=len(unique))
+    merged_sums = None
+    if color_sums is not None:
+        merged_sums = np.stack([np.bincount(inverse, weights=color_sums[:, channel],
+                                            minlength=len(unique)) for channel in range(3)], axis=1)
+    return unique, merged_sums, merged_counts
+
+
+def voxelize_arrays(points, voxel_size, colors=None, chunk_size=CHUNK_SIZE):
+    """Voxelize (n, 3) points, optionally with (n, 3) colors in [0, 1].
+
+    points and colors may be memory maps; only chunk_size rows are in memory
+    at a time. Returns (origin, indices, voxel_colors): the grid origin, the
+    (v, 3) int64 index of every occupied voxel in key order, and the (v, 3)
+    mean color per voxel (None without colors).
+    """
+    if len(points) == 0:
+        return np.zeros(3), np.zeros((0, 3), dtype=np.int64), None if colors is None else np.zeros((0, 3))
+    low, high = point_bounds(points, chunk_size)
+    origin = low - voxel_size * 0.5
+    dims = np.floor((high - origin) / voxel_size).astype(np.int64) + 1
+    if (dims > KEY_MASK).any():
+        raise ValueError(f"grid of {dims.tolist()} voxels exceeds {KEY_MASK + 1} per axis; "
+                         f"use a larger voxel size")
+
+    keys = np.zeros(0, dtype=np.int64)
+    sums = None if colors is None else np.zeros((0, 3))
+    counts = np.zeros(0)
+    for start, end in _chunks(len(points), chunk_size):
+        chunk = np.asarray(points[start:end], dtype=np.float64)
+        chunk_keys = pack_keys(np.floor((chunk - origin) / voxel_size))
+        chunk_colors = None if colors is None else np.asarray(colors[start:end], dtype=np.float64)
+        chunk_keys, chunk_sums, chunk_counts = _reduce(chunk_keys, chunk_colors,
+                                                       np.ones(len(chunk_keys)))
+        # Merge the partial grid into the running one
+        keys, sums, counts = _reduce(
+            np.concatenate((keys, chunk_keys)),
+            None if sums is None else np.concatenate((sums, chunk_sums)),
+            np.concatenate((counts, chunk_counts)))
+
+    voxel_colors = None if sums is None else sums / counts[:, None]
+    return origin, unpack_keys(keys), voxel_colors
+
+
+def to_voxel_grid(origin, voxel_size, indices, voxel_colors=None):
+    """Open3D VoxelGrid with the given voxels.
+
+    Built from one point at each voxel center, so Open3D maps every point
+    back to its own voxel and keeps its color unchanged.
+    """
+    centers = o3d.geometry.PointCloud()
+    centers.points = o3d.utility.Vector3dVector(origin + (indices + 0.5) * voxel_size)
+    if voxel_colors is not None:
+        centers.colors = o3d.utility.Vector3dVector(voxel_colors)
+    max_bound = origin + (indices.max(axis=0) + 1) * voxel_size if len(indices) else origin
+    return o3d.geometry.VoxelGrid.create_from_point_cloud_within_bounds(
+        centers, voxel_size, origin, max_bound)
+
+
+def voxelize_files(points_file, voxel_size, colors_file=None, chunk_size=CHUNK_SIZE):
+    """Voxelize .npy files through read-only memory maps; returns voxelize_arrays()'s result"""
+    points = np.load(points_file, mmap_mode='r')
+    colors = np.load(colors_file, mmap_mode='r') if colors_file else None
+    return voxelize_arrays(points, voxel_size, colors, chunk_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Voxelize a point cloud stored as .npy arrays in chunks")
+    parser.add_argument('points', help="(n, 3) float32/float64 .npy file of point positions")
+    parser.add_argument('--voxel-size', type=float, required=True, help="edge length of a voxel")
+    parser.add_argument('--colors', help="(n, 3) .npy file of colors in [0, 1]")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f"points read per chunk (default: {CHUNK_SIZE})")
+    parser.add_argument('--output', help="write the voxel grid as PLY")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    origin, indices, voxel_colors = voxelize_files(args.points, args.voxel_size, args.colors,
+                                                   args.chunk_size)
+    elapsed = time.perf_counter() - started
+    num_points = len(np.load(args.points, mmap_mode='r'))
+    print(f"{num_points} points -> {len(indices)} voxels in {elapsed:.2f} s")
+    print(f"Origin: {origin.tolist()}, voxel size: {args.voxel_size}")
+
+    if args.output:
+        output_dir = os.path.dirname(args.output)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        o3d.io.write_voxel_grid(args.output, to_voxel_grid(origin, args.voxel_size, indices, voxel_colors))
+        print(f"Voxel grid written: {args.output}")
+
+
+if __name__ == "__main__":
+    main()